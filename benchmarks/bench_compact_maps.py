@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark del formato compacto de nodos (compact_maps.py)
+
+Para los mapas más grandes de data/maps compara el árbol anidado contra el
+formato columnar: bytes (minificado y gzip) y tiempo de carga (json.loads
+del árbol vs. json.loads + decode_tree del compacto). También verifica que
+la ida y vuelta sea idéntica. Si hay `node` instalado, mide además la
+decodificación de js/data-loader.js, que es la que paga el navegador.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_compact_maps.py            # 10 mapas más grandes
+    python benchmarks/bench_compact_maps.py -n 25      # 25 mapas más grandes
+"""
+
+import sys
+import gzip
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compact_maps import compact_map, expand_map, dumps
+
+MAPS_DIR = Path("data/maps")
+DATA_LOADER = Path("js/data-loader.js")
+
+# Carga data-loader.js fuera del navegador y mide JSON.parse (+ expandCompact)
+NODE_BENCH = r"""
+const fs = require('fs');
+global.window = {};
+// con `node -e`, los argumentos empiezan en argv[1]
+const [loader, tree, compact, repeat] = process.argv.slice(1);
+eval(fs.readFileSync(loader, 'utf8'));
+function best(fn) {
+  let min = Infinity;
+  for (let i = 0; i < +repeat; i++) {
+    const t = process.hrtime.bigint();
+    fn();
+    min = Math.min(min, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  return min;
+}
+const a = fs.readFileSync(tree, 'utf8');
+const b = fs.readFileSync(compact, 'utf8');
+console.log(JSON.stringify({
+  tree: best(() => JSON.parse(a)),
+  compact: best(() => window.MedMapsData.expandCompact(JSON.parse(b))),
+}));
+"""
+
+
+def best_time(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def node_times(tree_path, compact_path, repeat):
+    """(ms árbol, ms compacto) en node, o None si no está disponible"""
+    if not shutil.which('node'):
+        return None
+    out = subprocess.run(['node', '-e', NODE_BENCH, str(DATA_LOADER.resolve()),
+                          str(tree_path), str(compact_path), str(repeat)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return None
+    result = json.loads(out.stdout)
+    return result['tree'], result['compact']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del formato compacto de nodos')
+    parser.add_argument('-n', type=int, default=10, help='Cantidad de mapas más grandes')
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por archivo')
+    args = parser.parse_args()
+
+    largest = sorted(MAPS_DIR.glob("*.json"), key=lambda p: p.stat().st_size, reverse=True)[:args.n]
+
+    print(f"\n⏱️  BENCHMARK formato compacto ({len(largest)} mapas)\n")
+    print(f"{'mapa':<12} {'nodos':>6} │ {'KB árbol':>8} {'KB comp':>8} {'gz árbol':>8} {'gz comp':>8} │ "
+          f"{'py árbol':>8} {'py comp':>8} │ {'js árbol':>8} {'js comp':>8}")
+    print("─" * 106)
+
+    totals = [0.0] * 8
+    with tempfile.TemporaryDirectory() as tmp:
+        for f in largest:
+            map_data = expand_map(json.loads(f.read_bytes()))
+            tree = dumps(map_data)
+            compact = dumps(compact_map(map_data))
+
+            if expand_map(json.loads(compact)) != map_data:
+                print(f"  ⚠️ {f.name}: la ida y vuelta no es idéntica")
+
+            tree_path = Path(tmp) / f"{f.stem}.tree.json"
+            compact_path = Path(tmp) / f"{f.stem}.compact.json"
+            tree_path.write_text(tree, encoding='utf-8')
+            compact_path.write_text(compact, encoding='utf-8')
+
+            row = [
+                len(tree.encode('utf-8')) / 1024,
+                len(compact.encode('utf-8')) / 1024,
+                len(gzip.compress(tree.encode('utf-8'))) / 1024,
+                len(gzip.compress(compact.encode('utf-8'))) / 1024,
+                best_time(lambda: json.loads(tree), args.repeat),
+                best_time(lambda: expand_map(json.loads(compact)), args.repeat),
+            ]
+            js = node_times(tree_path, compact_path, args.repeat)
+            row += list(js) if js else [0.0, 0.0]
+
+            nodes = map_data.get('node_count', 0)
+            print(f"{f.stem[:12]:<12} {nodes:>6} │ {row[0]:>8.0f} {row[1]:>8.0f} {row[2]:>8.0f} "
+                  f"{row[3]:>8.0f} │ {row[4]:>8.1f} {row[5]:>8.1f} │ {row[6]:>8.1f} {row[7]:>8.1f}")
+            totals = [t + r for t, r in zip(totals, row)]
+
+    print("─" * 106)
+    print(f"{'total':<19} │ {totals[0]:>8.0f} {totals[1]:>8.0f} {totals[2]:>8.0f} {totals[3]:>8.0f} │ "
+          f"{totals[4]:>8.1f} {totals[5]:>8.1f} │ {totals[6]:>8.1f} {totals[7]:>8.1f}")
+    if not shutil.which('node'):
+        print("\n(node no está instalado: columnas js en 0)")
+
+
+if __name__ == "__main__":
+    main()
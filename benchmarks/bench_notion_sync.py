@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la sincronización con Notion (sync_notion.py) contra el stub
+
+Levanta benchmarks/notion_stub.py en el mismo proceso (uno nuevo por
+configuración) y sincroniza N mapas sintéticos. Compara el envío en serie
+sin limitador ni reintentos (lo que hacía --sync antes) contra el motor
+asyncio con distintos números de workers. Por configuración reporta tiempo,
+requests/s efectivos, 429 recibidos, reintentos, páginas perdidas y páginas
+duplicadas (creates repetidos tras un error que el stub dio después de
+guardar, ver --error-mode).
+
+El stub admite por defecto 3 req/s como Notion, así que el tiempo mínimo es
+~N/3 segundos; con --stub-rps más alto (y --rps igual) se prueba más rápido.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_notion_sync.py                     # 60 mapas, 3 req/s
+    python benchmarks/bench_notion_sync.py --maps 300 --stub-rps 30 --rps 30
+    python benchmarks/bench_notion_sync.py --error-rate 0.05   # con 502/503
+    python benchmarks/bench_notion_sync.py --error-rate 0.1 --error-mode after
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+from collections import Counter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+os.environ.setdefault("NOTION_TOKEN", "stub-token")
+
+import sync_notion
+from notion_stub import start_stub, STUB_BURST, STUB_RETRY_AFTER, ERROR_MODES
+
+DATABASE_ID = "stub-database"
+
+
+def fake_maps(n):
+    specialties = sync_notion.ESPECIALIDADES
+    return [{'id': f"bench_{i:05d}", 'title': f"Mapa de prueba {i}",
+             'specialty': specialties[i % len(specialties)], 'node_count': 10 + i % 200}
+            for i in range(n)]
+
+
+def run_config(maps, workers, rps, retries, stub_options):
+    server, state, base_url = start_stub(**stub_options)
+    try:
+        report = asyncio.run(sync_notion.sync_maps_async(
+            maps, DATABASE_ID, workers=workers, rps=rps, retries=retries, base_url=base_url,
+            verbose=False))
+    finally:
+        server.shutdown()
+        server.server_close()
+    ids = Counter(sync_notion.page_map_id(page) for page in state['pages'].values())
+    report['stub_maps'] = len(ids)
+    report['stub_duplicates'] = sum(n - 1 for n in ids.values())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de sync_notion contra el stub local')
+    parser.add_argument('--maps', type=int, default=60, help='Mapas a sincronizar (default %(default)s)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8],
+                        help='Workers a probar con el motor asyncio (default %(default)s)')
+    parser.add_argument('--rps', type=float, default=sync_notion.NOTION_RPS,
+                        help='Límite del cliente (default %(default)s)')
+    parser.add_argument('--stub-rps', type=float, default=3.0,
+                        help='Límite del stub (default %(default)s)')
+    parser.add_argument('--burst', type=int, default=STUB_BURST)
+    parser.add_argument('--retry-after', type=int, default=STUB_RETRY_AFTER)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-mode', choices=ERROR_MODES, default='mixed',
+                        help='Errores de /pages antes o después de guardar (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Latencia del stub por request, en segundos (default %(default)s)')
+    parser.add_argument('--no-baseline', action='store_true',
+                        help='No correr el envío en serie sin reintentos')
+    args = parser.parse_args()
+
+    maps = fake_maps(args.maps)
+    stub_options = {'rps': args.stub_rps, 'burst': args.burst, 'retry_after': args.retry_after,
+                    'error_rate': args.error_rate, 'error_mode': args.error_mode,
+                    'latency': args.latency, 'seed': 42}
+
+    configs = [] if args.no_baseline else [('serie, sin límite ni reintentos', 1, 0, 0)]
+    configs += [(f"asyncio, {w} workers", w, args.rps, sync_notion.MAX_RETRIES) for w in args.workers]
+
+    print(f"\n🧪 {args.maps} mapas | stub: {args.stub_rps:g} req/s, ráfaga {args.burst}, "
+          f"errores {args.error_rate:.0%} ({args.error_mode}), latencia {args.latency * 1000:.0f} ms\n")
+    print(f"  {'configuración':<34} {'tiempo':>8} {'req/s':>7} {'429':>5} {'reint.':>7} "
+          f"{'perdidos':>9} {'duplicados':>11}")
+    for name, workers, rps, retries in configs:
+        report = run_config(maps, workers, rps, retries, stub_options)
+        lost = args.maps - report['stub_maps']
+        print(f"  {name:<34} {report['seconds']:>7.1f}s {report['requests_per_second']:>7.2f} "
+              f"{report['rate_limited']:>5} {report['retries']:>7} {lost:>9} "
+              f"{report['stub_duplicates']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser SimpleMind (smmx_parser.parse_smmx)
+
+Mide tiempo y memoria pico (tracemalloc) del parser en streaming contra la
+versión anterior basada en ET.fromstring, usando los mapas más grandes del
+portal, y reporta el throughput (mapas/s y MB/s de XML) para detectar
+regresiones. Como los .smmx originales viven en Dropbox, por defecto se
+reconstruyen a partir de data/maps/*.json en un directorio temporal.
+
+La corrección se verifica aparte contra los golden files:
+    python smmx_parser.py --check
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_parse_smmx.py              # 10 mapas más grandes
+    python benchmarks/bench_parse_smmx.py -n 25        # 25 mapas más grandes
+    python benchmarks/bench_parse_smmx.py --smmx DIR   # .smmx reales de DIR
+"""
+
+import sys
+import time
+import zipfile
+import argparse
+import tempfile
+import tracemalloc
+import json
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from compact_maps import expand_map
+from smmx_parser import parse_smmx, SMMX_XML_PATHS
+
+MAPS_DIR = Path("data/maps")
+
+
+def parse_smmx_dom(file_path):
+    """Parser anterior (árbol DOM completo + pasadas recursivas), como referencia"""
+    with zipfile.ZipFile(file_path, 'r') as z:
+        names = set(z.namelist())
+        xml_path = next((p for p in SMMX_XML_PATHS if p in names), None)
+        if xml_path is None:
+            return None
+        xml_content = z.read(xml_path)
+
+    root = ET.fromstring(xml_content)
+    mindmap = root.find('mindmap')
+    if mindmap is None:
+        mindmap = root
+    topics_elem = mindmap.find('topics')
+    if topics_elem is None or not len(topics_elem):
+        return None
+
+    topics_dict = {}
+    for topic in topics_elem:
+        topics_dict[topic.attrib.get('id', '')] = {
+            'text': topic.attrib.get('text', ''),
+            'parent': topic.attrib.get('parent', ''),
+            'children': []
+        }
+
+    root_nodes = []
+    for topic_data in topics_dict.values():
+        parent_id = topic_data['parent']
+        if parent_id and parent_id in topics_dict:
+            topics_dict[parent_id]['children'].append(topic_data)
+        else:
+            root_nodes.append(topic_data)
+
+    def clean_node(node):
+        return {'text': node['text'], 'children': [clean_node(c) for c in node['children']]}
+
+    root_node = clean_node(root_nodes[0])
+    for r in root_nodes[1:]:
+        root_node['children'].append(clean_node(r))
+
+    def count_nodes(node):
+        return 1 + sum(count_nodes(c) for c in node['children'])
+
+    def get_all_text(node):
+        text = node['text']
+        for c in node['children']:
+            text += ' ' + get_all_text(c)
+        return text
+
+    return {
+        'title': root_node['text'] or file_path.stem,
+        'root': root_node,
+        'node_count': count_nodes(root_node),
+        'full_text': get_all_text(root_node)
+    }
+
+
+def write_smmx(map_data, dest):
+    """Reconstruye un .smmx (document/mindmap.xml) desde un mapa JSON"""
+    topics = []
+    stack = [map_data['root']]
+    while stack:
+        node = stack.pop()
+        topics.append('<topic id=%s parent=%s guid=%s text=%s/>' % (
+            quoteattr(str(node.get('id', ''))), quoteattr(str(node.get('parent', '-1'))),
+            quoteattr(node.get('guid', '')), quoteattr(node.get('text', ''))))
+        stack.extend(reversed(node.get('children', [])))
+
+    xml = ('<?xml version="1.0" encoding="utf-8"?>'
+           '<simplemind-mindmaps doc-version="3"><mindmap><topics>'
+           + ''.join(topics) +
+           '</topics></mindmap></simplemind-mindmaps>')
+
+    with zipfile.ZipFile(dest, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('document/mindmap.xml', xml)
+
+
+def build_fixtures(n, out_dir):
+    """Genera .smmx para los n mapas más grandes de data/maps"""
+    largest = sorted(MAPS_DIR.glob("*.json"), key=lambda p: p.stat().st_size, reverse=True)[:n]
+    files = []
+    for p in largest:
+        with open(p, 'r', encoding='utf-8') as f:
+            map_data = expand_map(json.load(f))
+        dest = out_dir / f"{p.stem}.smmx"
+        write_smmx(map_data, dest)
+        files.append(dest)
+    return files
+
+
+def xml_size(file_path):
+    """Bytes del XML descomprimido dentro del .smmx"""
+    with zipfile.ZipFile(file_path, 'r') as z:
+        names = set(z.namelist())
+        xml_path = next((p for p in SMMX_XML_PATHS if p in names), None)
+        return z.getinfo(xml_path).file_size if xml_path else 0
+
+
+def strip_node(node):
+    """Solo texto e hijos, para comparar con el parser de referencia"""
+    return {'text': node['text'], 'children': [strip_node(c) for c in node['children']]}
+
+
+def measure(parse, file_path, repeat):
+    """Devuelve (resultado, mejor tiempo en ms, memoria pico en KB)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(file_path)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, best * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de parse_smmx')
+    parser.add_argument('-n', type=int, default=10, help='Cantidad de mapas más grandes')
+    parser.add_argument('--smmx', help='Directorio con .smmx reales')
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por archivo')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.smmx:
+            files = sorted(Path(args.smmx).rglob("*.smmx"),
+                           key=lambda p: p.stat().st_size, reverse=True)[:args.n]
+        else:
+            files = build_fixtures(args.n, Path(tmp))
+
+        print(f"\n⏱️  BENCHMARK parse_smmx ({len(files)} archivos)\n")
+        print(f"{'archivo':<14} {'nodos':>6} {'KB zip':>7} │ {'dom ms':>8} {'dom KB':>8} │ "
+              f"{'stream ms':>9} {'stream KB':>9}")
+        print("─" * 80)
+
+        totals = [0.0, 0.0, 0.0, 0.0]
+        xml_bytes = 0
+        for f in files:
+            old, old_ms, old_kb = measure(parse_smmx_dom, f, args.repeat)
+            new, new_ms, new_kb = measure(parse_smmx, f, args.repeat)
+
+            if new is None or old is None or strip_node(new['root']) != old['root']:
+                print(f"  ⚠️ {f.name}: el resultado difiere del parser de referencia")
+
+            nodes = new['node_count'] if new else 0
+            size_kb = f.stat().st_size / 1024
+            print(f"{f.stem[:14]:<14} {nodes:>6} {size_kb:>7.0f} │ {old_ms:>8.1f} {old_kb:>8.0f} │ "
+                  f"{new_ms:>9.1f} {new_kb:>9.0f}")
+
+            totals[0] += old_ms
+            totals[1] = max(totals[1], old_kb)
+            totals[2] += new_ms
+            totals[3] = max(totals[3], new_kb)
+            xml_bytes += xml_size(f)
+
+        print("─" * 80)
+        print(f"{'total / pico':<29} │ {totals[0]:>8.1f} {totals[1]:>8.0f} │ "
+              f"{totals[2]:>9.1f} {totals[3]:>9.0f}")
+
+        for label, ms in (('dom', totals[0]), ('stream', totals[2])):
+            if ms:
+                print(f"🚀 {label:<6} {len(files) / (ms / 1000):>8.1f} mapas/s  "
+                      f"{xml_bytes / 1e6 / (ms / 1000):>6.1f} MB/s de XML")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Suite de Benchmarks de Ingesta y Búsqueda - MedMaps
+
+Sobre un corpus sintético (benchmarks/synth_corpus.py) de 1k, 10k o 50k
+mapas mide tiempo y memoria pico (tracemalloc) de cada etapa:
+
+- parse          smmx_parser.parse_smmx sobre los .smmx del corpus
+- ingest         process_inbox.process_txt + text_to_map.save_map (índice incluido)
+- link           bulk_process.find_related_maps contra todo el índice
+- index-rebuild  build_artifacts.build(force=True) sobre data/maps
+- search-index   search_maps.build_trigram_index, en frío (sin caché de nodos)
+- search         search_maps.search para un set fijo de consultas (con typos)
+
+El tiempo es el mejor de --repeat corridas; la memoria pico sale de una
+corrida aparte con tracemalloc (que por sí mismo hace más lento el código).
+La ingesta borra al terminar los mapas que creó, así que el corpus queda
+igual para la siguiente corrida.
+
+Los corpus se generan una vez en .cache/synth/<tamaño>-<semilla>/ y se
+reutilizan. Los resultados se guardan como JSON en benchmarks/results/
+para comparar corridas con --compare.
+
+Uso (desde la raíz del repo):
+    python benchmarks/bench_suite.py                          # 1k, todas las etapas
+    python benchmarks/bench_suite.py --size 1k 10k --stages parse link
+    python benchmarks/bench_suite.py --size 50k --no-memory -j 4
+    python benchmarks/bench_suite.py --compare results/a.json results/b.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import subprocess
+import contextlib
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+sys.path.insert(0, str(REPO / "benchmarks"))
+
+import index_store
+import bulk_process
+import search_maps
+import text_to_map
+import process_inbox
+import build_artifacts
+from smmx_parser import parse_smmx
+from synth_corpus import generate, parse_size, SEED
+
+CORPUS_DIR = REPO / ".cache" / "synth"
+RESULTS_DIR = REPO / "benchmarks" / "results"
+
+STAGES = ['parse', 'ingest', 'link', 'index-rebuild', 'search-index', 'search']
+
+# Consultas de búsqueda: frases, palabras sueltas y typos/sin tildes
+QUERIES = ['delirium', 'insuficiencia cardiaca', 'fragilidad sarcopenia', 'demensia',
+           'anticoagulacion', 'parkinson', 'caidas', 'hipertension arterial',
+           'polifarmacia deprescripcion', 'sepsis shock', 'deterioro cognitivo', 'osteoporsis']
+
+
+def corpus_for(size, seed, regen=False):
+    """Directorio del corpus sintético (lo genera si no existe)"""
+    corpus = CORPUS_DIR / f"{size}-{seed}"
+    summary_file = corpus / "corpus.json"
+    if regen and corpus.exists():
+        shutil.rmtree(corpus)
+    if not summary_file.exists():
+        print(f"🧪 Generando corpus de {size} mapas en {corpus}...")
+        summary = generate(corpus, size, seed=seed)
+        summary_file.write_text(json.dumps(summary, indent=2), encoding='utf-8')
+    return corpus, json.loads(summary_file.read_text(encoding='utf-8'))
+
+
+# Cada etapa recibe el contexto y retorna (items, bytes procesados o None, limpieza o None)
+
+def stage_parse(ctx):
+    for f in ctx['smmx']:
+        parse_smmx(f)
+    return len(ctx['smmx']), ctx['smmx_bytes'], None
+
+
+def stage_ingest(ctx):
+    files = ctx['txt'][:ctx['ingest']]
+    existing = text_to_map.load_existing_maps()
+    created = []
+    for f in files:
+        map_data = process_inbox.process_txt(f, existing_maps=existing)
+        text_to_map.save_map(map_data)
+        existing.append({k: map_data[k] for k in ('id', 'title', 'specialty')})
+        created.append(map_data['id'])
+
+    def cleanup():
+        for map_id in created:
+            (text_to_map.MAPS_DIR / f"{map_id}.json").unlink(missing_ok=True)
+        index_store.append([{'op': 'delete', 'id': map_id} for map_id in created])
+        index_store.compact()
+
+    return len(files), sum(f.stat().st_size for f in files), cleanup
+
+
+def stage_link(ctx):
+    index = index_store.load_index()
+    term_index = bulk_process.build_term_index(index)
+    for text in ctx['texts']:
+        bulk_process.find_related_maps(text, index, term_index=term_index)
+    return len(ctx['texts']), None, None
+
+
+def stage_index_rebuild(ctx):
+    build_artifacts.build(ctx['jobs'], force=True)
+    return ctx['size'], ctx['maps_bytes'], None
+
+
+def stage_search_index(ctx):
+    search_maps.NODES_CACHE.unlink(missing_ok=True)
+    ctx['trigram_index'] = search_maps.build_trigram_index(index_store.load_index())
+    return ctx['size'], None, None
+
+
+def setup_search(ctx):
+    if 'trigram_index' not in ctx:
+        ctx['trigram_index'] = search_maps.build_trigram_index(index_store.load_index())
+
+
+def stage_search(ctx):
+    index = index_store.load_index()
+    for query in QUERIES:
+        search_maps.search(query, index, ctx['trigram_index'])
+    return len(QUERIES), None, None
+
+
+STAGE_FUNCS = {
+    'parse': stage_parse,
+    'ingest': stage_ingest,
+    'link': stage_link,
+    'index-rebuild': stage_index_rebuild,
+    'search-index': stage_search_index,
+    'search': stage_search,
+}
+
+# Preparación fuera de la medición (p. ej. el índice de trigramas para search)
+STAGE_SETUP = {
+    'search': setup_search,
+}
+
+
+def run_quiet(fn, ctx):
+    """Corre una etapa sin la salida de los scripts; limpia lo que haya creado"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        items, nbytes, cleanup = fn(ctx)
+        if cleanup:
+            cleanup()
+    return items, nbytes
+
+
+def measure(fn, ctx, repeat, memory):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items, nbytes = run_quiet(fn, ctx)
+        best = min(best, time.perf_counter() - start)
+
+    result = {'seconds': round(best, 4), 'items': items,
+              'per_second': round(items / best, 1) if best else None}
+    if nbytes:
+        result['mb_per_second'] = round(nbytes / 1e6 / best, 2)
+    if memory:
+        tracemalloc.start()
+        run_quiet(fn, ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result['peak_kb'] = round(peak / 1024)
+    return result
+
+
+def prepare(corpus, summary, args):
+    """Lista los archivos fuente y precalcula los textos para la etapa link"""
+    smmx = sorted((corpus / "smmx").rglob("*.smmx"))
+    txt = sorted((corpus / "txt").glob("*.txt"))
+    texts = []
+    for f in smmx[:args.link]:
+        parsed = parse_smmx(f)
+        if parsed:
+            texts.append(parsed['full_text'])
+    return {
+        'size': summary['size'],
+        'jobs': args.jobs,
+        'ingest': args.ingest,
+        'smmx': smmx,
+        'smmx_bytes': sum(f.stat().st_size for f in smmx),
+        'maps_bytes': summary['bytes']['maps'],
+        'txt': txt,
+        'texts': texts,
+    }
+
+
+def print_row(stage, r):
+    peak = f"{r['peak_kb'] / 1024:>9.1f}" if 'peak_kb' in r else f"{'-':>9}"
+    mbs = f"{r['mb_per_second']:>7.1f}" if 'mb_per_second' in r else f"{'-':>7}"
+    print(f"  {stage:<14} {r['items']:>7} {r['seconds']:>9.3f} {r['per_second'] or 0:>10.1f} {mbs} {peak}")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(args):
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': {'repeat': args.repeat, 'memory': args.memory, 'jobs': args.jobs,
+                    'ingest': args.ingest, 'link': args.link, 'seed': args.seed},
+        'runs': [],
+    }
+
+    cwd = os.getcwd()
+    for size in [parse_size(s) for s in args.size]:
+        corpus, summary = corpus_for(size, args.seed, args.regen)
+        print(f"\n⏱️  SUITE sobre {size} mapas ({summary['nodes']} nodos)\n")
+        print(f"  {'etapa':<14} {'items':>7} {'segundos':>9} {'items/s':>10} {'MB/s':>7} {'pico MB':>9}")
+        print("  " + "─" * 60)
+
+        # Todas las rutas del repo son relativas: correr dentro del corpus
+        os.chdir(corpus)
+        try:
+            ctx = prepare(corpus, summary, args)
+            stages = {}
+            for stage in args.stages:
+                if stage in STAGE_SETUP:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        STAGE_SETUP[stage](ctx)
+                stages[stage] = measure(STAGE_FUNCS[stage], ctx, args.repeat, args.memory)
+                print_row(stage, stages[stage])
+        finally:
+            os.chdir(cwd)
+        results['runs'].append({'size': size, 'corpus': summary, 'stages': stages})
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"suite-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"\n💾 Resultados: {output}")
+
+
+def compare(old_file, new_file):
+    """Diferencia de tiempo y memoria por etapa entre dos corridas"""
+    old = json.loads(Path(old_file).read_text(encoding='utf-8'))
+    new = json.loads(Path(new_file).read_text(encoding='utf-8'))
+    old_runs = {r['size']: r['stages'] for r in old['runs']}
+
+    print(f"\n📊 {old.get('git') or old_file} → {new.get('git') or new_file}\n")
+    print(f"  {'tamaño':>7} {'etapa':<14} {'s antes':>9} {'s ahora':>9} {'Δ tiempo':>9} {'Δ pico':>8}")
+    print("  " + "─" * 62)
+    for run in new['runs']:
+        before = old_runs.get(run['size'], {})
+        for stage, r in run['stages'].items():
+            prev = before.get(stage)
+            if not prev:
+                continue
+            dt = 100 * (r['seconds'] / prev['seconds'] - 1) if prev['seconds'] else 0
+            dm = (f"{100 * (r['peak_kb'] / prev['peak_kb'] - 1):>+7.0f}%"
+                  if r.get('peak_kb') and prev.get('peak_kb') else f"{'-':>8}")
+            flag = ' ⚠️' if dt > 10 else ''
+            print(f"  {run['size']:>7} {stage:<14} {prev['seconds']:>9.3f} {r['seconds']:>9.3f} "
+                  f"{dt:>+8.0f}% {dm}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de ingesta y búsqueda sobre corpus sintéticos')
+    parser.add_argument('--size', nargs='+', default=['1k'], help='Tamaños: 1k, 10k, 50k o números')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help='Etapas a medir')
+    parser.add_argument('--repeat', type=int, default=1, help='Corridas por etapa (se toma la mejor)')
+    parser.add_argument('--memory', action=argparse.BooleanOptionalAction, default=True,
+                        help='Medir memoria pico con tracemalloc (corrida extra)')
+    parser.add_argument('--ingest', type=int, default=100, help='Archivos .txt a ingerir')
+    parser.add_argument('--link', type=int, default=500, help='Textos a enlazar')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Procesos para index-rebuild')
+    parser.add_argument('--seed', type=int, default=SEED, help='Semilla del corpus')
+    parser.add_argument('--regen', action='store_true', help='Regenerar el corpus aunque exista')
+    parser.add_argument('--output', help='Archivo JSON de resultados')
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'AHORA'),
+                        help='Comparar dos archivos de resultados')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Stub local de la API de Notion - MedMaps
+
+Servidor HTTP mínimo (solo stdlib) con lo que usa sync_notion.py, para
+probar y medir la sincronización sin red ni token:
+
+- POST  /v1/databases/{id}/query   (paginado con start_cursor/page_size; filtro
+                                     rich_text "equals" sobre una propiedad)
+- POST  /v1/pages
+- PATCH /v1/pages/{id}
+- GET   /stats                     (contadores del stub, en JSON)
+
+Imita el límite de Notion: un token bucket por servidor (--rps, --burst) y,
+cuando se excede, 429 con código rate_limited y Retry-After. También puede
+inyectar errores 502/503 (--error-rate) y latencia (--latency) para ver los
+reintentos. Con --error-mode after (o mixed, la mitad de las veces) el error
+de un POST/PATCH a /pages llega después de guardar la página, como cuando
+Notion aplica la request pero la respuesta se pierde: un create reintentado
+a ciegas duplica la página. Las páginas viven en memoria mientras corre el
+proceso.
+
+Uso:
+    python benchmarks/notion_stub.py --port 8787
+    NOTION_TOKEN=x NOTION_DATABASE_ID=stub NOTION_BASE_URL=http://127.0.0.1:8787 \\
+        python sync_notion.py --sync
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STUB_RPS = 3.0
+STUB_BURST = 10
+STUB_RETRY_AFTER = 1
+PAGE_SIZE_MAX = 100
+ERROR_MODES = ('before', 'after', 'mixed')
+
+
+def new_state(rps=STUB_RPS, burst=STUB_BURST, retry_after=STUB_RETRY_AFTER,
+              error_rate=0.0, error_mode='mixed', latency=0.0, seed=None):
+    return {
+        'rps': rps,
+        'burst': burst,
+        'retry_after': retry_after,
+        'error_rate': error_rate,
+        'error_mode': error_mode,
+        'latency': latency,
+        'random': random.Random(seed),
+        'tokens': float(burst),
+        'updated': time.monotonic(),
+        'pages': {},            # page_id → página
+        'order': [],            # page_ids en orden de creación
+        'stats': {'requests': 0, 'rate_limited': 0, 'injected_errors': 0,
+                  'errors_after_write': 0, 'created': 0, 'updated': 0, 'queries': 0},
+        'lock': threading.Lock(),
+    }
+
+
+def admit(state):
+    """True si la request entra en el límite del servidor"""
+    if state['rps'] <= 0:
+        return True
+    now = time.monotonic()
+    state['tokens'] = min(state['burst'], state['tokens'] + (now - state['updated']) * state['rps'])
+    state['updated'] = now
+    if state['tokens'] >= 1:
+        state['tokens'] -= 1
+        return True
+    return False
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_error_json(self, status, code, message, headers=None):
+            self.send_json(status, {'object': 'error', 'status': status,
+                                    'code': code, 'message': message}, headers)
+
+        def read_body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            if not length:
+                return {}
+            try:
+                return json.loads(self.rfile.read(length))
+            except ValueError:
+                return None
+
+        def dispatch(self, method):
+            body = self.read_body()
+            parts = [p for p in self.path.split('?')[0].split('/') if p]
+
+            if method == 'GET' and parts == ['stats']:
+                with state['lock']:
+                    stats = dict(state['stats'], pages=len(state['pages']))
+                return self.send_json(200, stats)
+
+            with state['lock']:
+                state['stats']['requests'] += 1
+                if not admit(state):
+                    state['stats']['rate_limited'] += 1
+                    return self.send_error_json(
+                        429, 'rate_limited',
+                        'You have been rate limited. Please try again in a few minutes.',
+                        {'Retry-After': str(state['retry_after'])})
+                fail = None
+                if state['error_rate'] and state['random'].random() < state['error_rate']:
+                    state['stats']['injected_errors'] += 1
+                    fail = state['random'].choice([502, 503])
+                    after = (state['error_mode'] == 'after' or
+                             (state['error_mode'] == 'mixed' and state['random'].random() < 0.5))
+                    if not (after and parts[1:2] == ['pages']):
+                        return self.send_error_json(fail, 'service_unavailable',
+                                                    'Injected error from notion_stub')
+
+            if state['latency']:
+                time.sleep(state['latency'])
+            if body is None:
+                return self.send_error_json(400, 'invalid_json', 'Body is not valid JSON')
+
+            if parts[:1] != ['v1']:
+                return self.send_error_json(400, 'invalid_request_url', 'Invalid request URL.')
+            route = parts[1:]
+
+            if method == 'POST' and len(route) == 3 and route[0] == 'databases' and route[2] == 'query':
+                return self.query(body)
+            if method == 'POST' and route == ['pages']:
+                return self.create_page(body, fail)
+            if method == 'PATCH' and len(route) == 2 and route[0] == 'pages':
+                return self.update_page(route[1], body, fail)
+            return self.send_error_json(400, 'invalid_request_url', 'Invalid request URL.')
+
+        def send_after_write(self, fail, page):
+            """La página ya quedó guardada; con `fail`, la respuesta es un 5xx"""
+            if fail:
+                with state['lock']:
+                    state['stats']['errors_after_write'] += 1
+                return self.send_error_json(fail, 'service_unavailable',
+                                            'Injected error from notion_stub (after write)')
+            self.send_json(200, page)
+
+        def matches(self, page, condition):
+            """Filtro {"property": nombre, "rich_text": {"equals": valor}}"""
+            if not condition:
+                return True
+            prop = page['properties'].get(condition.get('property'), {})
+            texts = prop.get('rich_text') or prop.get('title') or []
+            value = ''.join(t.get('plain_text') or t.get('text', {}).get('content', '') for t in texts)
+            return value == (condition.get('rich_text') or {}).get('equals')
+
+        def query(self, body):
+            page_size = min(PAGE_SIZE_MAX, int(body.get('page_size') or PAGE_SIZE_MAX))
+            with state['lock']:
+                state['stats']['queries'] += 1
+                order = [pid for pid in state['order']
+                         if self.matches(state['pages'][pid], body.get('filter'))]
+                start = order.index(body['start_cursor']) if body.get('start_cursor') in order else 0
+                chunk = [state['pages'][pid] for pid in order[start:start + page_size]]
+                next_cursor = order[start + page_size] if start + page_size < len(order) else None
+            self.send_json(200, {'object': 'list', 'results': chunk,
+                                 'next_cursor': next_cursor, 'has_more': next_cursor is not None})
+
+        def create_page(self, body, fail=None):
+            page_id = str(uuid.uuid4())
+            page = {'object': 'page', 'id': page_id, 'parent': body.get('parent', {}),
+                    'properties': body.get('properties', {})}
+            with state['lock']:
+                state['pages'][page_id] = page
+                state['order'].append(page_id)
+                state['stats']['created'] += 1
+            self.send_after_write(fail, page)
+
+        def update_page(self, page_id, body, fail=None):
+            with state['lock']:
+                page = state['pages'].get(page_id)
+                if page is None:
+                    return self.send_error_json(404, 'object_not_found',
+                                                f'Could not find page with ID: {page_id}.')
+                page['properties'].update(body.get('properties', {}))
+                state['stats']['updated'] += 1
+            self.send_after_write(fail, page)
+
+        def do_GET(self):
+            self.dispatch('GET')
+
+        def do_POST(self):
+            self.dispatch('POST')
+
+        def do_PATCH(self):
+            self.dispatch('PATCH')
+
+    return Handler
+
+
+def start_stub(host='127.0.0.1', port=0, **options):
+    """Levanta el stub en un hilo. Retorna (server, state, base_url)."""
+    state = new_state(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stub local de la API de Notion')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--rps', type=float, default=STUB_RPS,
+                        help='Requests por segundo admitidas; 0 = sin límite (default %(default)s)')
+    parser.add_argument('--burst', type=int, default=STUB_BURST,
+                        help='Ráfaga admitida antes de responder 429 (default %(default)s)')
+    parser.add_argument('--retry-after', type=int, default=STUB_RETRY_AFTER,
+                        help='Segundos de Retry-After en los 429 (default %(default)s)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fracción de requests que responden 502/503')
+    parser.add_argument('--error-mode', choices=ERROR_MODES, default='mixed',
+                        help='Errores de /pages antes o después de guardar (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Segundos de latencia por request')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    server, state, base_url = start_stub(args.host, args.port, rps=args.rps, burst=args.burst,
+                                         retry_after=args.retry_after, error_rate=args.error_rate,
+                                         error_mode=args.error_mode, latency=args.latency,
+                                         seed=args.seed)
+    print(f"🧪 Stub de Notion en {base_url} ({args.rps:g} req/s, ráfaga {args.burst})")
+    print(f"   NOTION_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        print(f"\n📊 {json.dumps(state['stats'])} | páginas: {len(state['pages'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Generador de Corpus Sintético - MedMaps
+
+Produce un corpus reproducible (misma semilla → mismos archivos) para medir
+las herramientas de ingesta y búsqueda a escalas que el corpus real todavía
+no tiene:
+
+- data/maps/*.json y data/maps_index.json   (el portal, `--size` mapas)
+- smmx/<carpeta>/*.smmx                      (SimpleMind, layout plano con guid y relaciones)
+- txt/*.txt                                  (esquemas tabulados para process_inbox)
+
+La cantidad de nodos por mapa sigue los ventiles de node_count de data/maps
+y los nodos se reparten por profundidad con la misma proporción que el
+corpus real; los textos mezclan vocabulario clínico con los términos de
+enlace de bulk_process.MEDICAL_TERMS, así que find_related_maps y la
+búsqueda encuentran coincidencias como en producción.
+
+Los directorios quedan listos para correr los scripts con ese directorio
+como cwd (todas las rutas del repo son relativas). benchmarks/bench_suite.py
+lo usa para generar el corpus de cada tamaño.
+
+Uso (desde la raíz del repo):
+    python benchmarks/synth_corpus.py --size 1k --out /tmp/corpus-1k
+    python benchmarks/synth_corpus.py --size 10k --sources 500 --out /tmp/corpus-10k
+    python benchmarks/synth_corpus.py --size 2500 --compact --out /tmp/corpus
+"""
+
+import sys
+import json
+import math
+import random
+import base64
+import zipfile
+import argparse
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bulk_process import MEDICAL_TERMS, FOLDER_TO_SPECIALTY
+from compact_maps import compact_map, dumps
+
+SIZES = {'1k': 1000, '10k': 10000, '50k': 50000}
+SEED = 20240601
+
+# Ventiles de node_count en data/maps (2.517 mapas reales): mínimo, p5, ..., máximo
+NODE_COUNT_VENTILES = [1, 14, 33, 47, 63, 79, 97, 115, 134, 155, 177, 200,
+                       222, 252, 281, 323, 384, 486, 613, 868, 4415]
+
+# Nodos por profundidad (1, 2, ...) en data/maps; la raíz es la profundidad 0
+DEPTH_WEIGHTS = [55348, 107499, 186771, 169962, 96247, 42999, 18091, 7106, 2881, 1135, 457]
+
+# Palabras por nodo: el texto real tiene mediana 26 y media 36 caracteres
+WORDS_PER_NODE = [1, 2, 3, 4, 5, 6, 8, 12]
+WORDS_WEIGHTS = [10, 18, 22, 18, 12, 9, 7, 4]
+TERM_PROBABILITY = 0.08      # Nodos que mencionan un término de enlace
+NEWLINE_PROBABILITY = 0.03   # Saltos "\N" de SimpleMind dentro del texto
+RELATION_PROBABILITY = 0.1   # Mapas con flechas entre nodos
+
+VOCABULARY = """
+paciente adulto mayor diagnóstico tratamiento manejo evaluación criterios
+escala riesgo factores síntomas signos clínica etiología fisiopatología
+pronóstico seguimiento complicaciones prevención tamizaje dosis fármaco
+efectos adversos contraindicaciones indicación mecanismo acción receptor
+inhibidor agonista antagonista vía oral intravenosa infusión bolo
+hospitalización urgencia ambulatorio domicilio rehabilitación funcionalidad
+cognición memoria atención marcha equilibrio fuerza masa muscular nutrición
+albúmina creatinina filtrado glomerular sodio potasio hemoglobina ferritina
+troponina péptido natriurético fracción eyección presión arterial frecuencia
+cardíaca respiratoria saturación oxígeno temperatura dolor crónico agudo
+leve moderado severo primera línea segunda alternativa estudio ensayo
+aleatorizado metaanálisis revisión guía recomendación evidencia nivel grado
+sensibilidad especificidad valor predictivo incidencia prevalencia mortalidad
+morbilidad calidad vida cuidador familia decisión compartida pronóstico vital
+cuidados paliativos final vida sedación hidratación alimentación enteral
+""".split()
+
+TITLE_PREFIXES = ['Clase', 'Resumen', 'Guía', 'Paper', 'Revisión', 'Caso', 'Continuum', 'Apuntes']
+TAGS = ["📄 Paper", "📚 Revisión", "⭐ Estudio Pivotal", "📋 Guía Clínica",
+        "🔬 Fisiopatología", "💊 Farmacología", "🏥 Caso Clínico"]
+
+
+def guid(rng):
+    """GUID estilo SimpleMind (22 caracteres base64url)"""
+    return base64.urlsafe_b64encode(rng.getrandbits(128).to_bytes(16, 'big')).decode()[:22]
+
+
+def sample_node_count(rng):
+    """Cantidad de nodos interpolando (en escala log) entre ventiles reales"""
+    i = rng.randrange(len(NODE_COUNT_VENTILES) - 1)
+    lo, hi = NODE_COUNT_VENTILES[i], NODE_COUNT_VENTILES[i + 1]
+    return max(1, round(math.exp(math.log(lo) + rng.random() * (math.log(hi) - math.log(lo)))))
+
+
+def node_text(rng):
+    words = rng.choices(VOCABULARY, k=rng.choices(WORDS_PER_NODE, WORDS_WEIGHTS)[0])
+    if rng.random() < TERM_PROBABILITY:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(MEDICAL_TERMS))
+    if len(words) > 3 and rng.random() < NEWLINE_PROBABILITY:
+        cut = rng.randrange(1, len(words))
+        return ' '.join(words[:cut]) + '\\N' + ' '.join(words[cut:])
+    text = ' '.join(words)
+    return text[0].upper() + text[1:]
+
+
+def make_tree(rng, node_count, title):
+    """Árbol con la distribución de profundidades real; IDs en orden de creación"""
+    root = {'id': '0', 'parent': '-1', 'text': title, 'guid': guid(rng), 'children': []}
+    levels = [[root]]
+    depths = sorted(rng.choices(range(1, len(DEPTH_WEIGHTS) + 1), DEPTH_WEIGHTS, k=node_count - 1))
+    for i, depth in enumerate(depths, 1):
+        # Un nivel solo existe si el anterior tiene nodos
+        depth = min(depth, len(levels))
+        parent = rng.choice(levels[depth - 1])
+        node = {'id': str(i), 'parent': parent['id'], 'text': node_text(rng),
+                'guid': guid(rng), 'children': []}
+        parent['children'].append(node)
+        if depth == len(levels):
+            levels.append([])
+        levels[depth].append(node)
+    return root
+
+
+def iter_nodes(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node['children']))
+
+
+def make_map(rng, number, folders):
+    """Un mapa completo con los campos de data/maps"""
+    topic = ' '.join(rng.choices(VOCABULARY, k=rng.randint(1, 3)))
+    term = rng.choice(MEDICAL_TERMS)
+    title = f"{rng.choice(TITLE_PREFIXES)}. {term.capitalize()} y {topic}"
+    folder = rng.choice(folders)
+    node_count = sample_node_count(rng)
+    root = make_tree(rng, node_count, title)
+
+    relations = []
+    if node_count > 2 and rng.random() < RELATION_PROBABILITY:
+        for _ in range(rng.randint(1, 3)):
+            a, b = rng.sample(range(node_count), 2)
+            relations.append({'source': str(a), 'target': str(b), 'guid': guid(rng)})
+
+    return {
+        'id': f"map_{number}",
+        'title': title,
+        'specialty': FOLDER_TO_SPECIALTY.get(folder.split('/')[-1], 'General'),
+        'folder': folder,
+        'filename': title,
+        'tag': rng.choice(TAGS),
+        'node_count': node_count,
+        'guid': guid(rng),
+        'root': root,
+        'relations': relations,
+        'related_maps': [],
+    }
+
+
+def smmx_xml(map_data, rng):
+    """XML de SimpleMind (layout plano) con los topics algo desordenados"""
+    topics = ['<topic id=%s parent=%s guid=%s text=%s/>' % (
+        quoteattr(n['id']), quoteattr(n['parent']), quoteattr(n['guid']), quoteattr(n['text']))
+        for n in iter_nodes(map_data['root'])]
+    # SimpleMind escribe en orden de creación, no en preorden
+    for _ in range(len(topics) // 20):
+        i, j = rng.randrange(1, len(topics)), rng.randrange(1, len(topics))
+        topics[i], topics[j] = topics[j], topics[i]
+    relations = ['<relation source=%s target=%s guid=%s/>' % (
+        quoteattr(r['source']), quoteattr(r['target']), quoteattr(r['guid']))
+        for r in map_data['relations']]
+    return ('<?xml version="1.0" encoding="utf-8"?>\n'
+            '<simplemind-mindmaps generator="SimpleMind" doc-version="3"><mindmap>'
+            f'<meta><guid guid={quoteattr(map_data["guid"])}/>'
+            f'<title text={quoteattr(map_data["title"])}/></meta>'
+            '<topics>' + ''.join(topics) + '</topics>'
+            '<relations>' + ''.join(relations) + '</relations>'
+            '</mindmap></simplemind-mindmaps>')
+
+
+def tabbed_text(map_data):
+    """Esquema tabulado (formato de text_to_map.parse_tabbed_text)"""
+    lines = []
+    stack = [(map_data['root'], 0)]
+    while stack:
+        node, depth = stack.pop()
+        lines.append('\t' * depth + node['text'].replace('\\N', ' '))
+        stack.extend((c, depth + 1) for c in reversed(node['children']))
+    return '\n'.join(lines) + '\n'
+
+
+def generate(out_dir, size, sources=None, seed=SEED, compact=False, quiet=False):
+    """Escribe el corpus en out_dir; retorna un resumen con conteos y bytes"""
+    out_dir = Path(out_dir)
+    maps_dir = out_dir / "data" / "maps"
+    smmx_dir = out_dir / "smmx"
+    txt_dir = out_dir / "txt"
+    for d in (maps_dir, smmx_dir, txt_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    rng = random.Random(seed)
+    folders = [f"Entidades clínicas/{name}" for name in FOLDER_TO_SPECIALTY]
+    sources = min(size, 1000) if sources is None else min(sources, size)
+    # Los archivos fuente salen de mapas repartidos por todo el corpus
+    source_every = max(1, size // sources) if sources else 0
+
+    index = []
+    total_nodes = 0
+    written = {'maps': 0, 'smmx': 0, 'txt': 0}
+    sizes = {'maps': 0, 'smmx': 0, 'txt': 0}
+    for number in range(size):
+        map_data = make_map(rng, number, folders)
+        total_nodes += map_data['node_count']
+
+        payload = dumps(compact_map(map_data) if compact else map_data).encode('utf-8')
+        (maps_dir / f"{map_data['id']}.json").write_bytes(payload)
+        written['maps'] += 1
+        sizes['maps'] += len(payload)
+        index.append({field: map_data[field] for field in
+                      ('id', 'title', 'specialty', 'folder', 'filename', 'node_count', 'tag')})
+
+        if source_every and number % source_every == 0 and written['smmx'] < sources:
+            folder = smmx_dir / map_data['folder']
+            folder.mkdir(parents=True, exist_ok=True)
+            smmx = folder / f"{map_data['title'][:60]}-{number}.smmx"
+            with zipfile.ZipFile(smmx, 'w', zipfile.ZIP_DEFLATED) as z:
+                z.writestr('document/mindmap.xml', smmx_xml(map_data, rng))
+            txt = txt_dir / f"esquema-{number}.txt"
+            txt.write_text(tabbed_text(map_data), encoding='utf-8')
+            for kind, path in (('smmx', smmx), ('txt', txt)):
+                written[kind] += 1
+                sizes[kind] += path.stat().st_size
+
+        if not quiet and (number + 1) % 5000 == 0:
+            print(f"  ... {number + 1}/{size} mapas")
+
+    with open(out_dir / "data" / "maps_index.json", 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    return {'size': size, 'seed': seed, 'compact': compact, 'nodes': total_nodes,
+            'files': written, 'bytes': sizes}
+
+
+def parse_size(value):
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generar un corpus sintético de MedMaps')
+    parser.add_argument('--size', default='1k', help='Mapas: 1k, 10k, 50k o un número (default 1k)')
+    parser.add_argument('--out', required=True, help='Directorio de salida')
+    parser.add_argument('--sources', type=int,
+                        help='Cantidad de .smmx y .txt a generar (default min(size, 1000))')
+    parser.add_argument('--seed', type=int, default=SEED, help='Semilla (default %(default)s)')
+    parser.add_argument('--compact', action='store_true', help='Escribir los mapas en formato compacto')
+    args = parser.parse_args()
+
+    size = parse_size(args.size)
+    print(f"\n🧪 Generando corpus sintético: {size} mapas en {args.out}\n")
+    summary = generate(args.out, size, args.sources, args.seed, args.compact)
+    print(f"✅ Mapas: {summary['files']['maps']} ({summary['bytes']['maps'] / 1e6:.1f} MB, "
+          f"{summary['nodes']} nodos) | .smmx: {summary['files']['smmx']} | .txt: {summary['files']['txt']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+Regeneración de Artefactos Derivados - MedMaps
+
+Recorre data/maps/*.json una sola vez (en paralelo) y, a partir de esa
+pasada, regenera todo lo que publica el portal:
+
+- data/maps_index.json      Índice de mapas
+- data/stats.json           Estadísticas globales
+- data/specialties.json     Listado por especialidad
+- data/recent.json          Mapas agregados/actualizados recientemente
+- data/combined/*.json      Un bundle por especialidad
+
+El modo --build es incremental: .cache/build_manifest.json guarda el hash
+de contenido de cada mapa y de qué entradas salió cada artefacto, así que
+solo se releen los mapas modificados y solo se reescriben los artefactos
+afectados (p. ej. un mapa nuevo de Cardiología reescribe
+combined/cardiologia.json, el índice, specialties y stats, pero no el
+resto de los bundles). Las fechas de recent.json salen del feed de
+cambios (change_feed.py), leído desde la posición guardada en el manifiesto.
+
+Uso:
+    python build_artifacts.py --build              # Regenerar solo lo que cambió
+    python build_artifacts.py --rebuild            # Regenerar todo
+    python build_artifacts.py --rebuild --jobs 4   # Con 4 procesos
+"""
+
+import os
+import re
+import json
+import argparse
+import hashlib
+import unicodedata
+from pathlib import Path
+from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import index_store
+import change_feed
+from index_store import map_sort_key
+from compact_maps import expand_map
+
+MAPS_DIR = Path("data/maps")
+INDEX_FILE = Path("data/maps_index.json")
+STATS_FILE = Path("data/stats.json")
+SPECIALTIES_FILE = Path("data/specialties.json")
+RECENT_FILE = Path("data/recent.json")
+COMBINED_DIR = Path("data/combined")
+BUILD_MANIFEST = Path(".cache/build_manifest.json")
+
+# Ventanas de recent.json
+RECENT_DAYS_ADDED = 7
+RECENT_DAYS_UPDATED = 30
+RECENT_LIMIT = 30
+
+# Campos que se toman del mapa para la entrada del índice
+INDEX_FIELDS = ['id', 'title', 'specialty', 'folder', 'filename', 'node_count']
+# Campos editoriales que se conservan del índice anterior si el mapa no los trae
+CARRY_OVER_FIELDS = ['tag', 'access', 'related_maps', 'created_date']
+
+
+def specialty_slug(specialty):
+    """'Estudios Pivotales' → 'estudios_pivotales' (nombre del bundle)"""
+    text = unicodedata.normalize('NFKD', specialty)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    return re.sub(r'[^a-z0-9]+', '_', text).strip('_')
+
+
+def first_line(text):
+    """Primera línea de un texto de nodo SimpleMind"""
+    text = text.replace('\\N', '\n').replace('\\n', '\n')
+    for line in text.split('\n'):
+        if line.strip():
+            return line.strip()
+    return ''
+
+
+def parse_timestamp(value):
+    """Fecha ISO (o YYYY-MM-DD) de un mapa, o None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_map(map_file):
+    """Worker: lee un mapa y devuelve (resumen, JSON crudo)
+
+    El JSON crudo se reutiliza tal cual para los bundles combinados, sin
+    volver a serializar el árbol. El resumen es JSON-serializable para
+    poder guardarlo en el manifiesto de build.
+    """
+    try:
+        with open(map_file, 'rb') as f:
+            data = f.read()
+        raw = data.decode('utf-8')
+        map_data = expand_map(json.loads(raw))
+    except (OSError, ValueError):
+        return None, None
+
+    root = map_data.get('root') or {}
+    children = root.get('children') or []
+    st = map_file.stat()
+    created = parse_timestamp(map_data.get('created') or map_data.get('created_date'))
+
+    summary = {field: map_data.get(field) for field in INDEX_FIELDS}
+    summary['id'] = summary['id'] or map_file.stem
+    summary['specialty'] = summary['specialty'] or 'General'
+    summary['folder'] = summary['folder'] or ''
+    summary['filename'] = summary['filename'] or map_data.get('source_file', '')
+    summary['node_count'] = summary['node_count'] or 0
+    summary['has_references'] = bool(map_data.get('resolved_references')
+                                     or map_data.get('references'))
+    for field in CARRY_OVER_FIELDS:
+        if field in map_data:
+            summary[field] = map_data[field]
+
+    return {
+        'entry': summary,
+        'preview': first_line(children[0].get('text', '')) if children else '',
+        'updated_at': datetime.fromtimestamp(st.st_mtime).isoformat(timespec='seconds'),
+        'created_at': created.isoformat(timespec='seconds') if created else None,
+        'file': map_file.name,
+        'size': st.st_size,
+        'mtime': st.st_mtime_ns,
+        'sha1': hashlib.sha1(data).hexdigest(),
+    }, raw
+
+
+def list_map_files():
+    """Archivos de data/maps en orden de ID"""
+    return sorted(MAPS_DIR.glob("*.json"), key=lambda p: map_sort_key(p.stem))
+
+
+def iter_maps(files, jobs=1):
+    """Lee y resume los mapas dados, en orden, en paralelo si jobs > 1"""
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1:
+        for f in files:
+            yield summarize_map(f)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(summarize_map, files, chunksize=32)
+
+
+def write_json(path, data, indent=2):
+    """Escribe JSON de forma atómica"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp, path)
+
+
+def add_to_bundle(bundles, specialty, raw):
+    """Agrega un mapa (JSON crudo) al bundle combinado de su especialidad"""
+    slug = specialty_slug(specialty)
+    f = bundles.get(slug)
+    if f is None:
+        COMBINED_DIR.mkdir(parents=True, exist_ok=True)
+        f = open(COMBINED_DIR / f"{slug}.tmp", 'w', encoding='utf-8')
+        f.write('[')
+        bundles[slug] = f
+    else:
+        f.write(', ')
+    f.write(raw.strip())
+
+
+def close_bundles(bundles):
+    """Cierra los bundles y elimina los de especialidades que ya no existen"""
+    for slug, f in bundles.items():
+        f.write(']')
+        f.close()
+        os.replace(COMBINED_DIR / f"{slug}.tmp", COMBINED_DIR / f"{slug}.json")
+
+    for old in COMBINED_DIR.glob("*.json"):
+        if old.stem not in bundles:
+            old.unlink()
+
+    return sorted(bundles)
+
+
+def load_previous_index():
+    """Índice actual, para conservar campos editoriales (tag, acceso, enlaces)
+
+    Antes se compacta el journal de index_store, para no perder cambios
+    hechos por otras herramientas.
+    """
+    index_store.compact()
+    return {m['id']: m for m in index_store.load_index()}
+
+
+def update_feed_state(state):
+    """Aplica los eventos nuevos del feed de cambios sobre el estado del manifiesto
+
+    El estado guarda, por mapa, cuándo se agregó y cuándo cambió por última
+    vez, más la posición del feed hasta donde se leyó: cada build lee solo
+    los eventos nuevos. Retorna cuántos eventos se aplicaron.
+    """
+    events, state['offset'] = change_feed.read(state.get('offset', 0))
+    maps = state.setdefault('maps', {})
+    for e in events:
+        if e['ev'] == 'delete':
+            maps.pop(e['id'], None)
+            continue
+        times = maps.setdefault(e['id'], {})
+        if e['ev'] == 'add':
+            times['added'] = e['ts']
+        times['updated'] = e['ts']
+    return len(events)
+
+
+def build_recent(summaries, now, feed_maps=None):
+    """recent.json: agregados en los últimos N días y actualizados en los últimos M
+
+    Las fechas salen del feed de cambios; los mapas sin eventos (anteriores
+    al feed) usan su fecha de creación y el mtime del archivo.
+    """
+    added_since = now - timedelta(days=RECENT_DAYS_ADDED)
+    updated_since = now - timedelta(days=RECENT_DAYS_UPDATED)
+    feed_maps = feed_maps or {}
+
+    items = []
+    for s in summaries:
+        entry = s['entry']
+        times = feed_maps.get(entry['id'])
+        if times:
+            created_at = parse_timestamp(times.get('added') or s['created_at'])
+            updated_at = parse_timestamp(times['updated'])
+        else:
+            created_at = parse_timestamp(s['created_at'])
+            updated_at = parse_timestamp(s['updated_at'])
+        if created_at and created_at >= added_since:
+            change_type, changed_at = 'added', created_at
+        elif updated_at >= updated_since:
+            change_type, changed_at = 'updated', updated_at
+        else:
+            continue
+
+        items.append({
+            'id': entry['id'],
+            'title': entry['title'],
+            'specialty': entry['specialty'],
+            'folder': entry['folder'],
+            'change_type': change_type,
+            'updated_at': changed_at.isoformat(timespec='seconds'),
+            'updated_days_ago': (now - changed_at).days,
+            'node_count': entry['node_count'],
+            'preview': s['preview'],
+        })
+
+    items.sort(key=lambda x: x['updated_at'], reverse=True)
+    items = items[:RECENT_LIMIT]
+
+    return {
+        'generated_at': now.isoformat(timespec='seconds'),
+        'window_days_added': RECENT_DAYS_ADDED,
+        'window_days_updated': RECENT_DAYS_UPDATED,
+        'count': len(items),
+        'items': items,
+    }
+
+
+def load_build_manifest():
+    """Manifiesto del último build: mapas (firma + resumen) y artefactos"""
+    if not BUILD_MANIFEST.exists():
+        return {'maps': {}, 'outputs': {}}
+    try:
+        with open(BUILD_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'maps': {}, 'outputs': {}}
+
+
+def digest(data):
+    """Hash estable de una estructura JSON"""
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def write_if_changed(path, data, outputs, key, volatile=(), writer=None):
+    """Escribe un artefacto solo si su contenido (sin campos volátiles) cambió
+
+    `outputs` es el registro de artefactos del manifiesto; se actualiza con
+    el hash de lo escrito. Retorna True si se escribió.
+    """
+    stable = {k: v for k, v in data.items() if k not in volatile} if volatile else data
+    h = digest(stable)
+    if outputs.get(key) == h and path.exists():
+        return False
+    if writer:
+        writer(data)
+    else:
+        write_json(path, data)
+    outputs[key] = h
+    return True
+
+
+def write_bundle(slug, members, fresh_raw):
+    """Reescribe un bundle combinado leyendo solo los mapas de esa especialidad"""
+    bundles = {}
+    for s in members:
+        raw = fresh_raw.get(s['file'])
+        if raw is None:
+            with open(MAPS_DIR / s['file'], 'r', encoding='utf-8') as f:
+                raw = f.read()
+        add_to_bundle(bundles, s['entry']['specialty'], raw)
+
+    for f in bundles.values():
+        f.write(']')
+        f.close()
+    os.replace(COMBINED_DIR / f"{slug}.tmp", COMBINED_DIR / f"{slug}.json")
+
+
+def build(jobs=1, force=False):
+    """Regenera los artefactos derivados, solo los afectados salvo force=True
+
+    Con force se ignora el manifiesto y todo sale de una sola pasada en
+    streaming sobre data/maps (los bundles se escriben a medida que llegan
+    los mapas). Sin force, los mapas cuyo tamaño/mtime (o hash, si el mtime
+    cambió) coinciden con el manifiesto no se vuelven a leer.
+    """
+    print(f"\n🔄 {'REGENERANDO' if force else 'ACTUALIZANDO'} ARTEFACTOS DESDE data/maps\n")
+    print("=" * 60)
+
+    now = datetime.now()
+    previous = load_previous_index()
+    manifest = {'maps': {}, 'outputs': {}} if force else load_build_manifest()
+    old_maps = manifest['maps']
+    outputs = manifest['outputs']
+
+    # 1. Firmas: qué mapas hay que releer
+    files = list_map_files()
+    summaries = {}
+    to_read = []
+    for f in files:
+        st = f.stat()
+        cached = old_maps.get(f.stem)
+        if cached and cached['size'] == st.st_size and cached['mtime'] == st.st_mtime_ns:
+            summaries[f.stem] = cached
+        else:
+            to_read.append(f)
+
+    # 2. Releer solo esos (todos, con force)
+    errors = 0
+    changed_ids = set()
+    fresh_raw = {}
+    streamed = {}
+    for f, (summary, raw) in zip(to_read, iter_maps(to_read, jobs)):
+        if summary is None:
+            errors += 1
+            continue
+        summaries[f.stem] = summary
+        old = old_maps.get(f.stem)
+        if old and old['sha1'] == summary['sha1']:
+            continue  # solo cambió el mtime
+        changed_ids.add(f.stem)
+        if force:
+            add_to_bundle(streamed, summary['entry']['specialty'], raw)
+        else:
+            fresh_raw[f.name] = raw
+
+    removed_ids = set(old_maps) - set(summaries)
+    if removed_ids:
+        change_feed.append([change_feed.event(map_id, 'delete') for map_id in sorted(removed_ids)])
+    feed = manifest.setdefault('feed', {'offset': 0, 'maps': {}})
+    feed_events = update_feed_state(feed)
+
+    # 3. Índice y agrupación por especialidad (en memoria, a partir de resúmenes)
+    ordered = [summaries[f.stem] for f in files if f.stem in summaries]
+    index = []
+    by_specialty = defaultdict(list)
+    members = defaultdict(list)
+    for s in ordered:
+        entry = dict(s['entry'])
+        old = previous.get(entry['id'], {})
+        for field in CARRY_OVER_FIELDS:
+            if field not in entry and field in old:
+                entry[field] = old[field]
+        index.append(entry)
+        by_specialty[entry['specialty']].append(entry)
+        members[specialty_slug(entry['specialty'])].append(s)
+
+    # 4. Bundles: solo los de especialidades cuyos mapas cambiaron
+    rewritten = []
+    if force:
+        rewritten = close_bundles(streamed)
+        for slug, ms in members.items():
+            outputs[f"combined/{slug}.json"] = digest([(s['entry']['id'], s['sha1']) for s in ms])
+    else:
+        for slug, ms in members.items():
+            key = f"combined/{slug}.json"
+            h = digest([(s['entry']['id'], s['sha1']) for s in ms])
+            if outputs.get(key) == h and (COMBINED_DIR / f"{slug}.json").exists():
+                continue
+            write_bundle(slug, ms, fresh_raw)
+            outputs[key] = h
+            rewritten.append(slug)
+
+        for key in list(outputs):
+            if key.startswith('combined/') and Path(key).stem not in members:
+                (COMBINED_DIR / Path(key).name).unlink(missing_ok=True)
+                del outputs[key]
+
+    # 5. Artefactos globales: se reescriben solo si su contenido cambió
+    written = []
+    if write_if_changed(INDEX_FILE, index, outputs, 'maps_index.json',
+                        writer=index_store.replace_base):
+        written.append('maps_index.json')
+
+    specialties = {
+        spec: {
+            'count': len(maps),
+            'maps': [{k: m[k] for k in ['id', 'title', 'filename', 'node_count', 'folder']}
+                     for m in maps]
+        }
+        for spec, maps in by_specialty.items()
+    }
+    if write_if_changed(SPECIALTIES_FILE, specialties, outputs, 'specialties.json'):
+        written.append('specialties.json')
+
+    stats = {
+        'total_maps': len(index),
+        'specialties_count': len(by_specialty),
+        'specialties': {spec: len(maps) for spec, maps in by_specialty.items()},
+        'total_nodes': sum(m['node_count'] for m in index),
+        'maps_with_references': sum(1 for m in index if m['has_references']),
+        'last_sync': now.isoformat(),
+    }
+    if write_if_changed(STATS_FILE, stats, outputs, 'stats.json', volatile=('last_sync',)):
+        written.append('stats.json')
+
+    recent = build_recent(ordered, now, feed['maps'])
+    if write_if_changed(RECENT_FILE, recent, outputs, 'recent.json', volatile=('generated_at',)):
+        written.append('recent.json')
+
+    manifest['maps'] = {Path(s['file']).stem: s for s in ordered}
+    BUILD_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    write_json(BUILD_MANIFEST, manifest, indent=None)
+
+    print(f"📚 Mapas: {len(index)} ({len(changed_ids)} modificados, {len(removed_ids)} eliminados)")
+    print(f"📝 Eventos nuevos en el feed de cambios: {feed_events}")
+    if errors:
+        print(f"⚠️ Archivos ilegibles: {errors}")
+    print(f"📁 Especialidades: {len(by_specialty)}")
+    print(f"📦 Bundles reescritos: {', '.join(rewritten) if rewritten else 'ninguno'}")
+    print(f"📝 Artefactos reescritos: {', '.join(written) if written else 'ninguno'}")
+    print("\n✅ Artefactos al día")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerar artefactos derivados de data/maps')
+    parser.add_argument('--build', action='store_true', help='Regenerar solo lo que cambió')
+    parser.add_argument('--rebuild', action='store_true', help='Regenerar todos los artefactos')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Procesos para leer los mapas (0 = todos los núcleos)')
+
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build(args.jobs, force=True)
+    elif args.build:
+        build(args.jobs)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
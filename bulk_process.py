@@ -13,25 +13,48 @@ Uso:
     python bulk_process.py --scan              # Solo escanear y reportar
     python bulk_process.py --process           # Procesar todos los nuevos .smmx
     python bulk_process.py --process -n 50     # Procesar solo 50
-    python bulk_process.py --process-pdf       # Procesar PDFs
+    python bulk_process.py --process-pdf       # Procesar PDFs (extracción en paralelo, cacheada)
+    python bulk_process.py --process-pdf --pdf-workers 1  # Extraer PDFs de a uno
+    python bulk_process.py --scan --jobs 8     # Parsear .smmx en 8 procesos
+    python bulk_process.py --scan --dup-threshold 0.8  # Casi duplicados más estrictos
     python bulk_process.py --cleanup           # Reporte de limpieza
+    python bulk_process.py --process --profile # Tiempo por etapa/archivo (ver profiling.py)
 """
 
 import json
 import argparse
-import zipfile
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
-import re
 import subprocess
 import sys
+import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import index_store
+import change_feed
+import near_duplicates
+import profiling
+from smmx_parser import parse_smmx
 
 # Configuración
 DROPBOX_ESQUEMAS = Path("/sessions/bold-jolly-cerf/mnt/Dropbox/- Esquemas")
 MAPS_DIR = Path("data/maps")
-INDEX_FILE = Path("data/maps_index.json")
+SCAN_MANIFEST = Path(".cache/scan_manifest.json")
+# Campos del manifiesto que dependen solo del contenido (se reutilizan aunque
+# el archivo se mueva); la especialidad sale de la ruta y se recalcula siempre
+# ('tree_minhash' reemplaza a 'minhash', que se calculaba en orden del XML)
+MANIFEST_FIELDS = ('title', 'node_count', 'error', 'tree_minhash')
+PDF_CACHE_DIR = Path(".cache/pdf_text")
+
+# Extracción de PDF: pdf_to_mindmap solo mira las primeras 100 líneas,
+# que caben holgadamente en las primeras páginas
+PDF_PAGES = 5
+PDF_TIMEOUT = 30
+PDF_WORKERS = 4
 
 # Mapeo de carpetas a especialidades
 FOLDER_TO_SPECIALTY = {
@@ -76,16 +99,57 @@ TAG_KEYWORDS = {
 }
 
 def load_index():
-    """Carga el índice existente"""
-    if not INDEX_FILE.exists():
-        return []
-    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    """Carga el índice existente (base + journal)"""
+    return index_store.load_index()
 
-def save_index(data):
-    """Guarda el índice"""
-    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def load_manifest():
+    """Carga el manifiesto de escaneo (ruta → firma y resumen parseado)"""
+    if not SCAN_MANIFEST.exists():
+        return {}
+    try:
+        with open(SCAN_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Manifiesto corrupto: se reconstruye en el próximo escaneo
+        return {}
+
+def save_manifest(manifest):
+    """Guarda el manifiesto de forma atómica"""
+    SCAN_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    tmp = SCAN_MANIFEST.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, SCAN_MANIFEST)
+
+def file_hash(file_path):
+    """Hash SHA-1 del contenido de un archivo"""
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def lookup_manifest(file_path, manifest, by_hash):
+    """Busca el resumen cacheado de un archivo.
+
+    Primero por ruta + tamaño + mtime; si no coincide (Dropbox suele tocar
+    el mtime, o el archivo fue movido) se compara el hash del contenido.
+    Devuelve (entrada, firma) donde entrada es None si hay que parsear.
+    """
+    st = file_path.stat()
+    sig = {'size': st.st_size, 'mtime': st.st_mtime_ns}
+
+    entry = manifest.get(str(file_path))
+    if entry and entry['size'] == sig['size'] and entry['mtime'] == sig['mtime']:
+        sig['sha1'] = entry['sha1']
+        return entry, sig
+
+    sig['sha1'] = file_hash(file_path)
+    if entry and entry['sha1'] == sig['sha1']:
+        return entry, sig
+
+    cached = by_hash.get(sig['sha1'])
+    return cached, sig
 
 def get_specialty_from_path(file_path):
     """Determina la especialidad basándose en la ruta del archivo"""
@@ -116,144 +180,118 @@ def get_tag_from_content(title, text=""):
 
     return "📚 Revisión"  # Default
 
-def parse_smmx(file_path):
-    """Extrae el contenido de un archivo .smmx (SimpleMind)"""
+def _parse_smmx_one(f, timed=False):
+    """Parsea un .smmx; None si falla, aunque sea con un error que parse_smmx no prevé"""
+    t0 = time.perf_counter()
     try:
-        with zipfile.ZipFile(file_path, 'r') as z:
-            # Probar diferentes rutas de XML
-            xml_paths = ['document/mindmap.xml', 'document.xml', 'mindmap.xml']
-            xml_content = None
-
-            for xml_path in xml_paths:
+        parsed = parse_smmx(f)
+    except Exception as e:
+        print(f"⚠️ No se pudo parsear {f.name}: {e!r}")
+        parsed = None
+    return (parsed, time.perf_counter() - t0) if timed else parsed
+
+def _parse_smmx_chunk(files, timed=False):
+    """Worker del pool: parsea un lote de .smmx (con el tiempo de cada uno si timed)"""
+    return [_parse_smmx_one(f, timed) for f in files]
+
+def parse_smmx_many(files, jobs=1, chunk_size=16):
+    """Parsea varios .smmx, en paralelo si jobs > 1.
+
+    Devuelve una lista de resultados en el mismo orden que `files`
+    (None para los que fallaron), de modo que la asignación de IDs
+    posterior sea estable sin importar cuántos procesos se usen.
+    """
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    timed = profiling.enabled()
+    if jobs == 1 or len(files) < 2:
+        results = _parse_smmx_chunk(files, timed)
+    else:
+        chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_parse_smmx_chunk, chunk, timed) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
                 try:
-                    xml_content = z.read(xml_path)
-                    break
-                except KeyError:
-                    continue
-
-            if xml_content is None:
-                return None
-
-        root = ET.fromstring(xml_content)
-
-        # Buscar el elemento mindmap
-        mindmap = root.find('mindmap')
-        if mindmap is None:
-            mindmap = root  # Puede que sea la raíz directamente
-
-        # Obtener topics
-        topics_elem = mindmap.find('topics')
-        if topics_elem is None:
-            return None
-
-        topics_list = list(topics_elem)
-        if not topics_list:
-            return None
-
-        # Construir diccionario de topics
-        topics_dict = {}
-        for topic in topics_list:
-            topic_id = topic.attrib.get('id', '')
-            text = topic.attrib.get('text', '')
-            parent = topic.attrib.get('parent', '')
-            topics_dict[topic_id] = {
-                'text': text,
-                'parent': parent,
-                'children': []
-            }
-
-        # Construir árbol basado en parent
-        root_nodes = []
-        for topic_id, topic_data in topics_dict.items():
-            parent_id = topic_data['parent']
-            if parent_id and parent_id in topics_dict:
-                topics_dict[parent_id]['children'].append(topic_data)
-            elif not parent_id or parent_id not in topics_dict:
-                root_nodes.append(topic_data)
-
-        # Limpiar parent references
-        def clean_node(node):
-            result = {'text': node['text'], 'children': []}
-            for child in node['children']:
-                result['children'].append(clean_node(child))
-            return result
-
-        # Usar el primer root o crear uno
-        if root_nodes:
-            root_node = clean_node(root_nodes[0])
-            # Si hay múltiples roots, agregarlos como children
-            if len(root_nodes) > 1:
-                for r in root_nodes[1:]:
-                    root_node['children'].append(clean_node(r))
-        else:
-            return None
-
-        title = root_node['text'] or file_path.stem
-
-        # Contar nodos
-        def count_nodes(node):
-            return 1 + sum(count_nodes(c) for c in node.get('children', []))
-
-        node_count = count_nodes(root_node)
+                    results.extend(future.result())
+                except Exception:
+                    # Un worker caído no debe botar toda la corrida:
+                    # reintentar el lote aquí; un archivo que falla queda en None
+                    results.extend(_parse_smmx_one(f, timed) for f in chunk)
+
+    if timed:
+        # Tiempo por archivo (unzip + XML), medido dentro de cada worker
+        for f, (parsed, seconds) in zip(files, results):
+            profiling.record_file(f, seconds, 'parse', bytes=f.stat().st_size,
+                                  nodes=parsed['node_count'] if parsed else None)
+        results = [parsed for parsed, _ in results]
+
+    return results
+
+# Términos médicos relevantes para enlazar mapas
+MEDICAL_TERMS = [
+    "delirium", "demencia", "fragilidad", "sarcopenia", "caídas",
+    "insuficiencia cardíaca", "fibrilación", "hipertensión", "diabetes",
+    "erc", "diálisis", "anemia", "anticoagulación", "polifarmacia",
+    "depresión", "parkinson", "alzheimer", "stroke", "acv",
+    "neumonía", "sepsis", "shock", "ventilación", "iam", "sca",
+    "osteoporosis", "fractura", "cadera", "deglución", "disfagia",
+    "incontinencia", "deterioro cognitivo", "agitación"
+]
+
+def build_term_index(index):
+    """Índice invertido término → posiciones en `index` cuyo título lo contiene"""
+    term_index = defaultdict(list)
+    for pos, m in enumerate(index):
+        add_to_term_index(term_index, pos, m)
+    return term_index
+
+def add_to_term_index(term_index, pos, m):
+    """Registra en el índice invertido el mapa ubicado en index[pos]"""
+    m_title = m.get('title', '').lower()
+    for term in MEDICAL_TERMS:
+        if term in m_title:
+            term_index[term].append(pos)
+
+def find_related_maps(text, index, exclude_id=None, max_related=5, term_index=None):
+    """Encuentra mapas relacionados basándose en términos médicos
+
+    Solo se puntúan los mapas que comparten al menos un término con el
+    texto (vía el índice invertido); para procesar muchos archivos contra
+    el mismo índice, construirlo una vez con build_term_index().
+    """
+    if term_index is None:
+        term_index = build_term_index(index)
 
-        # Texto completo para búsqueda
-        def get_all_text(node):
-            text = node.get('text', '')
-            for c in node.get('children', []):
-                text += ' ' + get_all_text(c)
-            return text
-
-        full_text = get_all_text(root_node)
-
-        return {
-            'title': title,
-            'root': root_node,
-            'node_count': node_count,
-            'full_text': full_text
-        }
+    text_lower = text.lower()
 
-    except Exception as e:
-        return None
+    # Coincidencia de términos: +3 por cada término compartido
+    matches = defaultdict(int)
+    for term in MEDICAL_TERMS:
+        if term in text_lower:
+            for pos in term_index.get(term, ()):
+                matches[pos] += 1
 
-def find_related_maps(text, index, exclude_id=None, max_related=5):
-    """Encuentra mapas relacionados basándose en términos médicos"""
-    text_lower = text.lower()
     scores = []
-
-    # Términos médicos relevantes
-    medical_terms = [
-        "delirium", "demencia", "fragilidad", "sarcopenia", "caídas",
-        "insuficiencia cardíaca", "fibrilación", "hipertensión", "diabetes",
-        "erc", "diálisis", "anemia", "anticoagulación", "polifarmacia",
-        "depresión", "parkinson", "alzheimer", "stroke", "acv",
-        "neumonía", "sepsis", "shock", "ventilación", "iam", "sca",
-        "osteoporosis", "fractura", "cadera", "deglución", "disfagia",
-        "incontinencia", "deterioro cognitivo", "agitación"
-    ]
-
-    for m in index:
+    for pos, count in matches.items():
+        m = index[pos]
         if m['id'] == exclude_id:
             continue
 
-        score = 0
-        m_title = m.get('title', '').lower()
-
-        # Coincidencia de términos
-        for term in medical_terms:
-            if term in text_lower and term in m_title:
-                score += 3
+        score = 3 * count
 
         # Penalizar mapas genéricos
         if m.get('specialty') == 'General':
             score -= 1
 
         if score > 0:
-            scores.append((m['id'], m['title'], score))
+            scores.append((pos, m['id'], m['title'], score))
 
-    # Ordenar por score
-    scores.sort(key=lambda x: x[2], reverse=True)
+    # Ordenar por score (a igual score, respetar el orden del índice)
+    scores.sort(key=lambda x: (-x[3], x[0]))
 
-    return [{'id': s[0], 'title': s[1]} for s in scores[:max_related]]
+    return [{'id': s[1], 'title': s[2]} for s in scores[:max_related]]
 
 def scan_smmx_files():
     """Escanea todos los archivos .smmx en Dropbox"""
@@ -262,27 +300,96 @@ def scan_smmx_files():
     # Excluir backups y duplicados
     filtered = [f for f in all_files if "_Backup" not in str(f) and "_Duplicados" not in str(f)]
 
-    return filtered
+    # Orden estable: rglob depende del sistema de archivos
+    return sorted(filtered)
 
 def scan_pdf_files():
     """Escanea PDFs en la carpeta principal de Dropbox"""
-    return list(DROPBOX_ESQUEMAS.glob("*.pdf"))
+    return sorted(DROPBOX_ESQUEMAS.glob("*.pdf"))
 
-def get_existing_titles(index):
+def get_existing_titles():
     """Obtiene set de títulos existentes para detectar duplicados"""
-    return {m['title'].lower().strip() for m in index}
-
-def scan_and_report():
-    """Escanea y genera reporte sin procesar"""
+    return index_store.titles()
+
+def flag_near_duplicates(new_files, manifest, threshold, jobs=1):
+    """Separa de new_files los casi duplicados (MinHash + LSH, ver near_duplicates.py)
+
+    Un archivo nuevo es casi duplicado si se parece a un mapa del portal, o a
+    otro archivo nuevo que se conserva en su lugar (el de más nodos, fuera de
+    _Backup_Duplicados). Las firmas quedan guardadas en el manifiesto.
+    Retorna (nuevos que quedan, [(archivo, título, parecido a, similitud)]).
+    """
+    # Firmas que faltan (entradas de manifiestos anteriores): parsear una vez
+    missing = [f for f, parsed, _ in new_files
+               if 'tree_minhash' not in manifest[str(f)] and 'root' not in parsed]
+    with profiling.stage('parse'):
+        reparsed = dict(zip(missing, parse_smmx_many(missing, jobs)))
+
+    signatures = {}
+    for f, parsed, _ in new_files:
+        entry = manifest[str(f)]
+        if 'tree_minhash' not in entry:
+            full = parsed if 'root' in parsed else reparsed.get(f)
+            with profiling.stage('minhash'):
+                sig = near_duplicates.map_signature(full) if full else None
+            entry['tree_minhash'] = near_duplicates.encode(sig) if sig is not None else None
+        if entry['tree_minhash']:
+            signatures[str(f)] = near_duplicates.decode(entry['tree_minhash'])
+
+    with profiling.stage('minhash-corpus'):
+        corpus, titles = near_duplicates.corpus_signatures()
+    new_keys = set(signatures)
+    signatures.update(corpus)
+    with profiling.stage('lsh'):
+        pairs = near_duplicates.similar_pairs(signatures, threshold, only=new_keys)
+
+    by_path = {str(f): (f, parsed) for f, parsed, _ in new_files}
+    flagged = {}
+
+    # Contra el portal: el mapa ya existe
+    for k1, k2, sim in pairs:
+        new, old = (k1, k2) if k1 in new_keys else (k2, k1)
+        if old in corpus and (new not in flagged or flagged[new][1] < sim):
+            flagged[new] = (f"{old} ({titles.get(old, '')[:40]})", sim)
+
+    # Entre archivos nuevos: conservar uno por grupo
+    new_pairs = [p for p in pairs if p[0] in new_keys and p[1] in new_keys]
+    for group in near_duplicates.clusters(new_pairs):
+        group = [k for k in group if k not in flagged]
+        if len(group) < 2:
+            continue
+        keep = max(group, key=lambda k: ('_Backup_Duplicados' not in k,
+                                         by_path[k][1]['node_count'],
+                                         manifest[k]['mtime']))
+        for k in group:
+            if k != keep:
+                sim = near_duplicates.similarity(signatures[k], signatures[keep])
+                flagged[k] = (by_path[keep][0].name, sim)
+
+    remaining = [item for item in new_files if str(item[0]) not in flagged]
+    near = [(by_path[k][0], by_path[k][1]['title'], like, sim) for k, (like, sim) in flagged.items()]
+    near.sort(key=lambda n: -n[3])
+    return remaining, near
+
+def scan_and_report(jobs=1, full_scan=False, dup_threshold=near_duplicates.THRESHOLD):
+    """Escanea y genera reporte sin procesar.
+
+    Usa SCAN_MANIFEST para no volver a abrir los .smmx que no cambiaron;
+    full_scan=True ignora el manifiesto y lo reconstruye. Los archivos
+    nuevos que son casi duplicados (Jaccard ≥ dup_threshold) de un mapa
+    existente o de otro archivo nuevo se reportan y no se procesan.
+    """
     print("\n📊 ESCANEO DE ARCHIVOS EN DROPBOX\n")
     print("="*60)
 
-    index = load_index()
-    existing_titles = get_existing_titles(index)
+    with profiling.stage('index-load'):
+        index = load_index()
+        existing_titles = get_existing_titles()
 
     # SMMX files
-    smmx_files = scan_smmx_files()
-    pdf_files = scan_pdf_files()
+    with profiling.stage('scan'):
+        smmx_files = scan_smmx_files()
+        pdf_files = scan_pdf_files()
 
     print(f"Total archivos .smmx encontrados: {len(smmx_files)}")
     print(f"Total archivos .pdf encontrados: {len(pdf_files)}")
@@ -294,9 +401,44 @@ def scan_and_report():
     errors = []
     by_specialty = defaultdict(list)
 
-    for f in smmx_files:
-        parsed = parse_smmx(f)
+    # Solo se parsean los archivos nuevos o modificados desde el último escaneo
+    with profiling.stage('manifest'):
+        manifest = {} if full_scan else load_manifest()
+        by_hash = {e['sha1']: e for e in manifest.values()}
+        new_manifest = {}
+        summaries = [None] * len(smmx_files)
+        to_parse = []
+
+        for i, f in enumerate(smmx_files):
+            entry, sig = lookup_manifest(f, manifest, by_hash)
+            if entry is not None:
+                cached = {k: entry[k] for k in MANIFEST_FIELDS if k in entry}
+                new_manifest[str(f)] = {**cached, **sig}
+                summaries[i] = new_manifest[str(f)]
+            else:
+                to_parse.append((i, f, sig))
+
+    print(f"Sin cambios desde el último escaneo: {len(smmx_files) - len(to_parse)}")
+
+    with profiling.stage('parse'):
+        parsed_files = parse_smmx_many([f for _, f, _ in to_parse], jobs)
+
+    for (i, f, sig), parsed in zip(to_parse, parsed_files):
         if parsed is None:
+            entry = {'error': True}
+        else:
+            entry = {
+                'title': parsed['title'],
+                'node_count': parsed['node_count'],
+            }
+            # El árbol completo ya está en memoria: no volver a parsear al procesar
+            summaries[i] = parsed
+        new_manifest[str(f)] = {**entry, **sig}
+        if summaries[i] is None:
+            summaries[i] = new_manifest[str(f)]
+
+    for f, parsed in zip(smmx_files, summaries):
+        if parsed.get('error'):
             errors.append(f)
             continue
 
@@ -306,13 +448,33 @@ def scan_and_report():
         else:
             specialty = get_specialty_from_path(f)
             new_files.append((f, parsed, specialty))
-            by_specialty[specialty].append(f.name)
+
+    near = []
+    try:
+        new_files, near = flag_near_duplicates(new_files, new_manifest, dup_threshold, jobs)
+    except ImportError:
+        print("⚠️ Sin numpy no se buscan casi duplicados (pip install numpy)")
+    duplicates.extend((f, title) for f, title, _, _ in near)
+
+    with profiling.stage('manifest'):
+        save_manifest(new_manifest)
+
+    for f, parsed, specialty in new_files:
+        by_specialty[specialty].append(f.name)
 
     print(f"\n📁 ARCHIVOS SMMX:")
     print(f"  Nuevos para procesar: {len(new_files)}")
-    print(f"  Ya existentes: {len(duplicates)}")
+    print(f"  Ya existentes: {len(duplicates) - len(near)}")
+    print(f"  Casi duplicados (Jaccard ≥ {dup_threshold}): {len(near)}")
     print(f"  Con errores de lectura: {len(errors)}")
 
+    if near:
+        print("\n🧬 CASI DUPLICADOS (no se procesan):\n")
+        for f, title, like, sim in near[:10]:
+            print(f"  {sim:.2f}  {title[:40]}  ≈  {like}")
+        if len(near) > 10:
+            print(f"  ... y {len(near) - 10} más")
+
     print("\n📊 DISTRIBUCIÓN POR ESPECIALIDAD (nuevos):\n")
     for spec, files in sorted(by_specialty.items(), key=lambda x: -len(x[1])):
         print(f"  {spec}: {len(files)}")
@@ -336,30 +498,36 @@ def scan_and_report():
 
 def process_smmx_files(new_files, limit=None):
     """Procesa archivos SMMX nuevos y los agrega al portal"""
-    index = load_index()
-
-    # Determinar próximo ID
-    max_id = 0
-    for m in index:
-        match = re.search(r'map_(\d+)', m['id'])
-        if match:
-            max_id = max(max_id, int(match.group(1)))
+    with profiling.stage('index-load'):
+        index = load_index()
 
-    next_id = max_id + 1
     processed = 0
 
     files_to_process = new_files[:limit] if limit else new_files
+    with profiling.stage('link'):
+        term_index = build_term_index(index)
 
     print(f"\n🔄 PROCESANDO {len(files_to_process)} ARCHIVOS SMMX...\n")
 
     for f, parsed, specialty in files_to_process:
-        map_id = f"map_{next_id:04d}"
+        # Los archivos que venían del manifiesto solo traen el resumen
+        if 'root' not in parsed:
+            with profiling.stage('parse'):
+                parsed = parse_smmx_many([f])[0]
+            if parsed is None:
+                print(f"  ❌ No se pudo leer: {f.name[:40]}")
+                continue
+
+        # El ID se reserva recién con el mapa leído: un archivo ilegible no gasta uno
+        with profiling.stage('index'):
+            map_id = index_store.next_map_id()
 
-        # Determinar TAG
-        tag = get_tag_from_content(parsed['title'], parsed['full_text'])
+        with profiling.stage('link'):
+            # Determinar TAG
+            tag = get_tag_from_content(parsed['title'], parsed['full_text'])
 
-        # Encontrar mapas relacionados
-        related = find_related_maps(parsed['full_text'], index, map_id)
+            # Encontrar mapas relacionados
+            related = find_related_maps(parsed['full_text'], index, map_id, term_index=term_index)
 
         # Crear estructura del mapa
         map_data = {
@@ -368,52 +536,63 @@ def process_smmx_files(new_files, limit=None):
             'specialty': specialty,
             'tag': tag,
             'node_count': parsed['node_count'],
+            'guid': parsed['guid'],
             'root': parsed['root'],
+            'relations': parsed['relations'],
             'related_maps': related,
             'source_file': f.name,
             'created': datetime.now().isoformat()
         }
 
         # Guardar archivo JSON
-        map_file = MAPS_DIR / f"{map_id}.json"
-        with open(map_file, 'w', encoding='utf-8') as out:
-            json.dump(map_data, out, ensure_ascii=False, indent=2)
+        t0 = time.perf_counter()
+        with profiling.stage('write'):
+            map_file = MAPS_DIR / f"{map_id}.json"
+            content = json.dumps(map_data, ensure_ascii=False, separators=(',', ':'))
+            with open(map_file, 'w', encoding='utf-8') as out:
+                out.write(content)
+        profiling.record_file(f, time.perf_counter() - t0, 'write', map_id=map_id)
 
         # Agregar al índice
-        index.append({
-            'id': map_id,
-            'title': parsed['title'],
-            'specialty': specialty,
-            'tag': tag,
-            'node_count': parsed['node_count'],
-            'related_maps': related,
-            'access': 'free'
-        })
+        with profiling.stage('index'):
+            index.append({
+                'id': map_id,
+                'title': parsed['title'],
+                'specialty': specialty,
+                'tag': tag,
+                'node_count': parsed['node_count'],
+                'related_maps': related,
+                'access': 'free'
+            })
+            add_to_term_index(term_index, len(index) - 1, index[-1])
+            index_store.put(index[-1])
+            change_feed.record(map_id, 'add', digest=change_feed.content_hash(content))
 
         print(f"  ✅ {map_id}: {parsed['title'][:40]}... [{specialty}]")
 
-        next_id += 1
         processed += 1
-
-    # Guardar índice actualizado
-    save_index(index)
+        profiling.count('maps')
 
     print(f"\n✅ PROCESADOS: {processed} mapas")
     print(f"📊 Total en portal: {len(index)} mapas")
 
     return processed
 
-def extract_pdf_text(pdf_path):
-    """Extrae texto de un PDF usando pdftotext o PyPDF2"""
+def extract_pdf_text(pdf_path, pages=PDF_PAGES):
+    """Extrae el texto de las primeras `pages` páginas de un PDF (pdftotext o PyPDF2)
+
+    pdf_to_mindmap solo usa las primeras 100 líneas, así que no tiene
+    sentido extraer el documento completo.
+    """
     try:
         # Intentar con pdftotext (más rápido)
         result = subprocess.run(
-            ['pdftotext', '-layout', str(pdf_path), '-'],
-            capture_output=True, text=True, timeout=30
+            ['pdftotext', '-layout', '-f', '1', '-l', str(pages), str(pdf_path), '-'],
+            capture_output=True, text=True, timeout=PDF_TIMEOUT
         )
         if result.returncode == 0 and result.stdout.strip():
             return result.stdout
-    except:
+    except (OSError, subprocess.SubprocessError):
         pass
 
     # Fallback a PyPDF2
@@ -422,14 +601,56 @@ def extract_pdf_text(pdf_path):
         with open(pdf_path, 'rb') as f:
             reader = PyPDF2.PdfReader(f)
             text = ''
-            for page in reader.pages[:20]:  # Limitar a 20 páginas
-                text += page.extract_text() + '\n'
-            return text
-    except:
+            for page in reader.pages[:pages]:
+                text += (page.extract_text() or '') + '\n'
+            return text if text.strip() else None
+    except Exception:
         pass
 
     return None
 
+def cached_pdf_text(pdf_path, pages=PDF_PAGES):
+    """Texto del PDF desde .cache/pdf_text (clave: SHA-1 del contenido + páginas)
+
+    Solo se cachean las extracciones exitosas: un PDF que falló (timeout,
+    herramienta ausente) se reintenta en la próxima corrida.
+    """
+    try:
+        cache_file = PDF_CACHE_DIR / f"{file_hash(pdf_path)}-p{pages}.txt"
+    except OSError:
+        return None
+    if cache_file.exists():
+        return cache_file.read_text(encoding='utf-8')
+
+    t0 = time.perf_counter()
+    text = extract_pdf_text(pdf_path, pages)
+    profiling.record_file(pdf_path, time.perf_counter() - t0, 'extract', ok=bool(text))
+    if text:
+        PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, cache_file)
+    return text
+
+def extract_pdfs(pdf_files, jobs=PDF_WORKERS):
+    """Genera (pdf_path, texto) en el orden de `pdf_files`, extrayendo en paralelo.
+
+    Los hilos solo esperan a pdftotext (un proceso aparte por archivo), así
+    que un PDF lento ocupa un hilo hasta su timeout mientras los demás
+    siguen avanzando.
+    """
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(pdf_files) < 2:
+        for pdf_path in pdf_files:
+            yield pdf_path, cached_pdf_text(pdf_path)
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(cached_pdf_text, p) for p in pdf_files]
+        for pdf_path, future in zip(pdf_files, futures):
+            yield pdf_path, future.result()
+
 def pdf_to_mindmap(pdf_path, text):
     """Convierte texto de PDF a estructura de mapa mental"""
     lines = text.split('\n')
@@ -471,40 +692,41 @@ def pdf_to_mindmap(pdf_path, text):
 
     return root, title
 
-def process_pdf_files(pdf_files, limit=None):
-    """Procesa archivos PDF y los convierte a mapas mentales"""
-    index = load_index()
-    existing_titles = get_existing_titles(index)
+def process_pdf_files(pdf_files, limit=None, jobs=PDF_WORKERS):
+    """Procesa archivos PDF y los convierte a mapas mentales
 
-    # Determinar próximo ID
-    max_id = 0
-    for m in index:
-        match = re.search(r'map_(\d+)', m['id'])
-        if match:
-            max_id = max(max_id, int(match.group(1)))
+    Los PDF cuyo título ya está en el índice se descartan antes de extraer
+    texto; el resto se extrae en paralelo (ver extract_pdfs).
+    """
+    with profiling.stage('index-load'):
+        index = load_index()
+        existing_titles = get_existing_titles()
 
-    next_id = max_id + 1
     processed = 0
 
     files_to_process = pdf_files[:limit] if limit else pdf_files
+    with profiling.stage('link'):
+        term_index = build_term_index(index)
 
     print(f"\n🔄 PROCESANDO {len(files_to_process)} ARCHIVOS PDF...\n")
 
+    # Verificar que no existan ya, antes de extraer nada
+    pending = []
     for pdf_path in files_to_process:
-        # Verificar que no exista ya
-        title_check = pdf_path.stem.lower()
-        if title_check in existing_titles:
+        if pdf_path.stem.lower() in existing_titles:
             print(f"  ⏭️ Ya existe: {pdf_path.stem[:40]}")
-            continue
+        else:
+            pending.append(pdf_path)
 
-        # Extraer texto
-        text = extract_pdf_text(pdf_path)
+    # El tiempo de esperar a los hilos de extracción se carga a 'extract'
+    for pdf_path, text in profiling.timed_iter(extract_pdfs(pending, jobs), 'extract'):
         if not text:
             print(f"  ❌ No se pudo leer: {pdf_path.stem[:40]}")
             continue
 
         # Convertir a mapa mental
-        root, title = pdf_to_mindmap(pdf_path, text)
+        with profiling.stage('mindmap'):
+            root, title = pdf_to_mindmap(pdf_path, text)
 
         # Determinar especialidad del nombre
         specialty = get_specialty_from_path(pdf_path)
@@ -526,17 +748,19 @@ def process_pdf_files(pdf_files, limit=None):
         elif 'nefro' in name_lower:
             specialty = 'Nefrología'
 
-        map_id = f"map_{next_id:04d}"
+        with profiling.stage('index'):
+            map_id = index_store.next_map_id()
 
         # Contar nodos
         def count_nodes(node):
             return 1 + sum(count_nodes(c) for c in node.get('children', []))
 
         node_count = count_nodes(root)
-        tag = get_tag_from_content(title, text[:500])
+        with profiling.stage('link'):
+            tag = get_tag_from_content(title, text[:500])
 
-        # Encontrar mapas relacionados
-        related = find_related_maps(text[:1000], index, map_id)
+            # Encontrar mapas relacionados
+            related = find_related_maps(text[:1000], index, map_id, term_index=term_index)
 
         # Crear estructura del mapa
         map_data = {
@@ -553,32 +777,35 @@ def process_pdf_files(pdf_files, limit=None):
         }
 
         # Guardar archivo JSON
-        map_file = MAPS_DIR / f"{map_id}.json"
-        with open(map_file, 'w', encoding='utf-8') as out:
-            json.dump(map_data, out, ensure_ascii=False, indent=2)
+        with profiling.stage('write'):
+            map_file = MAPS_DIR / f"{map_id}.json"
+            content = json.dumps(map_data, ensure_ascii=False, separators=(',', ':'))
+            with open(map_file, 'w', encoding='utf-8') as out:
+                out.write(content)
 
         # Agregar al índice
-        index.append({
-            'id': map_id,
-            'title': title,
-            'specialty': specialty,
-            'tag': tag,
-            'node_count': node_count,
-            'related_maps': related,
-            'access': 'free'
-        })
+        with profiling.stage('index'):
+            index.append({
+                'id': map_id,
+                'title': title,
+                'specialty': specialty,
+                'tag': tag,
+                'node_count': node_count,
+                'related_maps': related,
+                'access': 'free'
+            })
+            add_to_term_index(term_index, len(index) - 1, index[-1])
+            index_store.put(index[-1])
+            change_feed.record(map_id, 'add', digest=change_feed.content_hash(content))
 
         print(f"  ✅ {map_id}: {title[:40]}... [{specialty}]")
 
-        next_id += 1
         processed += 1
+        profiling.count('maps')
 
         # Actualizar títulos existentes
         existing_titles.add(title.lower())
 
-    # Guardar índice actualizado
-    save_index(index)
-
     print(f"\n✅ PROCESADOS: {processed} PDFs convertidos a mapas")
     print(f"📊 Total en portal: {len(index)} mapas")
 
@@ -618,21 +845,12 @@ def cleanup_report():
     print("  2. La carpeta _Backup_Duplicados puede eliminarse después de verificar")
     print("  3. Los archivos .smmx ya procesados permanecen como fuente")
 
-def main():
-    parser = argparse.ArgumentParser(description='Procesamiento masivo de mapas')
-    parser.add_argument('--scan', action='store_true', help='Solo escanear y reportar')
-    parser.add_argument('--process', action='store_true', help='Procesar archivos SMMX nuevos')
-    parser.add_argument('--process-pdf', action='store_true', help='Procesar archivos PDF')
-    parser.add_argument('-n', '--limit', type=int, help='Limitar cantidad a procesar')
-    parser.add_argument('--cleanup', action='store_true', help='Reporte de limpieza')
-    parser.add_argument('--auto', action='store_true', help='Procesar sin confirmación')
-
-    args = parser.parse_args()
-
+def run(args, parser):
+    """Ejecuta la acción pedida en la línea de comandos"""
     if args.scan:
-        scan_and_report()
+        scan_and_report(args.jobs, args.full_scan, args.dup_threshold)
     elif args.process:
-        new_files, _, _, _ = scan_and_report()
+        new_files, _, _, _ = scan_and_report(args.jobs, args.full_scan, args.dup_threshold)
         if new_files:
             if args.auto:
                 process_smmx_files(new_files, args.limit)
@@ -641,18 +859,45 @@ def main():
                 if confirm.lower() == 's':
                     process_smmx_files(new_files, args.limit)
     elif args.process_pdf:
-        _, _, _, pdf_files = scan_and_report()
+        _, _, _, pdf_files = scan_and_report(args.jobs, args.full_scan, args.dup_threshold)
         if pdf_files:
             if args.auto:
-                process_pdf_files(pdf_files, args.limit)
+                process_pdf_files(pdf_files, args.limit, args.pdf_workers)
             else:
                 confirm = input(f"\n¿Procesar {args.limit or len(pdf_files)} PDFs? (s/n): ")
                 if confirm.lower() == 's':
-                    process_pdf_files(pdf_files, args.limit)
+                    process_pdf_files(pdf_files, args.limit, args.pdf_workers)
     elif args.cleanup:
         cleanup_report()
     else:
         parser.print_help()
 
+def main():
+    parser = argparse.ArgumentParser(description='Procesamiento masivo de mapas')
+    parser.add_argument('--scan', action='store_true', help='Solo escanear y reportar')
+    parser.add_argument('--process', action='store_true', help='Procesar archivos SMMX nuevos')
+    parser.add_argument('--process-pdf', action='store_true', help='Procesar archivos PDF')
+    parser.add_argument('-n', '--limit', type=int, help='Limitar cantidad a procesar')
+    parser.add_argument('--cleanup', action='store_true', help='Reporte de limpieza')
+    parser.add_argument('--auto', action='store_true', help='Procesar sin confirmación')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Procesos para parsear .smmx (0 = todos los núcleos)')
+    parser.add_argument('--pdf-workers', type=int, default=PDF_WORKERS,
+                        help='Hilos para extraer texto de PDF (0 = todos los núcleos, default %(default)s)')
+    parser.add_argument('--full-scan', action='store_true',
+                        help='Ignorar el manifiesto y volver a parsear todo')
+    parser.add_argument('--dup-threshold', type=float, default=near_duplicates.THRESHOLD,
+                        help='Jaccard mínimo para marcar casi duplicados (default %(default)s)')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    try:
+        with profiling.from_args('bulk_process', args):
+            run(args, parser)
+    finally:
+        # El sitio lee maps_index.json: no dejar cambios solo en el journal
+        index_store.compact_pending()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Feed de Cambios de Mapas - MedMaps
+
+Registro append-only de todo lo que cambia en data/maps: cada herramienta
+que escribe un mapa (text_to_map, process_inbox, bulk_process, review_maps)
+agrega una línea a data/changes.jsonl:
+
+    {"ts": "2026-05-01T10:12:03", "id": "map_0042", "ev": "reclassify",
+     "fields": ["specialty"], "hash": "3f9a0c1d2e4b5a69"}
+
+- ev: add | edit | reclassify | link | delete
+- fields: campos que cambiaron (vacío en add)
+- hash: sha1 (16 hex) del JSON escrito en data/maps
+
+El feed nunca se reescribe, así que una posición en bytes identifica un
+punto de la historia. Los consumidores (recent.json en build_artifacts,
+sync_notion) guardan hasta dónde leyeron y en la siguiente corrida leen
+solo lo nuevo con read(offset): el costo es O(cambios), no O(corpus).
+Cada consumidor guarda la posición junto con su propio estado (manifiesto
+de build, ledger de Notion), así ambos se pierden o se conservan juntos.
+
+El feed es estado local, como esas posiciones: no se versiona (.gitignore)
+ni se publica (publish_maps.py solo comprime mapas y artefactos). Los
+consumidores no dependen de que esté completo: sync_notion compara hashes
+de todos los mapas y build_artifacts usa el mtime si un mapa no tiene eventos.
+
+Uso:
+    python change_feed.py --tail 20          # Últimos eventos
+    python change_feed.py --since 1024       # Eventos desde una posición
+    python change_feed.py --status           # Eventos por tipo
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+FEED_FILE = Path("data/changes.jsonl")
+
+EVENTS = ('add', 'edit', 'reclassify', 'link', 'delete')
+HASH_CHARS = 16
+
+
+def content_hash(data):
+    """Hash corto del contenido escrito (bytes o str)"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:HASH_CHARS]
+
+
+def event(map_id, kind, fields=None, digest=None):
+    """Evento del feed (sin escribir); ver append()"""
+    if kind not in EVENTS:
+        raise ValueError(f"Evento desconocido: {kind}")
+    return {
+        'ts': datetime.now().isoformat(timespec='seconds'),
+        'id': map_id,
+        'ev': kind,
+        'fields': sorted(fields or []),
+        'hash': digest,
+    }
+
+
+def append(events):
+    """Agrega eventos al feed (una escritura, bajo lock)"""
+    if not events:
+        return
+    lines = ''.join(json.dumps(e, ensure_ascii=False, separators=(',', ':')) + '\n'
+                    for e in events)
+    FEED_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(FEED_FILE, 'a', encoding='utf-8') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def record(map_id, kind, fields=None, digest=None):
+    """Registra un cambio de un mapa"""
+    append([event(map_id, kind, fields, digest)])
+
+
+def end_offset():
+    """Posición del final del feed (para empezar a consumir desde 'ahora')"""
+    try:
+        return FEED_FILE.stat().st_size
+    except OSError:
+        return 0
+
+
+def read(offset=0):
+    """Eventos desde `offset`. Retorna (eventos, nueva posición).
+
+    Una última línea incompleta (escritura en curso o corte abrupto) no se
+    consume: queda para la próxima lectura. Si el feed es más corto que
+    `offset` (se borró o reemplazó) se lee desde el principio.
+    """
+    if not FEED_FILE.exists():
+        return [], 0
+    events = []
+    with open(FEED_FILE, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if offset > f.tell():
+            offset = 0
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events, offset
+
+
+def changed_ids(events, kinds=None):
+    """IDs tocados por los eventos (en orden de primera aparición)"""
+    return list(dict.fromkeys(e['id'] for e in events if kinds is None or e['ev'] in kinds))
+
+
+def print_events(events):
+    for e in events:
+        fields = f" [{', '.join(e.get('fields') or [])}]" if e.get('fields') else ''
+        print(f"  {e['ts']}  {e['ev']:<10} {e['id']}{fields}  {e.get('hash') or ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Feed de cambios de mapas')
+    parser.add_argument('--tail', type=int, metavar='N', help='Mostrar los últimos N eventos')
+    parser.add_argument('--since', type=int, metavar='OFFSET', help='Mostrar eventos desde una posición')
+    parser.add_argument('--status', action='store_true', help='Tamaño del feed y eventos por tipo')
+
+    args = parser.parse_args()
+
+    if args.tail is not None:
+        events, _ = read(0)
+        print_events(events[-args.tail:] if args.tail else [])
+    elif args.since is not None:
+        events, offset = read(args.since)
+        print_events(events)
+        print(f"\n📍 Siguiente posición: {offset}")
+    elif args.status:
+        events, end = read(0)
+        print(f"📝 Eventos en el feed: {len(events)} ({end} bytes)")
+        by_kind = {}
+        for e in events:
+            by_kind[e['ev']] = by_kind.get(e['ev'], 0) + 1
+        for kind, n in sorted(by_kind.items(), key=lambda x: -x[1]):
+            print(f"  {kind}: {n}")
+        print(f"🗺️  Mapas distintos: {len(changed_ids(events))}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Formato Compacto de Nodos - MedMaps
+
+Esquema opcional para data/maps/*.json: en vez del árbol anidado en `root`
+(cada nodo con id, parent, text, guid y children), el mapa guarda `nodes`
+con columnas paralelas en preorden:
+
+    "nodes": {
+        "v": 1,
+        "fields": ["id", "parent", "text", "guid", "children"],
+        "parent": [-1, 0, 1, 1, 0, ...],      índice del padre (-1 = raíz)
+        "text": ["...", ...],
+        "guid": ["...", "", ...],
+        "id": {"17": "x9"},                   solo IDs distintos de su índice
+        "parent_id": {}                       solo `parent` distinto del ID del padre
+    }
+
+`fields` conserva qué claves (y en qué orden) tenía cada nodo, así que la
+conversión es reversible sin pérdida. js/data-loader.js reconstruye el árbol
+al cargar el mapa; las herramientas de Python usan expand_map().
+
+Uso:
+    python compact_maps.py --compact              # data/maps → formato compacto
+    python compact_maps.py --expand               # formato compacto → árbol
+    python compact_maps.py --check                # Verificar ida y vuelta
+    python compact_maps.py --compact map_12 map_7 # Solo esos mapas
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+
+MAPS_DIR = Path("data/maps")
+
+FORMAT_VERSION = 1
+NODE_FIELDS = {'id', 'parent', 'text', 'guid', 'children'}
+
+
+def is_compact(map_data):
+    return 'nodes' in map_data and 'root' not in map_data
+
+
+def encode_tree(root):
+    """Árbol anidado → columnas; ValueError si los nodos no son uniformes"""
+    fields = list(root)
+    if 'children' not in fields or not set(fields) <= NODE_FIELDS:
+        raise ValueError(f"Campos de nodo no soportados: {fields}")
+    field_set = set(fields)
+    has_id = 'id' in field_set
+
+    parents = []
+    columns = {f: [] for f in ('text', 'guid') if f in field_set}
+    ids = {}
+    parent_ids = {}
+
+    stack = [(root, -1)]
+    while stack:
+        node, p = stack.pop()
+        if node.keys() != field_set:
+            raise ValueError(f"Nodo con campos distintos: {list(node)}")
+        i = len(parents)
+        parents.append(p)
+        for f, col in columns.items():
+            col.append(node[f])
+        if has_id and node['id'] != str(i):
+            ids[str(i)] = node['id']
+        if 'parent' in field_set:
+            expected = '-1' if p < 0 else (ids.get(str(p), str(p)) if has_id else None)
+            if node['parent'] != expected:
+                parent_ids[str(i)] = node['parent']
+        for child in reversed(node['children']):
+            stack.append((child, i))
+
+    nodes = {'v': FORMAT_VERSION, 'fields': fields, 'parent': parents}
+    nodes.update(columns)
+    if has_id:
+        nodes['id'] = ids
+    if 'parent' in field_set:
+        nodes['parent_id'] = parent_ids
+    return nodes
+
+
+def decode_tree(nodes):
+    """Columnas → árbol anidado (la raíz)"""
+    if nodes.get('v') != FORMAT_VERSION:
+        raise ValueError(f"Versión de formato no soportada: {nodes.get('v')}")
+    fields = nodes['fields']
+    parents = nodes['parent']
+    ids = nodes.get('id', {})
+    parent_ids = nodes.get('parent_id', {})
+    texts = nodes.get('text')
+    guids = nodes.get('guid')
+
+    built = []
+    for i, p in enumerate(parents):
+        key = str(i)
+        node = {}
+        for f in fields:
+            if f == 'id':
+                node['id'] = ids.get(key, key)
+            elif f == 'parent':
+                if key in parent_ids:
+                    node['parent'] = parent_ids[key]
+                else:
+                    # Sin campo 'id' encode_tree espera None (ver expected)
+                    node['parent'] = '-1' if p < 0 else built[p].get('id')
+            elif f == 'text':
+                node['text'] = texts[i]
+            elif f == 'guid':
+                node['guid'] = guids[i]
+            else:
+                node['children'] = []
+        built.append(node)
+        if p >= 0:
+            built[p]['children'].append(node)
+
+    return built[0] if built else {}
+
+
+def _replace_key(data, old, new, value):
+    """Copia de `data` con la clave `old` reemplazada por `new`, en el mismo lugar"""
+    return {(new if k == old else k): (value if k == old else v) for k, v in data.items()}
+
+
+def compact_map(map_data):
+    """Mapa con `root` → mapa con `nodes` (sin cambios si ya es compacto o no tiene root)"""
+    if is_compact(map_data) or not map_data.get('root'):
+        return map_data
+    return _replace_key(map_data, 'root', 'nodes', encode_tree(map_data['root']))
+
+
+def expand_map(map_data):
+    """Mapa con `nodes` → mapa con `root` (sin cambios si ya es un árbol)"""
+    if not is_compact(map_data):
+        return map_data
+    return _replace_key(map_data, 'nodes', 'root', decode_tree(map_data['nodes']))
+
+
+def dumps(map_data):
+    return json.dumps(map_data, ensure_ascii=False, separators=(',', ':'))
+
+
+def resolve_files(names):
+    if not names:
+        return sorted(MAPS_DIR.glob("*.json"))
+    return [MAPS_DIR / (n if n.endswith('.json') else f"{n}.json") for n in names]
+
+
+def convert(files, to_compact):
+    """Convierte archivos de mapa en su lugar; retorna (convertidos, bytes antes, bytes después)"""
+    converted = 0
+    before = after = 0
+    for f in files:
+        try:
+            data = f.read_bytes()
+            map_data = json.loads(data)
+            new = compact_map(map_data) if to_compact else expand_map(map_data)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ {f.name}: {e}")
+            continue
+        if new is map_data:
+            continue
+
+        payload = dumps(new).encode('utf-8')
+        tmp = f.with_suffix('.tmp')
+        tmp.write_bytes(payload)
+        os.replace(tmp, f)
+        converted += 1
+        before += len(data)
+        after += len(payload)
+    return converted, before, after
+
+
+def check(files):
+    """Verifica que compactar y expandir devuelva exactamente el mismo mapa"""
+    ok = failed = skipped = 0
+    tree_bytes = compact_bytes = 0
+    for f in files:
+        map_data = expand_map(json.loads(f.read_bytes()))
+        try:
+            compact = compact_map(map_data)
+        except ValueError as e:
+            skipped += 1
+            print(f"  ⏭️ {f.name}: {e}")
+            continue
+        restored = expand_map(json.loads(dumps(compact)))
+        if restored == map_data and list(restored) == list(map_data):
+            ok += 1
+        else:
+            failed += 1
+            print(f"  ❌ {f.name}: la ida y vuelta no es idéntica")
+        tree_bytes += len(dumps(map_data).encode('utf-8'))
+        compact_bytes += len(dumps(compact).encode('utf-8'))
+
+    print(f"\n✅ Idénticos: {ok} | ❌ Distintos: {failed} | ⏭️ No convertibles: {skipped}")
+    if tree_bytes:
+        print(f"📦 Árbol: {tree_bytes / 1e6:.1f} MB → compacto: {compact_bytes / 1e6:.1f} MB "
+              f"(-{100 * (1 - compact_bytes / tree_bytes):.0f}%)")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Formato compacto (columnar) de los nodos de un mapa')
+    parser.add_argument('maps', nargs='*', help='IDs de mapas (por defecto todo data/maps)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--compact', action='store_true', help='Convertir a formato compacto')
+    group.add_argument('--expand', action='store_true', help='Convertir al árbol anidado')
+    group.add_argument('--check', action='store_true', help='Verificar ida y vuelta sin escribir')
+
+    args = parser.parse_args()
+    files = resolve_files(args.maps)
+
+    if args.check:
+        check(files)
+    elif args.compact or args.expand:
+        converted, before, after = convert(files, to_compact=args.compact)
+        print(f"✅ Mapas convertidos: {converted}")
+        if before:
+            print(f"📦 {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Almacén del Índice de Mapas - MedMaps
+
+Acceso concurrente y seguro a data/maps_index.json para todas las
+herramientas (text_to_map, process_inbox, bulk_process, review_maps,
+build_artifacts, sync_notion, search_maps).
+
+En vez de reescribir el índice completo en cada cambio, las escrituras
+agregan una línea a un journal (data/maps_index.journal) bajo un lock de
+archivo. Al leer se aplica el journal sobre el índice base. El sitio lee
+maps_index.json directamente, así que el journal se compacta al terminar
+cada sesión de escritura (compact_pending), al publicar (build_artifacts.py,
+publish_maps.py), cuando crece demasiado, o con
+`python index_store.py --compact`. El journal y el contador son locales y
+no se versionan.
+
+Operaciones del journal (una por línea, JSON):
+    {"op": "put", "entry": {...}}                 Agrega o reemplaza una entrada
+    {"op": "patch", "id": "...", "fields": {...}} Actualiza campos de una entrada
+    {"op": "delete", "id": "..."}                 Elimina una entrada
+
+Dentro de un proceso el índice se parsea una sola vez y se reutiliza mientras
+no cambien maps_index.json ni el journal (mtime y tamaño), con búsqueda
+directa por ID (get) y por título (find_by_title). Los IDs nuevos siguen al
+mayor número entre un contador persistente (data/maps_index.counter, para no
+reutilizar IDs reservados) y los IDs del índice; se comparan por número, así
+que map_0222 choca con map_222.
+"""
+
+import os
+import re
+import json
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+INDEX_FILE = Path("data/maps_index.json")
+JOURNAL_FILE = Path("data/maps_index.journal")
+LOCK_FILE = Path("data/maps_index.lock")
+COUNTER_FILE = Path("data/maps_index.counter")
+
+# Compactar automáticamente cuando el journal supera este tamaño
+COMPACT_BYTES = 1 << 20
+
+# Índice ya parseado en este proceso; se invalida si cambian los archivos
+_cache = {'stamp': None, 'entries': [], 'by_id': {}, 'by_title': {}, 'numbers': set()}
+
+
+def map_sort_key(map_id):
+    """Orden numérico de IDs (map_2 antes que map_10)"""
+    match = re.search(r'(\d+)$', map_id)
+    return (int(match.group(1)) if match else -1, map_id)
+
+
+@contextmanager
+def locked(exclusive=True):
+    """Lock de archivo sobre el índice (exclusivo para escribir, compartido para leer)"""
+    LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_base():
+    if not INDEX_FILE.exists():
+        return []
+    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _read_journal():
+    """Operaciones del journal; una última línea truncada (corte abrupto) se ignora"""
+    if not JOURNAL_FILE.exists():
+        return []
+    ops = []
+    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                ops.append(json.loads(line))
+            except ValueError:
+                continue
+    return ops
+
+
+def apply_ops(entries, ops):
+    """Aplica operaciones del journal sobre una lista de entradas"""
+    by_id = {m['id']: i for i, m in enumerate(entries)}
+    deleted = False
+
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'put':
+            entry = op['entry']
+            i = by_id.get(entry['id'])
+            if i is None:
+                by_id[entry['id']] = len(entries)
+                entries.append(entry)
+            else:
+                entries[i] = entry
+        elif kind == 'patch':
+            i = by_id.get(op['id'])
+            if i is not None:
+                entries[i] = {**entries[i], **op['fields']}
+        elif kind == 'delete':
+            i = by_id.pop(op['id'], None)
+            if i is not None:
+                entries[i] = None
+                deleted = True
+
+    return [m for m in entries if m is not None] if deleted else entries
+
+
+def title_key(title):
+    """Forma normalizada de un título para buscar duplicados"""
+    return (title or '').lower().strip()
+
+
+def _stamp():
+    """(mtime, tamaño) del índice base y del journal"""
+    stamp = []
+    for path in (INDEX_FILE, JOURNAL_FILE):
+        try:
+            st = path.stat()
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _cached():
+    """Índice parseado, releído solo si maps_index.json o el journal cambiaron"""
+    with locked(exclusive=False):
+        stamp = _stamp()
+        if stamp == _cache['stamp']:
+            return _cache
+        entries = apply_ops(_read_base(), _read_journal())
+
+    _cache['stamp'] = stamp
+    _cache['entries'] = entries
+    _cache['by_id'] = {m['id']: m for m in entries}
+    _cache['by_title'] = {}
+    # Números de ID en uso: map_222 y map_0222 son el mismo para el contador
+    _cache['numbers'] = {map_sort_key(m['id'])[0] for m in entries}
+    for m in entries:
+        _cache['by_title'].setdefault(title_key(m.get('title')), m)
+    return _cache
+
+
+def load_index():
+    """Índice actual: maps_index.json + journal
+
+    Retorna una lista nueva (se puede extender sin afectar la caché); las
+    entradas son compartidas y no deben modificarse, los cambios van por
+    put/patch.
+    """
+    return list(_cached()['entries'])
+
+
+def get(map_id):
+    """Entrada de un mapa por ID, o None"""
+    return _cached()['by_id'].get(map_id)
+
+
+def find_by_title(title):
+    """Primera entrada con ese título (sin distinguir mayúsculas), o None"""
+    return _cached()['by_title'].get(title_key(title))
+
+
+def titles():
+    """Conjunto de títulos normalizados del índice"""
+    return set(_cached()['by_title'])
+
+
+def _write_base(entries):
+    tmp = INDEX_FILE.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, INDEX_FILE)
+
+
+def _compact_locked():
+    entries = apply_ops(_read_base(), _read_journal())
+    entries.sort(key=lambda m: map_sort_key(m['id']))
+    _write_base(entries)
+    JOURNAL_FILE.unlink(missing_ok=True)
+    return len(entries)
+
+
+def compact():
+    """Vuelca el journal en maps_index.json y lo vacía"""
+    with locked():
+        return _compact_locked()
+
+
+def compact_pending():
+    """Compacta solo si hay operaciones en el journal; retorna cuántas había"""
+    with locked():
+        pending = len(_read_journal())
+        if pending:
+            _compact_locked()
+    return pending
+
+
+def append(ops):
+    """Agrega operaciones al journal (una escritura pequeña, bajo lock)"""
+    if not ops:
+        return
+    lines = ''.join(json.dumps(op, ensure_ascii=False) + '\n' for op in ops)
+    with locked():
+        with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        if size > COMPACT_BYTES:
+            _compact_locked()
+
+
+def put(entry):
+    """Agrega o reemplaza la entrada de un mapa"""
+    append([{'op': 'put', 'entry': entry}])
+
+
+def patch(map_id, **fields):
+    """Actualiza campos de la entrada de un mapa"""
+    append([{'op': 'patch', 'id': map_id, 'fields': fields}])
+
+
+def delete(map_id):
+    """Elimina la entrada de un mapa"""
+    append([{'op': 'delete', 'id': map_id}])
+
+
+def _read_counter():
+    try:
+        return int(COUNTER_FILE.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _last_number(numbers):
+    """Último número asignado: el mayor entre el contador y los IDs del índice
+
+    El índice puede crecer sin pasar por el contador (build_artifacts --rebuild
+    regenera desde data/maps, un git pull trae mapas de otra máquina), así que
+    el contador solo sirve para no reutilizar IDs reservados y nunca guardados.
+    """
+    return max(_read_counter() or 0, max(numbers, default=0))
+
+
+def allocate_ids(count=1):
+    """Reserva `count` IDs nuevos (map_0001, ...) del contador persistente
+
+    Un ID reservado no se reutiliza aunque el mapa no llegue a guardarse.
+    """
+    # Fuera del lock exclusivo: _cached() toma su propio lock compartido
+    cache = _cached()
+    ids = []
+    with locked():
+        last = _last_number(cache['numbers'])
+        while len(ids) < count:
+            last += 1
+            if last not in cache['numbers']:
+                ids.append(f"map_{last:04d}")
+
+        tmp = COUNTER_FILE.with_suffix('.tmp')
+        tmp.write_text(f"{last}\n")
+        os.replace(tmp, COUNTER_FILE)
+    return ids
+
+
+def next_map_id():
+    """Reserva y retorna el siguiente ID disponible para un mapa"""
+    return allocate_ids(1)[0]
+
+
+def replace_base(entries):
+    """Reemplaza maps_index.json (p. ej. al regenerarlo desde data/maps)
+
+    El journal se conserva: quien regenera debe compactar antes de leer el
+    índice anterior, y lo que se escriba mientras tanto se sigue aplicando
+    encima al leer.
+    """
+    with locked():
+        _write_base(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Almacén del índice de mapas')
+    parser.add_argument('--compact', action='store_true', help='Volcar el journal en maps_index.json')
+    parser.add_argument('--status', action='store_true', help='Ver tamaño del índice y del journal')
+
+    args = parser.parse_args()
+
+    if args.compact:
+        total = compact()
+        print(f"✅ Índice compactado: {total} mapas")
+    elif args.status:
+        print(f"📚 Mapas en el índice: {len(load_index())}")
+        print(f"📝 Operaciones pendientes en el journal: {len(_read_journal())}")
+        print(f"🔢 Último ID asignado: {_last_number(_cached()['numbers'])}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -129,13 +129,20 @@
       'generic': '◉'
     }[kind] || '◉';
 
-    return {
+    const section = {
       id,
       icon,
       title: secTitle,
       kind: 'text-grid',
       items: items.length ? items : [{ h: secTitle, b: restLines(sectionNode.text || '') || '(vacío)' }]
     };
+    // Sección recortada en el esqueleto (publish_maps.py): el detalle está en un shard
+    if (sectionNode.shard != null) {
+      section.pending = true;
+      section.shard = sectionNode.shard;
+      section.index = sectionIdx;
+    }
+    return section;
   }
 
   // Extrae redflags del árbol (primera sección con título "red flag/urgencia/alarma")
@@ -157,8 +164,47 @@
     });
   }
 
+  // Formato compacto (compact_maps.py): columnas paralelas en preorden → árbol
+  // { nodes: { v: 1, fields, parent: [idx], text, guid, id: {i: id}, parent_id: {i: id} } }
+  function expandCompact(raw) {
+    if (!raw || raw.root || !raw.nodes) return raw;
+    const cols = raw.nodes;
+    if (cols.v !== 1) throw new Error('Formato compacto no soportado: v' + cols.v);
+
+    const fields = cols.fields;
+    const parents = cols.parent;
+    const ids = cols.id || {};
+    const parentIds = cols.parent_id || {};
+    const built = new Array(parents.length);
+
+    for (let i = 0; i < parents.length; i++) {
+      const p = parents[i];
+      const key = String(i);
+      const node = {};
+      for (const f of fields) {
+        if (f === 'id') node.id = key in ids ? ids[key] : key;
+        else if (f === 'parent') {
+          node.parent = key in parentIds ? parentIds[key] : (p < 0 ? '-1' : built[p].id);
+        }
+        else if (f === 'text') node.text = cols.text[i];
+        else if (f === 'guid') node.guid = cols.guid[i];
+        else node.children = [];
+      }
+      built[i] = node;
+      if (p >= 0) built[p].children.push(node);
+    }
+
+    const out = {};
+    for (const k of Object.keys(raw)) {
+      if (k === 'nodes') out.root = built[0] || null;
+      else out[k] = raw[k];
+    }
+    return out;
+  }
+
   // Transformación principal
   function transformRawMap(raw) {
+    raw = expandCompact(raw);
     if (!raw || !raw.root) {
       throw new Error('Mapa sin root: ' + JSON.stringify(raw).slice(0, 200));
     }
@@ -184,6 +230,10 @@
 
     return {
       id: raw.id || raw.filename || 'map',
+      // Esqueleto de un mapa partido: páginas de secciones aún sin cargar
+      pages: raw.pages || 1,
+      nextPage: 1,
+      nextSectionIdx: sectionChildren.length,
       title,
       subtitle: subtitle.split('\n')[0] || `${specialty} · ${nodeCount} nodos`,
       specialty,
@@ -224,11 +274,71 @@
     catch (e) { return null; }
   }
 
+  // Mapas grandes publicados como esqueleto + shards (data/shards/index.json)
+  let shardIndex = null;
+  function loadShardIndex() {
+    if (!shardIndex) {
+      shardIndex = fetchJSON('shards/index.json')
+        .then(idx => idx.maps || {})
+        .catch(() => ({}));
+    }
+    return shardIndex;
+  }
+
   async function loadMap(mapId) {
+    const sharded = await loadShardIndex();
+    if (sharded[mapId]) {
+      try {
+        const map = transformRawMap(await fetchJSON(`shards/${mapId}/skeleton.json`));
+        map.shardBase = `shards/${mapId}/`;
+        map.shardRequests = {};
+        return map;
+      } catch (e) {
+        console.warn('Esqueleto no disponible, cargando el mapa completo', mapId, e);
+      }
+    }
     const raw = await fetchJSON(`maps/${mapId}.json`);
     return transformRawMap(raw);
   }
 
+  // Trae el detalle de una sección recortada y la reemplaza en map.sections
+  function loadSection(map, sec) {
+    if (!sec || !sec.pending || !map.shardBase) return Promise.resolve(sec);
+    const key = 'sec-' + sec.shard;
+    if (!map.shardRequests[key]) {
+      map.shardRequests[key] = fetchJSON(`${map.shardBase}${sec.shard}.json`).then(node => {
+        const full = buildSection(node, sec.index);
+        const i = map.sections.findIndex(s => s.id === sec.id);
+        if (i >= 0) map.sections[i] = full;
+        return full;
+      });
+    }
+    return map.shardRequests[key];
+  }
+
+  // Trae la siguiente página de secciones (mapas planos); [] si no quedan
+  function loadNextPage(map) {
+    if (!map.shardBase || map.nextPage >= map.pages) return Promise.resolve([]);
+    const key = 'page-' + map.nextPage;
+    if (!map.shardRequests[key]) {
+      map.shardRequests[key] = fetchJSON(`${map.shardBase}page-${map.nextPage}.json`).then(nodes => {
+        const added = nodes.map((c, i) => buildSection(c, map.nextSectionIdx + i)).filter(Boolean);
+        map.nextSectionIdx += nodes.length;
+        map.nextPage += 1;
+        map.sections.push(...added);
+        return added;
+      });
+    }
+    return map.shardRequests[key];
+  }
+
+  // Todo lo pendiente (para imprimir o para la vista de mapa)
+  async function loadAll(map) {
+    while (map.shardBase && map.nextPage < map.pages) await loadNextPage(map);
+    await Promise.all(map.sections.filter(s => s.pending).map(s => loadSection(map, s)));
+    return map;
+  }
+
   // Para testing local: permite pasar un mapa ya cargado
   function fromRaw(rawMap) {
     return transformRawMap(rawMap);
@@ -238,8 +348,12 @@
     loadIndex,
     loadSpecialties,
     loadMap,
+    loadSection,
+    loadNextPage,
+    loadAll,
     fromRaw,
     transformRawMap,
+    expandCompact,
     _utils: { cleanText, firstLine, restLines, flattenBranch, inferKind }
   };
 })();
@@ -138,12 +138,39 @@ const MindMap = {
           leaves.hidden = false;
           btn.setAttribute('aria-expanded', 'true');
           btn.classList.add('is-open');
+          if (this.branchData[i].sec.pending) this.loadBranch(i);
         }
       });
     });
 
+    this.bindLeaves(this.root);
+  },
+
+  // Rama de un mapa partido (publish_maps.py): trae el detalle y re-renderiza sus hojas
+  async loadBranch(i) {
+    if (!window.MedMapsData) return;
+    const map = this.map;
+    const b = this.branchData[i];
+    try {
+      b.sec = await window.MedMapsData.loadSection(map, b.sec);
+    } catch (e) {
+      console.warn('No se pudo cargar la rama', b.sec.id, e);
+      return;
+    }
+    if (this.map !== map) return;  // se cambió de mapa mientras tanto
+    b.leaves = this.summarize(b.sec);
+    const container = this.root.querySelector(`[data-branch-leaves="${i}"]`);
+    const count = this.root.querySelector(`.tree-branch[data-branch="${i}"] .tree-branch-count`);
+    if (count) count.textContent = b.leaves.length;
+    if (!container) return;
+    container.querySelector('.tree-leaves-list').innerHTML =
+      b.leaves.map((l, idx) => this.renderLeaf(l, i, idx)).join('');
+    this.bindLeaves(container);
+  },
+
+  bindLeaves(scope) {
     // Leaf toggle (accordion inline)
-    this.root.querySelectorAll('.tree-leaf-interactive').forEach(leafEl => {
+    scope.querySelectorAll('.tree-leaf-interactive').forEach(leafEl => {
       const toggle = (e) => {
         if (e) e.stopPropagation();
         const detail = leafEl.querySelector('.tree-leaf-detail');
@@ -165,13 +165,16 @@ function renderSection(sec, num) {
       ).join('')}</div>`;
       break;
   }
-  return `<section class="section" id="sec-${sec.id}">
+  // Sección de un mapa partido cuyo detalle todavía no llegó (ver setupLazyLoad)
+  const pending = sec.pending ? ` data-pending="${esc(sec.id)}"` : '';
+  return `<section class="section" id="sec-${sec.id}" data-num="${num}"${pending}>
     <header class="section-head">
       <span class="section-num">${n}</span>
       <span class="section-icon">${sec.icon}</span>
       <h2>${esc(sec.title)}</h2>
     </header>
     ${body}
+    ${sec.pending ? '<div class="section-loading">Cargando detalle…</div>' : ''}
   </section>`;
 }
 
@@ -179,16 +182,111 @@ function esc(s) {
   return String(s).replace(/[&<>"']/g, c => ({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));
 }
 
+// ============ CARGA DIFERIDA (mapas partidos en shards) ============
+let lazyObserver = null;
+
+function refreshAfterLoad() {
+  searchIndex.length = 0;
+  searchIndex.push(...buildIndex());
+}
+
+async function fillSection(el) {
+  const sec = (MAP.sections || []).find(s => s.id === el.dataset.pending);
+  if (!sec) return;
+  try {
+    const full = await window.MedMapsData.loadSection(MAP, sec);
+    const tmp = document.createElement('div');
+    tmp.innerHTML = renderSection(full, +el.dataset.num);
+    el.innerHTML = tmp.firstElementChild.innerHTML;
+    el.removeAttribute('data-pending');
+    refreshAfterLoad();
+  } catch (e) {
+    console.warn('No se pudo cargar la sección', sec.id, e);
+  }
+}
+
+async function appendNextPage(sentinel) {
+  const before = MAP.sections.length;
+  const added = await window.MedMapsData.loadNextPage(MAP);
+  if (!added.length) {
+    sentinel.remove();
+    return;
+  }
+  sentinel.insertAdjacentHTML('beforebegin', added.map((sec, i) => renderSection(sec, before + i + 1)).join(''));
+  renderTocItems();
+  setupScrollSpy();
+  refreshAfterLoad();
+  observePending();
+  if (MAP.nextPage >= MAP.pages) sentinel.remove();
+}
+
+function observePending() {
+  $$('.section[data-pending]').forEach(el => {
+    if (!el.dataset.observed) {
+      el.dataset.observed = '1';
+      lazyObserver.observe(el);
+    }
+  });
+}
+
+// Las secciones recortadas se completan al acercarse al viewport; las páginas
+// siguientes (mapas planos) se agregan al llegar al final de la ficha
+function setupLazyLoad() {
+  if (lazyObserver) lazyObserver.disconnect();
+  lazyObserver = null;
+  if (!MAP.shardBase || !('IntersectionObserver' in window)) return;
+
+  lazyObserver = new IntersectionObserver(entries => {
+    entries.forEach(entry => {
+      if (!entry.isIntersecting) return;
+      const el = entry.target;
+      lazyObserver.unobserve(el);
+      if (el.id === 'fichaMore') {
+        appendNextPage(el).then(() => {
+          if (document.getElementById('fichaMore')) lazyObserver.observe(el);
+        });
+      } else {
+        fillSection(el);
+      }
+    });
+  }, { rootMargin: '600px 0px' });
+
+  if (MAP.nextPage < MAP.pages) {
+    $('#fichaContent').insertAdjacentHTML('beforeend',
+      '<div id="fichaMore" class="section-loading">Cargando más secciones…</div>');
+    lazyObserver.observe($('#fichaMore'));
+  }
+  observePending();
+}
+
+// Todo el mapa (impresión / vista de mapa): completa secciones y páginas
+async function loadWholeMap() {
+  if (!MAP.shardBase) return;
+  await window.MedMapsData.loadAll(MAP);
+  renderFicha();
+  renderTocItems();
+  setupScrollSpy();
+  setupLazyLoad();
+  refreshAfterLoad();
+}
+
 // ============ TOC ============
-function renderToc() {
-  const list = $('#tocList');
+function renderTocItems() {
   const rf = MAP.redflags || [];
   const rfReal = rf.length && !(rf.length === 1 && /sin red flags/i.test(rf[0].t || ''));
   const items = (rfReal ? [{ id: 'sec-redflags', title: 'Red flags · urgencias' }] : [])
     .concat((MAP.sections || []).map(s => ({ id: 'sec-' + s.id, title: s.title })));
-  list.innerHTML = items.map(it =>
+  $('#tocList').innerHTML = items.map(it =>
     `<li class="toc-item"><a class="toc-link" href="#${it.id}" data-sec="${it.id}">${esc(it.title)}</a></li>`
   ).join('');
+}
+
+let tocBound = false;
+function renderToc() {
+  const list = $('#tocList');
+  renderTocItems();
+  if (tocBound) return;
+  tocBound = true;
   list.addEventListener('click', e => {
     const a = e.target.closest('.toc-link');
     if (!a) return;
@@ -295,7 +393,10 @@ function revealOnClick(e) {
 $('#btnCardTop').onclick = toggleCards;
 $('#tocCard').onclick = toggleCards;
 $('#mnCard').onclick = toggleCards;
-$('#tocPrint').onclick = () => window.print();
+$('#tocPrint').onclick = async () => {
+  await loadWholeMap();
+  window.print();
+};
 
 // ============ SEARCH ============
 const palette = $('#palette');
@@ -447,6 +548,12 @@ function setView(v) {
   localStorage.setItem('medmaps.view', v);
   if (v === 'mapa' && window.MindMap) {
     window.MindMap.render(MAP);
+    // Mapas planos partidos: la vista de mapa necesita todas las ramas
+    if (MAP.shardBase && MAP.nextPage < MAP.pages) {
+      window.MedMapsData.loadAll(MAP).then(() => {
+        if (document.body.classList.contains('view-mapa')) window.MindMap.render(MAP);
+      });
+    }
   }
 }
 $$('.vt-btn').forEach(b => b.onclick = () => setView(b.getAttribute('data-view')));
@@ -476,6 +583,7 @@ if (picker) {
     renderToc();
     renderConn();
     setupScrollSpy();
+    setupLazyLoad();
     searchIndex.length = 0;
     searchIndex.push(...buildIndex());
     if (document.body.classList.contains('view-mapa')) window.MindMap.render(MAP);
@@ -533,6 +641,7 @@ async function init() {
   renderToc();
   renderConn();
   setupScrollSpy();
+  setupLazyLoad();
   searchIndex.push(...buildIndex());
   applyTweaks(tweakState);
   const savedView = localStorage.getItem('medmaps.view') || 'ficha';
@@ -0,0 +1,117 @@
+"""
+Similitud TF-IDF entre Mapas - MedMaps
+
+Vectoriza el texto de todos los mapas una sola vez en una matriz dispersa
+TF-IDF (NumPy/SciPy) y calcula los k vecinos más similares de cada mapa con
+productos matriciales por bloques, en vez de comparar mapa contra mapa.
+
+Lo usa review_maps.py --add-links --tfidf.
+Requiere: pip install numpy scipy
+"""
+
+import re
+import math
+from collections import Counter
+
+# Palabras vacías (ES/EN) que no aportan a la similitud
+STOPWORDS = {
+    "para", "como", "por", "con", "sin", "del", "las", "los", "una", "uno",
+    "que", "sus", "más", "mas", "muy", "entre", "sobre", "según", "desde",
+    "hasta", "cuando", "donde", "este", "esta", "estos", "estas", "ese",
+    "esa", "puede", "pueden", "también", "otro", "otros", "otra", "otras",
+    "the", "and", "for", "with", "from", "that", "this", "are", "was",
+    "not", "but", "have", "has", "its", "into", "than", "then",
+}
+
+TOKEN_RE = re.compile(r"[^\W\d_]{3,}")
+
+
+def tokenize(text):
+    """Tokens en minúscula de 3+ letras, sin palabras vacías"""
+    # SimpleMind guarda los saltos de línea como "\N" literal
+    text = text.replace('\\N', ' ').replace('\\n', ' ').lower()
+    return [t for t in TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def build_tfidf(texts, min_df=2, max_df=0.5):
+    """Construye la matriz TF-IDF (CSR, filas normalizadas L2)
+
+    tf sublineal (1 + log tf) e idf suavizado. Se descartan los términos que
+    aparecen en menos de `min_df` documentos o en más de `max_df` del corpus.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    counts = [Counter(tokenize(t)) for t in texts]
+    n_docs = len(counts)
+
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+
+    max_count = max_df * n_docs
+    vocab = {}
+    for term, d in df.items():
+        if d >= min_df and d <= max_count:
+            vocab[term] = len(vocab)
+
+    idf = np.zeros(len(vocab), dtype=np.float32)
+    for term, j in vocab.items():
+        idf[j] = math.log((1 + n_docs) / (1 + df[term])) + 1
+
+    indptr = [0]
+    indices = []
+    data = []
+    for c in counts:
+        for term, tf in c.items():
+            j = vocab.get(term)
+            if j is not None:
+                indices.append(j)
+                data.append(1 + math.log(tf))
+        indptr.append(len(indices))
+
+    X = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+        shape=(n_docs, len(vocab)))
+    X = X.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    X = sparse.diags(1 / norms) @ X
+
+    return X.tocsr(), vocab
+
+
+def top_k_neighbors(X, k=5, min_similarity=0.15, block_size=512):
+    """Vecinos más similares de cada fila de X (similitud coseno)
+
+    Procesa X @ X.T en bloques de `block_size` filas para acotar la memoria.
+    Retorna, por fila, una lista de (índice, similitud) ordenada de mayor a
+    menor, con a lo sumo k vecinos y similitud >= min_similarity.
+    """
+    import numpy as np
+
+    n = X.shape[0]
+    XT = X.T.tocsc()
+    neighbors = []
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        sims = (X[start:stop] @ XT).toarray()
+
+        # Un mapa no es vecino de sí mismo
+        sims[np.arange(stop - start), np.arange(start, stop)] = -1
+
+        kk = min(k, n - 1)
+        if kk <= 0:
+            neighbors.extend([] for _ in range(stop - start))
+            continue
+
+        top = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+        for row, cols in enumerate(top):
+            scores = sims[row, cols]
+            order = np.lexsort((cols, -scores))
+            neighbors.append([(int(cols[i]), float(scores[i])) for i in order
+                              if scores[i] >= min_similarity])
+
+    return neighbors
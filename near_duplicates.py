@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Detección de Mapas Casi Duplicados (MinHash + LSH) - MedMaps
+
+La detección de duplicados por título exacto no ve las copias renombradas
+(sufijos -2024/-2025, archivos en _Backup_Duplicados) ni las versiones
+levemente editadas. Este módulo calcula una firma MinHash sobre los
+shingles (trigramas de palabras) del texto de los nodos de cada mapa y
+agrupa las firmas con LSH por bandas, así que solo se comparan los pares
+candidatos: el costo es aproximadamente lineal en la cantidad de mapas.
+
+La similitud reportada es la estimación MinHash de Jaccard entre los
+conjuntos de shingles. Las firmas de data/maps se cachean en
+.cache/minhash_maps.json (por mtime); las de los .smmx viven en el
+manifiesto de escaneo de bulk_process.py.
+
+Lo usa bulk_process.py --scan para marcar los archivos nuevos que son casi
+duplicados de un mapa existente (o entre sí) antes de asignarles ID.
+Requiere: pip install numpy
+
+Uso:
+    python near_duplicates.py                  # Grupos de casi duplicados en data/maps
+    python near_duplicates.py --threshold 0.8  # Solo los muy parecidos
+    python near_duplicates.py --check          # .smmx de los fixtures vs. su mapa ingerido
+"""
+
+import re
+import json
+import zlib
+import base64
+import argparse
+import unicodedata
+from pathlib import Path
+from collections import defaultdict
+
+from compact_maps import expand_map
+
+MAPS_DIR = Path("data/maps")
+MAPS_CACHE = Path(".cache/minhash_maps.json")
+
+NUM_PERM = 128
+# 32 bandas de 4 filas: un par se vuelve candidato desde Jaccard ≈ 0.42
+# ((1/32)^(1/4)), bastante por debajo del umbral, y luego se verifica
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+THRESHOLD = 0.7
+
+# Semilla fija: las firmas cacheadas solo son comparables con la misma
+SEED = 20240601
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+_params = None
+
+
+def _hash_params():
+    """Parámetros (a, b) de las NUM_PERM funciones hash multiply-shift"""
+    global _params
+    if _params is None:
+        import numpy as np
+        rng = np.random.default_rng(SEED)
+        a = rng.integers(1, 2**63, size=NUM_PERM, dtype=np.uint64) | np.uint64(1)
+        b = rng.integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+        _params = (a[:, None], b[:, None])
+    return _params
+
+
+def normalize(text):
+    """Minúsculas, sin acentos y sin los saltos "\\N" de SimpleMind"""
+    text = text.replace('\\N', ' ').replace('\\n', ' ').lower()
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def shingles(text, k=SHINGLE_WORDS):
+    """Hashes (crc32) de los k-gramas de palabras del texto"""
+    words = WORD_RE.findall(normalize(text))
+    if len(words) < k:
+        grams = [' '.join(words)] if words else []
+    else:
+        grams = [' '.join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return {zlib.crc32(g.encode('utf-8')) for g in grams}
+
+
+def minhash(text):
+    """Firma MinHash (NUM_PERM enteros de 32 bits) del texto; None si está vacío"""
+    import numpy as np
+    hashed = shingles(text)
+    if not hashed:
+        return None
+    x = np.fromiter(hashed, dtype=np.uint64, count=len(hashed))
+    a, b = _hash_params()
+    # (a·x + b) mod 2^64, quedándose con los 32 bits altos
+    return ((a * x[None, :] + b) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+
+def encode(signature):
+    return base64.b64encode(signature.tobytes()).decode('ascii')
+
+
+def decode(data):
+    import numpy as np
+    return np.frombuffer(base64.b64decode(data), dtype=np.uint32)
+
+
+def similarity(a, b):
+    """Jaccard estimado: fracción de posiciones iguales entre dos firmas"""
+    return float((a == b).mean())
+
+
+def tree_text(root):
+    """Texto de todos los nodos de un árbol, en preorden"""
+    texts = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.get('text'):
+            texts.append(node['text'])
+        stack.extend(reversed(node.get('children') or []))
+    return ' '.join(texts)
+
+
+def map_signature(map_data):
+    """Firma de un mapa (o de un .smmx parseado) sobre el texto en preorden
+
+    Es la que usa corpus_signatures: el orden del XML de SimpleMind es el de
+    creación de los tópicos, y los shingles cruzan los límites entre nodos,
+    así que firmar full_text daría otra firma para el mismo mapa.
+    """
+    return minhash(tree_text(map_data.get('root') or {}))
+
+
+def candidate_pairs(signatures, only=None):
+    """Pares candidatos por LSH (misma banda en al menos una posición)
+
+    Si se da `only`, solo se devuelven pares con al menos una clave de ese
+    conjunto (p. ej. archivos nuevos contra el corpus).
+    """
+    pairs = set()
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        lo, hi = band * ROWS, (band + 1) * ROWS
+        for key, sig in signatures.items():
+            buckets[sig[lo:hi].tobytes()].append(key)
+        for keys in buckets.values():
+            if len(keys) < 2:
+                continue
+            for i, k1 in enumerate(keys):
+                for k2 in keys[i + 1:]:
+                    if only is None or k1 in only or k2 in only:
+                        pairs.add((k1, k2) if str(k1) < str(k2) else (k2, k1))
+    return pairs
+
+
+def similar_pairs(signatures, threshold=THRESHOLD, only=None):
+    """[(a, b, similitud)] de los candidatos LSH que superan el umbral"""
+    found = []
+    for k1, k2 in candidate_pairs(signatures, only):
+        sim = similarity(signatures[k1], signatures[k2])
+        if sim >= threshold:
+            found.append((k1, k2, sim))
+    found.sort(key=lambda p: -p[2])
+    return found
+
+
+def clusters(pairs):
+    """Componentes conexas (union-find) de los pares similares"""
+    parent = {}
+
+    def find(k):
+        parent.setdefault(k, k)
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for k1, k2, _ in pairs:
+        r1, r2 = find(k1), find(k2)
+        if r1 != r2:
+            parent[r2] = r1
+
+    groups = defaultdict(list)
+    for k in parent:
+        groups[find(k)].append(k)
+    return [sorted(g, key=str) for g in groups.values() if len(g) > 1]
+
+
+def corpus_signatures():
+    """{map_id: firma} de data/maps, recalculando solo los mapas modificados"""
+    try:
+        with open(MAPS_CACHE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    fresh = {}
+    signatures = {}
+    for map_file in MAPS_DIR.glob("*.json"):
+        mtime = map_file.stat().st_mtime_ns
+        entry = cache.get(map_file.stem)
+        if entry is None or entry['mtime'] != mtime:
+            try:
+                with open(map_file, 'r', encoding='utf-8') as f:
+                    map_data = expand_map(json.load(f))
+            except (OSError, ValueError):
+                continue
+            sig = map_signature(map_data)
+            entry = {'mtime': mtime, 'title': map_data.get('title', ''),
+                     'minhash': encode(sig) if sig is not None else None}
+        fresh[map_file.stem] = entry
+        if entry['minhash']:
+            signatures[map_file.stem] = decode(entry['minhash'])
+
+    if fresh != cache:
+        MAPS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(MAPS_CACHE, 'w', encoding='utf-8') as f:
+            json.dump(fresh, f, ensure_ascii=False)
+
+    titles = {k: e['title'] for k, e in fresh.items()}
+    return signatures, titles
+
+
+def check():
+    """Cada .smmx de los fixtures contra su mapa ingerido: la similitud debe ser 1.0"""
+    from smmx_parser import parse_smmx, golden_cases
+    from compact_maps import compact_map, dumps
+
+    failed = 0
+    for case in golden_cases():
+        parsed = parse_smmx(case)
+        if parsed is None:
+            continue
+        file_sig = map_signature(parsed)
+        # Como queda en data/maps: JSON (compacto o no) y leído con expand_map
+        ingested = {'id': case.stem, 'title': parsed['title'], 'root': parsed['root']}
+        for stored in (ingested, compact_map(ingested)):
+            map_sig = map_signature(expand_map(json.loads(dumps(stored))))
+            if file_sig is None and map_sig is None:
+                continue
+            sim = similarity(file_sig, map_sig) if file_sig is not None and map_sig is not None else 0.0
+            ok = sim == 1.0
+            failed += not ok
+            print(f"  {'✅' if ok else '❌'} {case.name} ({'compacto' if stored is not ingested else 'árbol'}): {sim:.2f}")
+    print(f"\n{'✅ Firmas consistentes' if not failed else f'❌ {failed} firmas distintas'}")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Grupos de mapas casi duplicados (MinHash + LSH)')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f'Jaccard mínimo estimado (default {THRESHOLD})')
+    parser.add_argument('--check', action='store_true',
+                        help='Verificar que cada .smmx de los fixtures y su mapa ingerido den 1.0')
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check() else 1)
+
+    print("\n🔍 CASI DUPLICADOS EN data/maps\n")
+    print("=" * 60)
+
+    signatures, titles = corpus_signatures()
+    pairs = similar_pairs(signatures, args.threshold)
+    best = defaultdict(float)
+    for k1, k2, sim in pairs:
+        best[k1] = max(best[k1], sim)
+        best[k2] = max(best[k2], sim)
+
+    groups = clusters(pairs)
+    groups.sort(key=lambda g: -len(g))
+    for group in groups:
+        print(f"\n📎 {len(group)} mapas:")
+        for map_id in group:
+            print(f"  {map_id:<10} {best[map_id]:.2f}  {titles.get(map_id, '')[:60]}")
+
+    print(f"\n📊 Mapas con firma: {len(signatures)} | Pares similares: {len(pairs)} | "
+          f"Grupos: {len(groups)} (Jaccard ≥ {args.threshold})")
+
+
+if __name__ == "__main__":
+    main()
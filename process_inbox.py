@@ -10,14 +10,26 @@ Soporta:
 Uso:
     python process_inbox.py                    # Procesar todo el inbox
     python process_inbox.py --file archivo.txt # Procesar archivo específico
-    python process_inbox.py --watch            # Modo observador (futuro)
+    python process_inbox.py --watch            # Modo observador (procesa lo que llega)
+    python process_inbox.py --watch --publish  # ... y publica al terminar cada lote
+    python process_inbox.py --batch --profile  # Tiempo por etapa/archivo (ver profiling.py)
+
+El modo --watch queda corriendo: usa inotify (Linux) para enterarse de los
+archivos nuevos sin gastar CPU en reposo, o revisa la carpeta cada
+POLL_INTERVAL segundos si inotify no está disponible. Un archivo se procesa
+recién cuando su tamaño y mtime no cambian durante DEBOUNCE_SECONDS (Dropbox
+escribe en varias pasadas), y los que quedan listos juntos se procesan como
+un lote que carga el índice una sola vez. Después de cada lote imprime una
+línea de estado y la guarda en .cache/inbox_watch.json.
 """
 
 import os
 import sys
 import json
+import time
+import select
+import struct
 import zipfile
-import xml.etree.ElementTree as ET
 import shutil
 import argparse
 from pathlib import Path
@@ -25,7 +37,10 @@ from datetime import datetime
 
 # Importar funciones del conversor de texto
 from text_to_map import parse_tabbed_text, count_nodes, extract_references, \
-    find_related_maps, load_existing_maps, save_map, get_next_map_id
+    find_related_maps, load_existing_maps, save_map
+from smmx_parser import parse_smmx
+import index_store
+import profiling
 
 # Configuración de rutas
 DROPBOX_BASE = Path(os.path.expanduser("~/Dropbox/MedMaps"))
@@ -41,109 +56,89 @@ if not DROPBOX_BASE.exists():
     TEXTOS_DIR = DROPBOX_BASE / "textos"
     PUBLICADOS_DIR = DROPBOX_BASE / "publicados"
 
-def parse_smmx_file(filepath: Path) -> dict:
-    """Parsea un archivo .smmx de SimpleMind Pro"""
-    
-    with zipfile.ZipFile(filepath, 'r') as zf:
-        # Buscar el archivo XML principal
-        xml_file = None
-        for name in zf.namelist():
-            if name.endswith('.xml') and not name.startswith('__'):
-                xml_file = name
-                break
-        
-        if not xml_file:
-            raise ValueError(f"No se encontró XML en {filepath}")
-        
-        with zf.open(xml_file) as f:
-            tree = ET.parse(f)
-            root = tree.getroot()
-    
-    # Parsear la estructura del mapa
-    def parse_node(element):
-        text = ""
-        children = []
-        
-        # Buscar texto del nodo
-        for child in element:
-            if child.tag == 'text':
-                text = child.text or ""
-            elif child.tag == 'node' or child.tag == 'children':
-                if child.tag == 'children':
-                    for subchild in child:
-                        if subchild.tag == 'node':
-                            children.append(parse_node(subchild))
-                else:
-                    children.append(parse_node(child))
-        
-        return {"text": text.strip(), "children": children}
-    
-    # Encontrar el nodo raíz
-    root_node = None
-    for elem in root.iter():
-        if elem.tag == 'mindmap' or elem.tag == 'map':
-            for child in elem:
-                if child.tag == 'node':
-                    root_node = parse_node(child)
-                    break
-    
-    if not root_node:
-        # Intento alternativo de parsing
-        for elem in root.iter('node'):
-            root_node = parse_node(elem)
-            break
-    
-    return root_node or {"text": "Sin contenido", "children": []}
+# Modo --watch
+INBOX_EXTENSIONS = {'.smmx', '.txt'}
+DEBOUNCE_SECONDS = 2.0      # Sin cambios de tamaño/mtime durante este tiempo = archivo completo
+POLL_INTERVAL = 2.0         # Fallback sin inotify
+IDLE_RESCAN = 300           # Con inotify, re-escaneo de seguridad (eventos perdidos)
+BATCH_MAX = 50
+WATCH_STATUS = Path(".cache/inbox_watch.json")
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_Q_OVERFLOW = 0x4000
+INOTIFY_EVENT = struct.Struct('iIII')
 
 def process_smmx(filepath: Path, specialty: str = "General", 
-                 tag: str = "📚 Revisión", access: str = "free") -> dict:
+                 tag: str = "📚 Revisión", access: str = "free",
+                 existing_maps: list = None) -> dict:
     """Procesa un archivo .smmx y retorna datos del mapa"""
     
-    root = parse_smmx_file(filepath)
-    existing_maps = load_existing_maps()
-    map_id = get_next_map_id()
+    t0 = time.perf_counter()
+    with profiling.stage('parse'):
+        parsed = parse_smmx(filepath)
+    profiling.record_file(filepath, time.perf_counter() - t0, 'parse',
+                          nodes=parsed['node_count'] if parsed else None)
+    if parsed is None:
+        raise ValueError(f"No se pudo leer el mapa de {filepath.name}")
+    if existing_maps is None:
+        with profiling.stage('index-load'):
+            existing_maps = load_existing_maps()
     
-    # Extraer título del nombre del archivo o del nodo raíz
-    title = root.get("text", filepath.stem)
+    # Título del nodo raíz (o del nombre del archivo)
+    title = parsed["title"]
     
     # Buscar mapas relacionados
-    content_text = json.dumps(root, ensure_ascii=False)
-    related = find_related_maps(content_text, existing_maps, map_id)
+    with profiling.stage('link'):
+        related = find_related_maps(parsed["full_text"], existing_maps)
     
+    # El ID se reserva en save_map, al guardar
     map_data = {
-        "id": map_id,
+        "id": None,
         "title": title,
         "specialty": specialty,
         "tag": tag,
         "access": access,
-        "node_count": count_nodes(root),
+        "node_count": parsed["node_count"],
         "created_date": datetime.now().strftime("%Y-%m-%d"),
         "source_file": filepath.name,
         "related_maps": related,
         "references": [],
-        "root": root
+        "guid": parsed["guid"],
+        "relations": parsed["relations"],
+        "root": parsed["root"]
     }
     
     return map_data
 
 def process_txt(filepath: Path, specialty: str = "General",
-                tag: str = "📚 Revisión", access: str = "free") -> dict:
+                tag: str = "📚 Revisión", access: str = "free",
+                existing_maps: list = None) -> dict:
     """Procesa un archivo de texto tabulado"""
     
-    with open(filepath, 'r', encoding='utf-8') as f:
-        text = f.read()
-    
-    root = parse_tabbed_text(text)
-    references = extract_references(text)
-    existing_maps = load_existing_maps()
-    map_id = get_next_map_id()
+    t0 = time.perf_counter()
+    with profiling.stage('parse'):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            text = f.read()
+        
+        root = parse_tabbed_text(text)
+        references = extract_references(text)
+    profiling.record_file(filepath, time.perf_counter() - t0, 'parse')
+    if existing_maps is None:
+        with profiling.stage('index-load'):
+            existing_maps = load_existing_maps()
     
     title = root.get("text", filepath.stem)
     content_text = text
-    related = find_related_maps(content_text, existing_maps, map_id)
+    with profiling.stage('link'):
+        related = find_related_maps(content_text, existing_maps)
     
+    # El ID se reserva en save_map, al guardar
     map_data = {
-        "id": map_id,
+        "id": None,
         "title": title,
         "specialty": specialty,
         "tag": tag,
@@ -158,6 +153,29 @@ def process_txt(filepath: Path, specialty: str = "General",
     
     return map_data
 
+def process_file(filepath: Path, specialty: str, tag: str, access: str,
+                 existing_maps: list = None) -> dict:
+    """Procesa un archivo del inbox según su extensión"""
+    if filepath.suffix.lower() == '.smmx':
+        return process_smmx(filepath, specialty, tag, access, existing_maps)
+    return process_txt(filepath, specialty, tag, access, existing_maps)
+
+def publish_file(filepath: Path, map_data: dict, existing_maps: list = None):
+    """Guarda el mapa, mueve el archivo a publicados y suma el mapa a `existing_maps`"""
+    with profiling.stage('save'):
+        save_map(map_data)
+    
+    with profiling.stage('move'):
+        PUBLICADOS_DIR.mkdir(parents=True, exist_ok=True)
+        dest = PUBLICADOS_DIR / filepath.name
+        shutil.move(str(filepath), str(dest))
+    print(f"📦 Archivo movido a: {dest}")
+    profiling.count('maps')
+    
+    # Los siguientes archivos del lote pueden enlazar a este mapa
+    if existing_maps is not None:
+        existing_maps.append({k: map_data[k] for k in ('id', 'title', 'specialty')})
+
 def prompt_metadata():
     """Pide al usuario los metadatos del mapa"""
     
@@ -222,6 +240,10 @@ def process_inbox(interactive: bool = True):
     for i, f in enumerate(files, 1):
         print(f"  {i}. {f.name}")
     
+    # El índice se carga una vez para todo el inbox
+    with profiling.stage('index-load'):
+        existing_maps = load_existing_maps()
+    
     for filepath in files:
         print(f"\n{'='*50}")
         print(f"📄 Procesando: {filepath.name}")
@@ -235,14 +257,10 @@ def process_inbox(interactive: bool = True):
                 specialty, tag, access = "General", "📚 Revisión", "free"
             
             # Procesar según tipo
-            if filepath.suffix.lower() == '.smmx':
-                map_data = process_smmx(filepath, specialty, tag, access)
-            else:
-                map_data = process_txt(filepath, specialty, tag, access)
+            map_data = process_file(filepath, specialty, tag, access, existing_maps)
             
             # Mostrar preview
             print(f"\n📋 Preview:")
-            print(f"   ID: {map_data['id']}")
             print(f"   Título: {map_data['title']}")
             print(f"   Nodos: {map_data['node_count']}")
             print(f"   Relacionados: {len(map_data['related_maps'])}")
@@ -254,14 +272,7 @@ def process_inbox(interactive: bool = True):
                 confirm = 's'
             
             if confirm == 's':
-                # Guardar mapa
-                save_map(map_data)
-                
-                # Mover archivo a publicados
-                dest = PUBLICADOS_DIR / filepath.name
-                shutil.move(str(filepath), str(dest))
-                print(f"📦 Archivo movido a: {dest}")
-                
+                publish_file(filepath, map_data, existing_maps)
                 print(f"✅ Mapa {map_data['id']} creado exitosamente")
             else:
                 print("⏭️ Saltado")
@@ -271,22 +282,203 @@ def process_inbox(interactive: bool = True):
             import traceback
             traceback.print_exc()
 
-def main():
-    parser = argparse.ArgumentParser(description='Procesar inbox de MedMaps')
-    parser.add_argument('--file', '-f', help='Archivo específico a procesar')
-    parser.add_argument('--batch', '-b', action='store_true', 
-                        help='Modo batch (sin preguntas)')
-    parser.add_argument('--specialty', '-s', default='General')
-    parser.add_argument('--tag', '-t', default='📚 Revisión')
-    parser.add_argument('--access', '-a', default='free')
-    
-    args = parser.parse_args()
+def is_inbox_file(path: Path) -> bool:
+    """Archivos procesables (ignora temporales de Dropbox y ocultos)"""
+    name = path.name
+    return (path.suffix.lower() in INBOX_EXTENSIONS
+            and not name.startswith(('.', '~')) and not name.endswith('.tmp'))
+
+def scan_inbox() -> list:
+    return sorted(p for p in INBOX_DIR.iterdir() if p.is_file() and is_inbox_file(p))
+
+def inotify_open(directory: Path):
+    """Descriptor inotify (no bloqueante) que vigila `directory`; None si no hay inotify"""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(str(directory)), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+def inotify_read(fd):
+    """Nombres con eventos pendientes; None si la cola se desbordó (hay que re-escanear)"""
+    names = set()
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            if mask & IN_Q_OVERFLOW:
+                return None
+            start = offset + INOTIFY_EVENT.size
+            name = data[start:start + length].rstrip(b'\0')
+            if name:
+                names.add(os.fsdecode(name))
+            offset = start + length
+
+def file_ready(path: Path) -> bool:
+    """Un .smmx a medio copiar no es un zip válido todavía"""
+    if path.suffix.lower() == '.smmx':
+        return zipfile.is_zipfile(path)
+    return True
+
+def write_watch_status(status: dict):
+    WATCH_STATUS.parent.mkdir(parents=True, exist_ok=True)
+    tmp = WATCH_STATUS.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, WATCH_STATUS)
+
+def status_line(status: dict) -> str:
+    latency = status['last_latency']
+    return (f"📊 [{status['backend']}] lotes: {status['batches']} | mapas: {status['processed']} | "
+            f"errores: {status['errors']} | en espera: {status['pending']} | "
+            f"última latencia: {f'{latency:.1f}s' if latency is not None else '-'} | "
+            f"máx: {status['max_latency']:.1f}s")
+
+def publish_site(jobs: int = 1):
+    """Regenera artefactos y comprimidos (incremental) después de un lote"""
+    import build_artifacts
+    import publish_maps
+    with profiling.stage('publish'):
+        build_artifacts.build(jobs)
+        publish_maps.publish(jobs)
+
+def run_batch(files: list, specialty: str, tag: str, access: str, status: dict) -> list:
+    """Procesa un lote sin preguntas; retorna los archivos que fallaron"""
+    print(f"\n📥 Lote de {len(files)} archivo(s)")
+    with profiling.stage('index-load'):
+        existing_maps = load_existing_maps()
+    failed = []
+    for filepath in files:
+        try:
+            # Latencia medida desde la última escritura del archivo
+            written = filepath.stat().st_mtime
+            map_data = process_file(filepath, specialty, tag, access, existing_maps)
+            publish_file(filepath, map_data, existing_maps)
+            status['processed'] += 1
+            status['last_latency'] = time.time() - written
+            status['max_latency'] = max(status['max_latency'], status['last_latency'])
+            print(f"✅ {map_data['id']}: {map_data['title'][:50]}")
+        except Exception as e:
+            status['errors'] += 1
+            failed.append(filepath)
+            print(f"❌ Error procesando {filepath.name}: {e}")
+    return failed
+
+def watch_inbox(specialty: str, tag: str, access: str, publish: bool = False,
+                debounce: float = DEBOUNCE_SECONDS, polling: bool = False, jobs: int = 1):
+    """Observa el inbox y procesa en micro-lotes lo que termina de llegar"""
+    if not INBOX_DIR.exists():
+        print(f"❌ No existe la carpeta inbox: {INBOX_DIR}")
+        return
     
-    print("\n" + "="*50)
-    print("📥 PROCESADOR DE INBOX - MedMaps")
-    print("="*50)
+    fd = None if polling else inotify_open(INBOX_DIR)
+    status = {
+        'backend': 'inotify' if fd is not None else 'polling',
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'batches': 0, 'processed': 0, 'errors': 0, 'pending': 0,
+        'last_batch': None, 'last_latency': None, 'max_latency': 0.0,
+    }
+    # ruta → (tamaño, mtime, momento del último cambio visto)
+    pending = {}
+    # Archivos que fallaron: no se reintentan hasta que cambien
+    failed = {}
+    
+    def track(paths):
+        now = time.monotonic()
+        for path in paths:
+            try:
+                st = path.stat()
+            except OSError:
+                pending.pop(path, None)
+                continue
+            sig = (st.st_size, st.st_mtime_ns)
+            if failed.get(path) == sig:
+                continue
+            prev = pending.get(path)
+            if prev is None or prev[:2] != sig:
+                pending[path] = (*sig, now)
+    
+    print(f"👀 Observando {INBOX_DIR} ({status['backend']}, debounce {debounce:g}s). Ctrl+C para salir.")
+    track(scan_inbox())
+    last_scan = time.monotonic()
     
-    if args.file:
+    try:
+        while True:
+            now = time.monotonic()
+            if pending:
+                timeout = max(0.05, min(p[2] for p in pending.values()) + debounce - now)
+            else:
+                timeout = IDLE_RESCAN if fd is not None else POLL_INTERVAL
+            if fd is None:
+                timeout = min(timeout, POLL_INTERVAL)
+            
+            if fd is not None:
+                readable, _, _ = select.select([fd], [], [], timeout)
+                names = inotify_read(fd) if readable else set()
+                if names is None or time.monotonic() - last_scan >= IDLE_RESCAN:
+                    track(scan_inbox())
+                    last_scan = time.monotonic()
+                else:
+                    track(INBOX_DIR / n for n in names if is_inbox_file(INBOX_DIR / n))
+            else:
+                time.sleep(timeout)
+                track(scan_inbox())
+            
+            # Re-chequear los pendientes: listos = estables durante `debounce`
+            track(list(pending))
+            now = time.monotonic()
+            ready = sorted(p for p, (_, _, changed) in pending.items()
+                           if now - changed >= debounce and file_ready(p))
+            if not ready:
+                status['pending'] = len(pending)
+                continue
+            
+            batch = ready[:BATCH_MAX]
+            for path in batch:
+                pending.pop(path, None)
+            status['pending'] = len(pending)
+            batch_failed = run_batch(batch, specialty, tag, access, status)
+            for path in batch_failed:
+                try:
+                    st = path.stat()
+                    failed[path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    pass
+            
+            if publish and len(batch_failed) < len(batch):
+                publish_site(jobs)
+            else:
+                index_store.compact_pending()
+            status['batches'] += 1
+            status['last_batch'] = datetime.now().isoformat(timespec='seconds')
+            write_watch_status(status)
+            print(status_line(status))
+    except KeyboardInterrupt:
+        print("\n👋 Observador detenido")
+        print(status_line(status))
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+def run(args):
+    """Ejecuta la acción pedida en la línea de comandos"""
+    if args.watch:
+        watch_inbox(args.specialty, args.tag, args.access, args.publish,
+                    args.debounce, args.polling, args.jobs)
+    elif args.file:
         filepath = Path(args.file)
         if not filepath.exists():
             filepath = INBOX_DIR / args.file
@@ -306,5 +498,38 @@ def main():
     else:
         process_inbox(interactive=not args.batch)
 
+def main():
+    parser = argparse.ArgumentParser(description='Procesar inbox de MedMaps')
+    parser.add_argument('--file', '-f', help='Archivo específico a procesar')
+    parser.add_argument('--batch', '-b', action='store_true', 
+                        help='Modo batch (sin preguntas)')
+    parser.add_argument('--specialty', '-s', default='General')
+    parser.add_argument('--tag', '-t', default='📚 Revisión')
+    parser.add_argument('--access', '-a', default='free')
+    parser.add_argument('--watch', '-w', action='store_true',
+                        help='Observar el inbox y procesar lo que llegue (sin preguntas)')
+    parser.add_argument('--publish', action='store_true',
+                        help='Con --watch: regenerar artefactos y publicar tras cada lote')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help='Segundos sin cambios antes de procesar un archivo (default %(default)s)')
+    parser.add_argument('--polling', action='store_true',
+                        help='Con --watch: revisar la carpeta periódicamente en vez de usar inotify')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Procesos para regenerar artefactos con --publish')
+    profiling.add_arguments(parser)
+    
+    args = parser.parse_args()
+    
+    print("\n" + "="*50)
+    print("📥 PROCESADOR DE INBOX - MedMaps")
+    print("="*50)
+    
+    try:
+        with profiling.from_args('process_inbox', args):
+            run(args)
+    finally:
+        # El sitio lee maps_index.json: no dejar cambios solo en el journal
+        index_store.compact_pending()
+
 if __name__ == "__main__":
     main()
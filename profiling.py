@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Perfilado por Etapas - MedMaps
+
+Instrumentación liviana para las corridas largas de bulk_process.py,
+process_inbox.py y review_maps.py (opción --profile). Registra:
+
+- Tiempo de pared acumulado por etapa (scan, parse, link, write, index...)
+- Tiempo por archivo, para listar los N más lentos
+- Memoria pico: heap de Python (tracemalloc) y RSS máximo del proceso
+- Opcionalmente, un volcado de cProfile (.prof) para snakeviz/pstats
+
+Sin --profile, stage() y record_file() no hacen nada, así que los scripts
+pueden dejarlos puestos. Las etapas se anotan sin anidar: lo que queda
+fuera de todas aparece como "sin etapa" en el reporte. En etapas que corren
+en hilos (p. ej. extracción de PDF) el tiempo por archivo se suma entre
+hilos; tracemalloc solo ve el proceso principal, no los workers de un pool.
+
+El reporte es JSON (por defecto en .cache/profiles/<script>-<fecha>.json):
+
+    python bulk_process.py --process --profile
+    python bulk_process.py --process --profile run.json --cprofile
+    python profiling.py .cache/profiles/a.json .cache/profiles/b.json   # comparar
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import contextlib
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+PROFILE_DIR = Path(".cache/profiles")
+TOP_FILES = 10
+
+_run = None
+_lock = threading.Lock()
+
+
+def add_arguments(parser):
+    """Opciones --profile/--profile-top/--cprofile comunes a los scripts"""
+    parser.add_argument('--profile', nargs='?', const='', metavar='JSON',
+                        help='Medir tiempo por etapa y por archivo, y memoria pico '
+                             f'(reporte JSON; por defecto en {PROFILE_DIR}/)')
+    parser.add_argument('--profile-top', type=int, default=TOP_FILES,
+                        help='Archivos más lentos a listar en el reporte (default %(default)s)')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='Con --profile: guardar también un volcado de cProfile (.prof)')
+
+
+@contextlib.contextmanager
+def from_args(script, args):
+    """Perfila el bloque si el script se llamó con --profile"""
+    if args.profile is None:
+        yield
+        return
+    start(script, args.profile_top, args.cprofile)
+    try:
+        yield
+    finally:
+        finish(args.profile or None)
+
+
+def enabled():
+    return _run is not None
+
+
+def start(script, top=TOP_FILES, cprofile=False):
+    global _run
+    _run = {
+        'script': script,
+        'argv': sys.argv[1:],
+        'started': datetime.now().isoformat(timespec='seconds'),
+        't0': time.perf_counter(),
+        'top': top,
+        'stages': {},
+        'files': [],
+        'counters': {},
+        'profiler': None,
+    }
+    tracemalloc.start()
+    if cprofile:
+        import cProfile
+        _run['profiler'] = cProfile.Profile()
+        _run['profiler'].enable()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Acumula el tiempo de pared del bloque en la etapa `name`"""
+    if _run is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        with _lock:
+            s = _run['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+            s['seconds'] += elapsed
+            s['calls'] += 1
+
+
+def timed_iter(iterable, name):
+    """Itera `iterable` cargando a la etapa `name` el tiempo de esperar cada elemento"""
+    it = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def record_file(path, seconds, stage_name='parse', **info):
+    """Tiempo de un archivo en una etapa (para la lista de los más lentos)"""
+    if _run is None:
+        return
+    entry = {'file': str(path), 'stage': stage_name, 'seconds': round(seconds, 6)}
+    entry.update(info)
+    _run['files'].append(entry)
+
+
+def count(name, n=1):
+    """Contador libre (archivos procesados, mapas escritos...) para el throughput"""
+    if _run is None:
+        return
+    with _lock:
+        _run['counters'][name] = _run['counters'].get(name, 0) + n
+
+
+def max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KB, macOS en bytes
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def finish(output=None):
+    """Cierra la corrida, escribe el reporte JSON e imprime el resumen"""
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+
+    wall = time.perf_counter() - run['t0']
+    if run['profiler']:
+        run['profiler'].disable()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stages = {name: {'seconds': round(s['seconds'], 4), 'calls': s['calls'],
+                     'share': round(s['seconds'] / wall, 4) if wall else 0}
+              for name, s in sorted(run['stages'].items(), key=lambda x: -x[1]['seconds'])}
+
+    by_stage = {}
+    for entry in run['files']:
+        agg = by_stage.setdefault(entry['stage'], {'files': 0, 'seconds': 0.0})
+        agg['files'] += 1
+        agg['seconds'] += entry['seconds']
+    for agg in by_stage.values():
+        agg['files_per_second'] = round(agg['files'] / agg['seconds'], 1) if agg['seconds'] else None
+        agg['seconds'] = round(agg['seconds'], 4)
+
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    output = Path(output) if output else PROFILE_DIR / f"{run['script']}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    prof_file = None
+    if run['profiler']:
+        prof_file = output.with_suffix('.prof')
+        run['profiler'].dump_stats(prof_file)
+
+    report = {
+        'script': run['script'],
+        'argv': run['argv'],
+        'started': run['started'],
+        'wall_seconds': round(wall, 4),
+        'stages': stages,
+        'unstaged_seconds': round(max(0.0, wall - sum(s['seconds'] for s in run['stages'].values())), 4),
+        'counters': run['counters'],
+        'throughput': {name: round(n / wall, 2) for name, n in run['counters'].items()} if wall else {},
+        'files': by_stage,
+        'slowest': sorted(run['files'], key=lambda e: -e['seconds'])[:run['top']],
+        'memory': {'tracemalloc_peak_kb': round(peak / 1024), 'max_rss_kb': max_rss_kb()},
+        'cprofile': str(prof_file) if prof_file else None,
+    }
+
+    tmp = output.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, output)
+
+    print_report(report)
+    print(f"💾 Perfil: {output}" + (f" | cProfile: {prof_file}" if prof_file else ""))
+    return report
+
+
+def print_report(report):
+    print(f"\n⏱️  PERFIL {report['script']} — {report['wall_seconds']:.2f}s\n")
+    for name, s in report['stages'].items():
+        print(f"  {name:<18} {s['seconds']:>9.2f}s {100 * s['share']:>5.1f}%  ({s['calls']} llamadas)")
+    print(f"  {'sin etapa':<18} {report['unstaged_seconds']:>9.2f}s")
+    for name, n in report['counters'].items():
+        print(f"  📦 {name}: {n} ({report['throughput'].get(name, 0)}/s)")
+    if report['slowest']:
+        print("\n🐢 Archivos más lentos:")
+        for e in report['slowest']:
+            print(f"  {e['seconds'] * 1000:>9.1f} ms  [{e['stage']}] {Path(e['file']).name[:60]}")
+    mem = report['memory']
+    print(f"\n🧠 Pico tracemalloc: {mem['tracemalloc_peak_kb'] / 1024:.1f} MB"
+          + (f" | RSS máximo: {mem['max_rss_kb'] / 1024:.1f} MB" if mem['max_rss_kb'] else ""))
+
+
+def compare(old_file, new_file):
+    """Tiempo por etapa entre dos reportes"""
+    old = json.loads(Path(old_file).read_text(encoding='utf-8'))
+    new = json.loads(Path(new_file).read_text(encoding='utf-8'))
+    print(f"\n📊 {old['script']}: {old['started']} → {new['started']}\n")
+    names = list(dict.fromkeys(list(new['stages']) + list(old['stages'])))
+    for name in names + ['(total)']:
+        if name == '(total)':
+            a, b = old['wall_seconds'], new['wall_seconds']
+        else:
+            a = old['stages'].get(name, {}).get('seconds', 0.0)
+            b = new['stages'].get(name, {}).get('seconds', 0.0)
+        delta = f"{100 * (b / a - 1):>+6.0f}%" if a else f"{'nuevo':>7}"
+        print(f"  {name:<18} {a:>9.2f}s → {b:>9.2f}s {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar dos reportes de --profile')
+    parser.add_argument('before', help='Reporte JSON anterior')
+    parser.add_argument('after', help='Reporte JSON nuevo')
+    args = parser.parse_args()
+    compare(args.before, args.after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Publicación Compacta de Mapas - MedMaps
+
+Prepara data/ para hosting estático: reescribe los JSON que descarga el
+portal (data/maps/*.json, data/combined/*.json y los artefactos globales)
+minificados, y deja junto a cada uno su versión precomprimida .gz (nivel 9)
+y .br (calidad 11, si está instalado el módulo brotli). Un servidor con
+gzip_static/brotli_static (o equivalente) entrega esas versiones sin
+comprimir en cada request.
+
+Los mapas con más de --shard-threshold nodos se parten además en
+data/shards/<id>/: skeleton.json (la raíz y los dos primeros niveles, es
+decir secciones e ítems sin su detalle) y un <n>.json por cada sección con
+contenido más profundo (el subárbol completo de root.children[n]). Si el
+esqueleto sigue siendo grande (mapas planos), solo trae la primera página
+de secciones y el resto va en page-<k>.json.
+data/shards/index.json lista los mapas partidos; js/data-loader.js carga
+primero el esqueleto y el viewer pide cada sección cuando se abre.
+
+Los archivos que no cambiaron desde la última publicación (tamaño y mtime
+en .cache/publish_manifest.json) no se vuelven a leer ni a comprimir.
+
+Uso:
+    python publish_maps.py                          # Publicar lo que cambió
+    python publish_maps.py --force                  # Recomprimir todo
+    python publish_maps.py --jobs 4                 # Con 4 procesos
+    python publish_maps.py --shard-threshold 1000   # Partir mapas de más de 1000 nodos
+    python publish_maps.py --report                 # Tamaños por archivo y totales
+"""
+
+import os
+import re
+import gzip
+import shutil
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import index_store
+from index_store import map_sort_key
+from compact_maps import expand_map
+
+DATA_DIR = Path("data")
+MAPS_DIR = DATA_DIR / "maps"
+COMBINED_DIR = DATA_DIR / "combined"
+SHARDS_DIR = DATA_DIR / "shards"
+SHARDS_INDEX = SHARDS_DIR / "index.json"
+ARTIFACTS = ['maps_index.json', 'specialties.json', 'stats.json', 'recent.json']
+PUBLISH_MANIFEST = Path(".cache/publish_manifest.json")
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+SIBLINGS = ('.gz', '.br')
+
+# Mapas con más nodos que esto se publican también como esqueleto + secciones
+SHARD_THRESHOLD = 1500
+# Nodos máximos por página de secciones (la primera va en el esqueleto)
+PAGE_NODES = 600
+
+# Mismo criterio que buildRedflags() en js/data-loader.js: esa sección se
+# muestra primero, así que va completa en el esqueleto
+REDFLAGS_RE = re.compile(r'red\s*flag|urgenc|alerta|alarm')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def list_published_files():
+    """JSON que descarga el portal, con rutas relativas a data/"""
+    files = sorted(MAPS_DIR.glob("*.json"), key=lambda p: map_sort_key(p.stem))
+    files += sorted(COMBINED_DIR.glob("*.json"))
+    files += [DATA_DIR / name for name in ARTIFACTS if (DATA_DIR / name).exists()]
+    files += sorted(SHARDS_DIR.rglob("*.json"))
+    return files
+
+
+def sibling(path, suffix):
+    return path.with_name(path.name + suffix)
+
+
+def write_bytes(path, data):
+    """Escribe bytes de forma atómica"""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def minify_obj(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def minify(data):
+    """JSON sin espacios ni indentación (mismo contenido)"""
+    return minify_obj(json.loads(data))
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        stack.extend(n.get('children') or [])
+    return count
+
+
+def section_title(node):
+    text = (node.get('text') or '').replace('\\N', '\n').replace('\\n', '\n')
+    return text.strip().split('\n')[0].lower()
+
+
+def split_map(map_data, page_nodes=PAGE_NODES):
+    """Esqueleto, {n: subárbol de la sección n} y páginas de secciones siguientes
+
+    Las secciones con detalle más profundo que sus ítems quedan recortadas
+    (ítems sin hijos, marcadas con `shard`). Si aun así el esqueleto supera
+    page_nodes nodos (mapas planos, con miles de temas colgando de la raíz),
+    las secciones que sobran van en páginas que se cargan al hacer scroll.
+    """
+    root = map_data['root']
+    sections = []
+    shards = {}
+    for n, section in enumerate(root.get('children') or []):
+        items = section.get('children') or []
+        deep = any(item.get('children') for item in items)
+        if not deep or REDFLAGS_RE.search(section_title(section)):
+            sections.append(section)
+            continue
+        shards[n] = section
+        trimmed = {k: v for k, v in section.items() if k != 'children'}
+        trimmed['children'] = [{**item, 'children': []} for item in items]
+        trimmed['shard'] = n
+        sections.append(trimmed)
+
+    pages = [[]]
+    size = 0
+    for section in sections:
+        nodes = count_nodes(section)
+        if pages[-1] and size + nodes > page_nodes:
+            pages.append([])
+            size = 0
+        pages[-1].append(section)
+        size += nodes
+
+    skeleton = {k: v for k, v in map_data.items() if k != 'root'}
+    skeleton['root'] = {**root, 'children': pages[0]}
+    if len(pages) > 1:
+        skeleton['pages'] = len(pages)
+    return skeleton, shards, pages[1:]
+
+
+def write_shards(map_file, threshold):
+    """(Re)genera data/shards/<id>/ para un mapa; retorna cuántos archivos escribió"""
+    out_dir = SHARDS_DIR / map_file.stem
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+
+    try:
+        map_data = expand_map(json.loads(map_file.read_bytes()))
+    except (OSError, ValueError):
+        return 0
+    root = map_data.get('root')
+    if not root or count_nodes(root) <= threshold:
+        return 0
+
+    skeleton, shards, pages = split_map(map_data)
+    if not shards and not pages:
+        return 0
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    write_bytes(out_dir / "skeleton.json", minify_obj(skeleton))
+    for n, section in shards.items():
+        write_bytes(out_dir / f"{n}.json", minify_obj(section))
+    for k, page in enumerate(pages, start=1):
+        write_bytes(out_dir / f"page-{k}.json", minify_obj(page))
+    return 1 + len(shards) + len(pages)
+
+
+def update_shards(changed, threshold, force=False):
+    """Regenera los shards de los mapas modificados y data/shards/index.json"""
+    try:
+        with open(SHARDS_INDEX, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    maps = index.get('maps', {})
+    if force or index.get('threshold') != threshold:
+        # Cambió el umbral: hay que revisar todos los mapas
+        changed = sorted(MAPS_DIR.glob("*.json"), key=lambda p: map_sort_key(p.stem))
+        maps = {}
+
+    for f in changed:
+        count = write_shards(f, threshold)
+        if count:
+            maps[f.stem] = count
+        else:
+            maps.pop(f.stem, None)
+
+    # Mapas eliminados
+    existing = {f.stem for f in MAPS_DIR.glob("*.json")}
+    for stale in [m for m in maps if m not in existing]:
+        del maps[stale]
+    if SHARDS_DIR.exists():
+        for d in SHARDS_DIR.iterdir():
+            if d.is_dir() and d.name not in maps:
+                shutil.rmtree(d)
+
+    new_index = {'threshold': threshold, 'maps': dict(sorted(maps.items(), key=lambda kv: map_sort_key(kv[0])))}
+    if new_index != index:
+        SHARDS_DIR.mkdir(parents=True, exist_ok=True)
+        write_bytes(SHARDS_INDEX, minify_obj(new_index))
+    return new_index['maps']
+
+
+def publish_file(path):
+    """Minifica un JSON en su lugar y escribe sus .gz/.br
+
+    Retorna el registro del manifiesto, o None si el archivo no es JSON válido.
+    """
+    data = path.read_bytes()
+    try:
+        compact = minify(data)
+    except ValueError:
+        return None
+
+    if compact != data:
+        write_bytes(path, compact)
+
+    gz = gzip.compress(compact, GZIP_LEVEL, mtime=0)
+    write_bytes(sibling(path, '.gz'), gz)
+    if brotli:
+        br = brotli.compress(compact, quality=BROTLI_QUALITY)
+        write_bytes(sibling(path, '.br'), br)
+    else:
+        # Un .br viejo serviría contenido desactualizado
+        sibling(path, '.br').unlink(missing_ok=True)
+
+    st = path.stat()
+    return {
+        'size': st.st_size,
+        'mtime': st.st_mtime_ns,
+        'sha1': hashlib.sha1(compact).hexdigest(),
+        'original': len(data),
+        'min': len(compact),
+        'gz': len(gz),
+        'br': len(br) if brotli else None,
+    }
+
+
+def _publish_task(path):
+    return path, publish_file(path)
+
+
+def iter_published(files, jobs=1):
+    """Publica los archivos dados, en paralelo si jobs > 1"""
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1:
+        for f in files:
+            yield _publish_task(f)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(_publish_task, files, chunksize=16)
+
+
+def load_publish_manifest():
+    if not PUBLISH_MANIFEST.exists():
+        return {}
+    try:
+        with open(PUBLISH_MANIFEST, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_publish_manifest(manifest):
+    PUBLISH_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    write_bytes(PUBLISH_MANIFEST, json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+
+
+def is_current(path, record):
+    """El archivo y sus comprimidos siguen como quedaron al publicarlos"""
+    if not record:
+        return False
+    st = path.stat()
+    if record['size'] != st.st_size or record['mtime'] != st.st_mtime_ns:
+        return False
+    if not sibling(path, '.gz').exists():
+        return False
+    return bool(brotli) == sibling(path, '.br').exists()
+
+
+def human(size):
+    if size is None:
+        return '-'
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024 or unit == 'MB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def print_sizes(key, rec):
+    print(f"  {key:<40} {human(rec['original']):>9} → {human(rec['min']):>9}"
+          f"  gz {human(rec['gz']):>9}  br {human(rec['br']):>9}")
+
+
+def print_totals(manifest):
+    totals = {k: sum(r[k] or 0 for r in manifest.values()) for k in ('original', 'min', 'gz', 'br')}
+    print(f"\n📊 TOTAL ({len(manifest)} archivos)")
+    print(f"  Original:   {human(totals['original'])}")
+    print(f"  Minificado: {human(totals['min'])}")
+    print(f"  gzip:       {human(totals['gz'])}")
+    if brotli:
+        print(f"  brotli:     {human(totals['br'])}")
+    if totals['original']:
+        best = totals['br'] if brotli else totals['gz']
+        print(f"  Transferencia: -{100 * (1 - best / totals['original']):.0f}% vs. JSON original")
+
+
+def publish(jobs=1, force=False, shard_threshold=SHARD_THRESHOLD):
+    """Minifica y precomprime lo que cambió desde la última publicación"""
+    print("\n📦 PUBLICANDO data/ (minificado + .gz/.br)\n")
+    print("=" * 60)
+    if not brotli:
+        print("⚠️ Módulo brotli no instalado: solo se generan .gz (pip install brotli)")
+
+    # El sitio lee maps_index.json: volcar el journal antes de comprimir
+    index_store.compact_pending()
+
+    old = {} if force else load_publish_manifest()
+
+    # Shards de los mapas grandes que cambiaron (antes de listar lo que se comprime)
+    changed_maps = [f for f in sorted(MAPS_DIR.glob("*.json"))
+                    if not is_current(f, old.get(str(f.relative_to(DATA_DIR))))]
+    sharded = update_shards(changed_maps, shard_threshold, force=force)
+
+    files = list_published_files()
+    manifest = {}
+    pending = []
+    for f in files:
+        key = str(f.relative_to(DATA_DIR))
+        if is_current(f, old.get(key)):
+            manifest[key] = old[key]
+        else:
+            pending.append(f)
+
+    errors = 0
+    for f, rec in iter_published(pending, jobs):
+        key = str(f.relative_to(DATA_DIR))
+        if rec is None:
+            errors += 1
+            print(f"  ⚠️ JSON inválido: {key}")
+            continue
+        prev = old.get(key)
+        if prev and prev['sha1'] == rec['sha1']:
+            # Ya estaba minificado: conservar el tamaño antes de la primera publicación
+            rec['original'] = max(rec['original'], prev['original'])
+        manifest[key] = rec
+        print_sizes(key, rec)
+
+    # Comprimidos de archivos que ya no existen
+    removed = 0
+    for key in set(old) - set(manifest):
+        for suffix in SIBLINGS:
+            target = sibling(DATA_DIR / key, suffix)
+            if target.exists():
+                target.unlink()
+                removed += 1
+
+    save_publish_manifest(manifest)
+
+    print(f"\n🔄 Publicados: {len(pending) - errors} | Sin cambios: {len(files) - len(pending)}")
+    if removed:
+        print(f"🗑️ Comprimidos huérfanos eliminados: {removed}")
+    print(f"🧩 Mapas partidos en secciones (> {shard_threshold} nodos): {len(sharded)}")
+    print_totals(manifest)
+
+
+def report():
+    """Tamaños por archivo de la última publicación"""
+    manifest = load_publish_manifest()
+    if not manifest:
+        print("❌ Aún no hay publicación (python publish_maps.py)")
+        return
+    for key, rec in manifest.items():
+        print_sizes(key, rec)
+    print_totals(manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Publicar data/ minificado y precomprimido')
+    parser.add_argument('--force', action='store_true', help='Recomprimir todo')
+    parser.add_argument('--report', action='store_true', help='Ver tamaños por archivo y totales')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Procesos para comprimir (0 = todos los núcleos)')
+    parser.add_argument('--shard-threshold', type=int, default=SHARD_THRESHOLD,
+                        help=f'Partir mapas con más de N nodos (default {SHARD_THRESHOLD})')
+
+    args = parser.parse_args()
+
+    if args.report:
+        report()
+    else:
+        publish(args.jobs, force=args.force, shard_threshold=args.shard_threshold)
+
+
+if __name__ == "__main__":
+    main()
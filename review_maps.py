@@ -9,23 +9,41 @@ Permite:
 - Agregar enlaces a mapas relacionados
 - Buscar mapas por contenido
 
+En los modos interactivos (--reclassify, --update) un hilo lee por
+adelantado los próximos mapas de la cola y arma su preview mientras el
+operador decide, y otro escribe los cambios en segundo plano; al salir se
+espera a que todo quede en disco.
+
 Uso:
     python review_maps.py --list              # Ver todos los mapas
     python review_maps.py --specialty General # Ver mapas de una especialidad
     python review_maps.py --reclassify        # Modo reclasificación interactivo
+    python review_maps.py -r --suggest        # Con sugerencias del clasificador (a/b/c)
+    python review_maps.py -r --auto-accept    # Aplicar solas las que superan el umbral calibrado
+    python review_maps.py -r --auto-accept 0.9  # ... o las de confianza >= 0.9
     python review_maps.py --update MAP_ID     # Actualizar un mapa específico
+    python review_maps.py --update ID1 ID2 …  # Varios, leyendo el siguiente por adelantado
     python review_maps.py --search "término"  # Buscar en contenido
     python review_maps.py --add-links         # Agregar enlaces automáticos a todos
+    python review_maps.py --add-links --tfidf # Enlaces por similitud TF-IDF (batch)
+    python review_maps.py --add-links --profile # Tiempo por etapa/mapa (ver profiling.py)
 """
 
 import json
+import time
+import queue
 import argparse
+import threading
 import re
+import sqlite3
 from pathlib import Path
 from text_to_map import find_related_maps, load_existing_maps
+import index_store
+import change_feed
+import profiling
+from compact_maps import expand_map
 
 MAPS_DIR = Path("data/maps")
-INDEX_FILE = Path("data/maps_index.json")
 
 SPECIALTIES = [
     "Geriatría", "Cardiología", "Neurología", "Nefrología", 
@@ -41,25 +59,35 @@ TAGS = [
     "🏥 Caso Clínico"
 ]
 
-def load_index():
-    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+# Mapas que se leen por adelantado en los modos interactivos
+PREFETCH_DEPTH = 8
 
-def save_index(data):
-    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# --auto-accept sin valor: el umbral que calibró specialty_classifier --suggest
+CALIBRATED = 'cv'
+
+def load_index():
+    return index_store.load_index()
 
 def load_map(map_id):
     map_file = MAPS_DIR / f"{map_id}.json"
     if not map_file.exists():
         return None
-    with open(map_file, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    t0 = time.perf_counter()
+    with profiling.stage('load'):
+        with open(map_file, 'r', encoding='utf-8') as f:
+            map_data = expand_map(json.load(f))
+    profiling.record_file(map_file, time.perf_counter() - t0, 'load',
+                          nodes=map_data.get('node_count'))
+    return map_data
 
 def save_map(map_data):
+    """Escribe el mapa; retorna el hash del contenido para el feed de cambios"""
     map_file = MAPS_DIR / f"{map_data['id']}.json"
-    with open(map_file, 'w', encoding='utf-8') as f:
-        json.dump(map_data, f, ensure_ascii=False, indent=2)
+    with profiling.stage('write'):
+        content = json.dumps(map_data, ensure_ascii=False, separators=(',', ':'))
+        with open(map_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+    return change_feed.content_hash(content)
 
 def get_map_text(node, depth=0):
     """Extrae todo el texto de un mapa para búsqueda"""
@@ -68,6 +96,158 @@ def get_map_text(node, depth=0):
         text += ' ' + get_map_text(child, depth+1)
     return text
 
+def prefetch_maps(entries, render=None, depth=PREFETCH_DEPTH):
+    """Recorre `entries` leyendo en un hilo los próximos `depth` mapas
+
+    Produce (entrada, mapa, preview) en orden; el mapa es None si no existe
+    o no se pudo leer. `render(entrada, mapa)` arma el preview en el mismo
+    hilo, así el operador no espera ni el disco ni el armado del texto.
+    """
+    ready = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+
+    def offer(item):
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        for m in entries:
+            try:
+                map_data = load_map(m['id'])
+            except (OSError, ValueError):
+                map_data = None
+            preview = render(m, map_data) if render and map_data else None
+            if not offer((m, map_data, preview)):
+                return
+        offer(done)
+
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        while True:
+            item = ready.get()
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+def apply_changes(changes):
+    """Escribe mapas modificados: archivos, feed de cambios e índice en un solo lote
+
+    `changes` es una lista de (mapa, campos cambiados, tipo de evento).
+    Retorna los (map_id, error) que no se pudieron escribir.
+    """
+    ops = []
+    events = []
+    errors = []
+    for map_data, fields, kind in changes:
+        try:
+            digest = save_map(map_data)
+        except OSError as e:
+            errors.append((map_data['id'], e))
+            continue
+        events.append(change_feed.event(map_data['id'], kind, fields, digest))
+        ops.append({'op': 'patch', 'id': map_data['id'],
+                    'fields': {field: map_data.get(field) for field in fields}})
+    with profiling.stage('index'):
+        index_store.append(ops)
+        change_feed.append(events)
+    return errors
+
+def start_writer():
+    """Hilo que escribe los cambios en segundo plano (write-behind)
+
+    Retorna (submit, flush): submit(mapa, campos, tipo) encola y vuelve de
+    inmediato; flush() espera a que todo quede en disco y retorna los errores.
+    Lo que se acumula mientras se escribe sale en el mismo lote. Si un lote
+    falla, todos sus mapas quedan como errores; si el hilo igual muere, submit
+    y flush escriben en el hilo principal en vez de encolar para nadie.
+    """
+    pending = queue.Queue()
+    errors = []
+
+    def write(jobs):
+        try:
+            errors.extend(apply_changes(jobs))
+        except Exception as e:
+            errors.extend((map_data['id'], e) for map_data, _, _ in jobs)
+
+    def worker():
+        while True:
+            batch = [pending.get()]
+            while True:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            write([job for job in batch if job is not None])
+            if None in batch:
+                return
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+
+    def submit(map_data, fields, kind):
+        if thread.is_alive():
+            pending.put((map_data, fields, kind))
+        else:
+            write([(map_data, fields, kind)])
+
+    def flush():
+        pending.put(None)
+        thread.join()
+        # Lo que quedó en la cola si el hilo murió antes de llegar al None
+        leftover = []
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                leftover.append(job)
+        if leftover:
+            write(leftover)
+        for map_id, e in errors:
+            print(f"❌ No se pudo guardar {map_id}: {e}")
+        return errors
+
+    return submit, flush
+
+SUGGESTION_KEYS = 'abc'
+
+def render_reclassify_preview(m, map_data, suggestions=None):
+    """Preview de un mapa para el modo reclasificación (con sugerencias del clasificador)"""
+    root = map_data.get('root', {})
+    lines = [
+        f"\n{'='*50}",
+        f"📄 {m['id']}: {m['title']}",
+        f"   Nodos: {m.get('node_count', 0)}",
+        f"   Raíz: {root.get('text', '')[:60]}",
+    ]
+    for child in root.get('children', [])[:3]:
+        lines.append(f"     → {child.get('text', '')[:50]}")
+    if suggestions:
+        lines.append("   💡 " + "  ".join(f"{key}) {specialty} {confidence:.0%}" for key, (specialty, confidence)
+                                         in zip(SUGGESTION_KEYS, suggestions)))
+    return '\n'.join(lines)
+
+def load_specialty_suggestions(retrain=False):
+    """Sugerencias del clasificador por ID (del archivo, o entrenando ahora si no hay)"""
+    import specialty_classifier
+
+    suggestions = None if retrain else specialty_classifier.load_suggestions()
+    if suggestions is None:
+        print("🧠 Entrenando el clasificador de especialidad...")
+        specialty_classifier.suggest()
+        suggestions = specialty_classifier.load_suggestions() or {}
+    return suggestions
+
 def list_maps(specialty=None, show_content=False):
     """Lista mapas, opcionalmente filtrados por especialidad"""
     index = load_index()
@@ -89,8 +269,39 @@ def list_maps(specialty=None, show_content=False):
     if len(index) > 50:
         print(f"\n... y {len(index) - 50} más")
 
-def search_maps(term):
-    """Busca mapas por contenido"""
+def search_maps(term, rebuild=False):
+    """Busca mapas por contenido usando el índice FTS5 (search_index.py)"""
+    import search_index
+
+    if rebuild and search_index.SEARCH_DB.exists():
+        search_index.SEARCH_DB.unlink()
+
+    try:
+        conn = search_index.connect()
+    except sqlite3.OperationalError:
+        # SQLite sin FTS5: recorrer los archivos como antes
+        return search_maps_scan(term)
+
+    with profiling.stage('refresh'):
+        changed, removed = search_index.refresh(conn, MAPS_DIR)
+    if changed or removed:
+        print(f"🗂️  Índice actualizado: {changed} mapas reindexados, {removed} eliminados")
+
+    with profiling.stage('search'):
+        results = search_index.search(conn, term)
+    conn.close()
+
+    print(f"\n🔍 Búsqueda: '{term}' - {len(results)} resultados\n")
+
+    for r in results:
+        where = 'título' if not r['path'] else f"nodo {r['path']}"
+        print(f"{r['map_id']}: {r['title'][:50]} ({where}, {r['hits']} coincidencias)")
+        print(f"   {r['snippet'][:100]}")
+
+    return results
+
+def search_maps_scan(term):
+    """Busca mapas por contenido leyendo cada archivo (sin índice)"""
     index = load_index()
     results = []
     
@@ -116,64 +327,93 @@ def search_maps(term):
     
     return results
 
-def reclassify_interactive():
-    """Modo interactivo para reclasificar mapas"""
+def reclassify_interactive(suggest=False, auto_accept=None, retrain=False):
+    """Modo interactivo para reclasificar mapas
+
+    Con suggest, cada mapa muestra las especialidades que propone
+    specialty_classifier.py como opciones a/b/c; con auto_accept, las
+    sugerencias con confianza >= auto_accept se aplican sin preguntar
+    (CALIBRATED: el umbral de la validación cruzada, si hay alguno).
+    """
     index = load_index()
     general_maps = [m for m in index if m.get('specialty') == 'General']
     
+    suggestions = {}
+    if suggest or auto_accept is not None:
+        suggestions = load_specialty_suggestions(retrain)
+        if auto_accept == CALIBRATED:
+            import specialty_classifier
+            auto_accept = specialty_classifier.load_auto_accept()
+            if auto_accept is None:
+                print("⚠️ Sin umbral calibrado (ver specialty_classifier.py --evaluate): "
+                      "no se acepta nada sin preguntar")
+            else:
+                print(f"🎯 Se aceptan solas las sugerencias con confianza >= {auto_accept}")
+        # Los más seguros primero: los que se aceptan solos y luego los de una tecla
+        general_maps.sort(key=lambda m: -(suggestions.get(m['id']) or [(None, 0.0)])[0][1])
+    
     print(f"\n📋 Hay {len(general_maps)} mapas en 'General' para reclasificar")
-    print("Presiona Enter para saltar, 'q' para salir\n")
+    print("Presiona Enter para saltar, 'q' para salir"
+          + (", a/b/c para elegir una sugerencia" if suggestions else "") + "\n")
     
     for i, s in enumerate(SPECIALTIES, 1):
         print(f"  {i}. {s}")
     print()
     
     updated = 0
+    submit, flush = start_writer()
     
-    for m in general_maps:
-        map_data = load_map(m['id'])
-        if not map_data:
-            continue
-        
-        # Mostrar preview del mapa
-        print(f"\n{'='*50}")
-        print(f"📄 {m['id']}: {m['title']}")
-        print(f"   Nodos: {m.get('node_count', 0)}")
-        
-        # Mostrar primeros nodos
-        root = map_data.get('root', {})
-        print(f"   Raíz: {root.get('text', '')[:60]}")
-        for child in root.get('children', [])[:3]:
-            print(f"     → {child.get('text', '')[:50]}")
-        
-        choice = input("\nEspecialidad (número/Enter/q): ").strip()
-        
-        if choice.lower() == 'q':
-            break
-        
-        if choice.isdigit() and 1 <= int(choice) <= len(SPECIALTIES):
-            new_specialty = SPECIALTIES[int(choice) - 1]
-            
-            # Actualizar mapa
-            map_data['specialty'] = new_specialty
-            save_map(map_data)
+    auto_accepted = 0
+    render = lambda m, map_data: render_reclassify_preview(m, map_data, suggestions.get(m['id']))
+    
+    try:
+        for m, map_data, preview in prefetch_maps(general_maps, render):
+            if not map_data:
+                continue
             
-            # Actualizar índice
-            for idx_m in index:
-                if idx_m['id'] == m['id']:
-                    idx_m['specialty'] = new_specialty
+            options = suggestions.get(m['id']) or []
+            new_specialty = None
+            auto = auto_accept is not None and bool(options) and options[0][1] >= auto_accept
+            if auto:
+                new_specialty = options[0][0]
+                auto_accepted += 1
+                print(f"🤖 {m['id']}: {m['title'][:50]} → {new_specialty} ({options[0][1]:.0%})")
+            else:
+                # Mostrar preview del mapa (armado en segundo plano)
+                print(preview)
+                
+                choice = input("\nEspecialidad (número/letra/Enter/q): ").strip().lower()
+                
+                if choice == 'q':
                     break
+                
+                if choice.isdigit() and 1 <= int(choice) <= len(SPECIALTIES):
+                    new_specialty = SPECIALTIES[int(choice) - 1]
+                elif choice and choice in SUGGESTION_KEYS[:len(options)]:
+                    new_specialty = options[SUGGESTION_KEYS.index(choice)][0]
             
-            print(f"✅ Cambiado a: {new_specialty}")
-            updated += 1
+            if new_specialty and new_specialty != 'General':
+                # Actualizar mapa e índice en segundo plano
+                map_data['specialty'] = new_specialty
+                submit(map_data, ['specialty'], 'reclassify')
+                
+                if not auto:
+                    print(f"✅ Cambiado a: {new_specialty}")
+                updated += 1
+    finally:
+        failed = len(flush())
     
-    save_index(index)
+    updated -= failed
+    if auto_accepted:
+        print(f"\n🤖 Aceptados automáticamente: {auto_accepted}")
     print(f"\n✅ Actualizados: {updated} mapas")
 
 def add_links_to_all():
     """Agrega enlaces relacionados a todos los mapas"""
     index = load_index()
     updated = 0
+    ops = []
+    events = []
     
     print("\n🔗 Agregando enlaces a todos los mapas...")
     
@@ -182,35 +422,96 @@ def add_links_to_all():
         if not map_data:
             continue
         
-        # Obtener texto del mapa
-        text = get_map_text(map_data.get('root', {}))
-        
-        # Encontrar relacionados
-        related = find_related_maps(text, index, m['id'])
+        with profiling.stage('link'):
+            # Obtener texto del mapa
+            text = get_map_text(map_data.get('root', {}))
+            
+            # Encontrar relacionados
+            related = find_related_maps(text, index, m['id'])
+        profiling.count('maps')
         
         if related and related != map_data.get('related_maps', []):
             map_data['related_maps'] = related
-            save_map(map_data)
+            digest = save_map(map_data)
+            events.append(change_feed.event(m['id'], 'link', ['related_maps'], digest))
             
             # Actualizar índice
-            for idx_m in index:
-                if idx_m['id'] == m['id']:
-                    idx_m['related_maps'] = related
-                    break
+            ops.append({'op': 'patch', 'id': m['id'], 'fields': {'related_maps': related}})
             
             updated += 1
             print(f"  {m['id']}: +{len(related)} enlaces")
     
-    save_index(index)
+    with profiling.stage('index'):
+        index_store.append(ops)
+        change_feed.append(events)
     print(f"\n✅ Actualizados: {updated} mapas con enlaces")
 
-def update_map(map_id):
-    """Actualiza un mapa específico interactivamente"""
-    map_data = load_map(map_id)
+def add_links_tfidf(top_k=5, min_similarity=0.15):
+    """Agrega enlaces por similitud TF-IDF, calculados para todo el corpus a la vez"""
+    from map_similarity import build_tfidf, top_k_neighbors
+
+    index = load_index()
+
+    print("\n🔗 Vectorizando mapas (TF-IDF)...")
+
+    # Cargar cada mapa una sola vez
+    entries = []
+    maps = []
+    texts = []
+    for m in index:
+        map_data = load_map(m['id'])
+        if not map_data:
+            continue
+        entries.append(m)
+        maps.append(map_data)
+        with profiling.stage('text'):
+            texts.append(m.get('title', '') + ' ' + get_map_text(map_data.get('root', {})))
+        profiling.count('maps')
+
+    if len(maps) < 2:
+        print("❌ Se necesitan al menos 2 mapas")
+        return
+
+    with profiling.stage('tfidf'):
+        X, vocab = build_tfidf(texts)
+    print(f"   {X.shape[0]} mapas × {len(vocab)} términos")
+
+    with profiling.stage('neighbors'):
+        neighbors = top_k_neighbors(X, k=top_k, min_similarity=min_similarity)
+
+    updated = 0
+    ops = []
+    events = []
+    for m, map_data, nbrs in zip(entries, maps, neighbors):
+        related = [entries[j]['id'] for j, _ in nbrs]
+
+        if related and related != map_data.get('related_maps', []):
+            map_data['related_maps'] = related
+            digest = save_map(map_data)
+            events.append(change_feed.event(m['id'], 'link', ['related_maps'], digest))
+            ops.append({'op': 'patch', 'id': m['id'], 'fields': {'related_maps': related}})
+            updated += 1
+            print(f"  {m['id']}: +{len(related)} enlaces")
+
+    with profiling.stage('index'):
+        index_store.append(ops)
+        change_feed.append(events)
+    print(f"\n✅ Actualizados: {updated} mapas con enlaces")
+
+def update_map(map_id, map_data=None, submit=None):
+    """Actualiza un mapa específico interactivamente
+
+    Con `map_data` se usa el mapa ya leído (prefetch); con `submit` el
+    guardado se encola en el escritor en segundo plano.
+    """
+    if map_data is None:
+        map_data = load_map(map_id)
     if not map_data:
         print(f"❌ Mapa no encontrado: {map_id}")
         return
     
+    before = {field: map_data.get(field) for field in ('specialty', 'tag', 'access')}
+    
     print(f"\n📄 Editando: {map_data['title']}")
     print(f"   Especialidad actual: {map_data.get('specialty', 'N/A')}")
     print(f"   TAG actual: {map_data.get('tag', 'N/A')}")
@@ -243,44 +544,88 @@ def update_map(map_id):
     elif choice == 'p':
         map_data['access'] = 'premium'
     
-    # Guardar
-    save_map(map_data)
-    
-    # Actualizar índice
-    index = load_index()
-    for m in index:
-        if m['id'] == map_id:
-            m['specialty'] = map_data.get('specialty')
-            m['tag'] = map_data.get('tag')
-            m['access'] = map_data.get('access', 'free')
-            break
-    save_index(index)
+    # Guardar (solo si algo cambió)
+    changed = [field for field in ('specialty', 'tag', 'access')
+               if map_data.get(field) != before.get(field)]
+    if not changed:
+        print(f"\n⏭️  Sin cambios: {map_id}")
+        return
+    change = (map_data, changed, 'reclassify' if changed == ['specialty'] else 'edit')
+    if submit:
+        submit(*change)
+    elif apply_changes([change]):
+        print(f"❌ No se pudo guardar: {map_id}")
+        return
     
     print(f"\n✅ Mapa actualizado: {map_id}")
 
+def update_maps(map_ids):
+    """Actualiza varios mapas seguidos, leyendo el siguiente mientras se edita el actual"""
+    submit, flush = start_writer()
+    try:
+        entries = [{'id': map_id} for map_id in map_ids]
+        for m, map_data, _ in prefetch_maps(entries):
+            update_map(m['id'], map_data or {}, submit)
+    finally:
+        flush()
+
+def auto_accept_arg(value):
+    """Tipo de --auto-accept: un umbral numérico o CALIBRATED"""
+    return value if value == CALIBRATED else float(value)
+
+def run(args, parser):
+    """Ejecuta la acción pedida en la línea de comandos"""
+    if args.list or args.specialty:
+        list_maps(args.specialty)
+    elif args.reclassify:
+        reclassify_interactive(args.suggest, args.auto_accept, args.retrain)
+    elif args.update:
+        update_maps(args.update)
+    elif args.search:
+        search_maps(args.search, args.reindex)
+    elif args.add_links:
+        if args.tfidf:
+            add_links_tfidf(args.top_k, args.min_sim)
+        else:
+            add_links_to_all()
+    else:
+        parser.print_help()
+
 def main():
     parser = argparse.ArgumentParser(description='Revisar y actualizar mapas MedMaps')
     parser.add_argument('--list', '-l', action='store_true', help='Listar todos los mapas')
     parser.add_argument('--specialty', '-s', help='Filtrar por especialidad')
     parser.add_argument('--reclassify', '-r', action='store_true', help='Modo reclasificación')
-    parser.add_argument('--update', '-u', help='Actualizar mapa específico')
+    parser.add_argument('--suggest', action='store_true',
+                        help='Con --reclassify: ofrecer las sugerencias de specialty_classifier.py')
+    parser.add_argument('--auto-accept', type=auto_accept_arg, nargs='?', const=CALIBRATED,
+                        metavar='UMBRAL',
+                        help='Con --reclassify: aplicar sin preguntar las sugerencias con confianza '
+                             '>= UMBRAL; sin UMBRAL, el calibrado por validación cruzada en '
+                             'specialty_classifier.py --suggest (si ninguno es confiable, nada)')
+    parser.add_argument('--retrain', action='store_true',
+                        help='Con --suggest: reentrenar aunque ya exista el archivo de sugerencias')
+    parser.add_argument('--update', '-u', nargs='+', metavar='MAP_ID',
+                        help='Actualizar uno o más mapas (se leen por adelantado)')
     parser.add_argument('--search', help='Buscar en contenido')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Con --search: reconstruir el índice de búsqueda desde cero')
     parser.add_argument('--add-links', action='store_true', help='Agregar enlaces a todos')
+    parser.add_argument('--tfidf', action='store_true',
+                        help='Con --add-links: usar similitud TF-IDF de todo el corpus')
+    parser.add_argument('--top-k', type=int, default=5, help='Máximo de enlaces por mapa (--tfidf)')
+    parser.add_argument('--min-sim', type=float, default=0.15,
+                        help='Similitud coseno mínima para enlazar (--tfidf)')
+    profiling.add_arguments(parser)
     
     args = parser.parse_args()
     
-    if args.list or args.specialty:
-        list_maps(args.specialty)
-    elif args.reclassify:
-        reclassify_interactive()
-    elif args.update:
-        update_map(args.update)
-    elif args.search:
-        search_maps(args.search)
-    elif args.add_links:
-        add_links_to_all()
-    else:
-        parser.print_help()
+    try:
+        with profiling.from_args('review_maps', args):
+            run(args, parser)
+    finally:
+        # El sitio lee maps_index.json: no dejar cambios solo en el journal
+        index_store.compact_pending()
 
 if __name__ == "__main__":
     main()
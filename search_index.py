@@ -0,0 +1,184 @@
+"""
+Índice de Búsqueda Full-Text - MedMaps
+
+Índice SQLite FTS5 persistente sobre los títulos y el texto de cada nodo de
+data/maps/*.json. Cada fila es un nodo, identificado por (map_id, path),
+donde path es la posición del nodo en el árbol ("" = título, "2.0.5" =
+hijo 5 del hijo 0 del hijo 2 de la raíz).
+
+El índice se refresca de forma incremental: solo se reindexan los mapas
+cuyo mtime o tamaño cambió desde la última vez, y se eliminan los que ya no
+existen.
+
+Lo usa review_maps.py --search.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+from compact_maps import expand_map
+
+MAPS_DIR = Path("data/maps")
+SEARCH_DB = Path(".cache/search.db")
+
+# Peso del título frente al texto de los nodos en el ranking bm25
+TITLE_WEIGHT = 5.0
+TEXT_WEIGHT = 1.0
+
+
+def connect(db_path=SEARCH_DB):
+    """Abre (y crea si hace falta) la base del índice"""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS indexed_maps (
+            map_id TEXT PRIMARY KEY,
+            title TEXT,
+            mtime_ns INTEGER,
+            size INTEGER,
+            first_row INTEGER,
+            last_row INTEGER
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS nodes USING fts5(
+            map_id UNINDEXED,
+            path UNINDEXED,
+            title,
+            text,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+    """)
+    return conn
+
+
+def clean_text(text):
+    """Normaliza los saltos de línea literales de SimpleMind"""
+    return text.replace('\\N', ' ').replace('\\n', ' ').strip()
+
+
+def iter_nodes(root):
+    """Recorre el árbol (sin recursión) entregando (path, texto)"""
+    stack = [('', root)]
+    while stack:
+        path, node = stack.pop()
+        yield path, node.get('text', '')
+        children = node.get('children', [])
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((f"{path}.{i}" if path else str(i), children[i]))
+
+
+def drop_map(conn, map_id):
+    """Elimina las filas de un mapa (por rango de rowid, sin recorrer la tabla)"""
+    row = conn.execute("SELECT first_row, last_row FROM indexed_maps WHERE map_id = ?",
+                       (map_id,)).fetchone()
+    if row:
+        conn.execute("DELETE FROM nodes WHERE rowid BETWEEN ? AND ?", row)
+        conn.execute("DELETE FROM indexed_maps WHERE map_id = ?", (map_id,))
+
+
+def index_map(conn, map_id, map_data, mtime_ns, size):
+    """(Re)indexa un mapa: una fila por título y una por nodo
+
+    Las filas de un mapa se insertan contiguas y se guarda su rango de
+    rowid, para poder borrarlas luego sin escanear el índice completo.
+    """
+    drop_map(conn, map_id)
+
+    title = map_data.get('title', '')
+    rows = [(map_id, '', title, '')]
+    root = map_data.get('root')
+    if root:
+        for path, text in iter_nodes(root):
+            text = clean_text(text)
+            if text:
+                rows.append((map_id, path or 'root', '', text))
+
+    first_row = (conn.execute("SELECT max(rowid) FROM nodes").fetchone()[0] or 0) + 1
+    conn.executemany("INSERT INTO nodes (rowid, map_id, path, title, text) VALUES (?, ?, ?, ?, ?)",
+                     [(first_row + i,) + row for i, row in enumerate(rows)])
+    conn.execute("INSERT INTO indexed_maps VALUES (?, ?, ?, ?, ?, ?)",
+                 (map_id, title, mtime_ns, size, first_row, first_row + len(rows) - 1))
+
+
+def refresh(conn, maps_dir=MAPS_DIR):
+    """Sincroniza el índice con los archivos de maps_dir según mtime/tamaño
+
+    Retorna (reindexados, eliminados).
+    """
+    known = {row[0]: (row[1], row[2]) for row in
+             conn.execute("SELECT map_id, mtime_ns, size FROM indexed_maps")}
+
+    seen = set()
+    changed = 0
+    with conn:
+        for map_file in maps_dir.glob("*.json"):
+            map_id = map_file.stem
+            seen.add(map_id)
+            st = map_file.stat()
+            if known.get(map_id) == (st.st_mtime_ns, st.st_size):
+                continue
+
+            try:
+                with open(map_file, 'r', encoding='utf-8') as f:
+                    map_data = expand_map(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+            index_map(conn, map_id, map_data, st.st_mtime_ns, st.st_size)
+            changed += 1
+
+        removed = [m for m in known if m not in seen]
+        for map_id in removed:
+            drop_map(conn, map_id)
+
+    return changed, len(removed)
+
+
+def to_match_query(term):
+    """Convierte el término del usuario en una consulta FTS5 segura
+
+    Cada palabra se cita (para neutralizar la sintaxis de FTS5) y se busca
+    como prefijo; todas deben aparecer.
+    """
+    words = [w.replace('"', '') for w in term.split()]
+    return ' '.join(f'"{w}"*' for w in words if w)
+
+
+def search(conn, term, limit=20):
+    """Busca `term` y retorna los mapas ordenados por relevancia
+
+    Cada resultado es un dict con map_id, title, path (nodo que mejor
+    coincide; "" si fue el título), snippet y hits (nodos que coinciden).
+    """
+    query = to_match_query(term)
+    if not query:
+        return []
+
+    rows = conn.execute(f"""
+        SELECT nodes.map_id, nodes.path, indexed_maps.title,
+               snippet(nodes, -1, '[', ']', '…', 12),
+               bm25(nodes, 0, 0, {TITLE_WEIGHT}, {TEXT_WEIGHT}) AS rank
+        FROM nodes JOIN indexed_maps ON indexed_maps.map_id = nodes.map_id
+        WHERE nodes MATCH ?
+        ORDER BY rank
+    """, (query,))
+
+    results = {}
+    for map_id, path, title, snippet, rank in rows:
+        hit = results.get(map_id)
+        if hit is None:
+            if len(results) >= limit:
+                # Ya tenemos `limit` mapas; solo seguir contando hits
+                continue
+            results[map_id] = {
+                'map_id': map_id,
+                'title': title,
+                'path': path,
+                'snippet': snippet,
+                'rank': rank,
+                'hits': 1,
+            }
+        else:
+            hit['hits'] += 1
+
+    return list(results.values())
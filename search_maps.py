@@ -2,18 +2,40 @@
 """
 Búsqueda Rápida de Mapas MedMaps
 
+La búsqueda usa un índice de trigramas de caracteres sobre los títulos y los
+nodos de primer nivel de cada mapa, normalizado sin tildes, así que tolera
+acentos ("fibrilacion" → "Fibrilación") y errores de tipeo. El índice se
+guarda en .cache/trigram_index.json y solo se reconstruye si cambió el
+índice de mapas o alguno de los archivos de data/maps.
+
 Uso:
     python search_maps.py "término"
     python search_maps.py --related "delirium"
     python search_maps.py --stats
 """
 
+import os
 import json
+import hashlib
+import re
 import sys
+import unicodedata
+from collections import defaultdict
 from pathlib import Path
 
+import index_store
+from compact_maps import expand_map
+
 MAPS_DIR = Path("data/maps")
-INDEX_FILE = Path("data/maps_index.json")
+NODES_CACHE = Path(".cache/trigram_nodes.json")
+TRIGRAM_CACHE = Path(".cache/trigram_index.json")
+
+# Similitud mínima entre una palabra de la consulta y una del mapa (Jaccard
+# de trigramas) y fracción mínima de la consulta que debe coincidir
+WORD_SIMILARITY = 0.45
+MIN_SCORE = 0.5
+# Los nodos de primer nivel pesan menos que el título
+NODE_WEIGHT = 0.8
 
 # Relaciones temáticas predefinidas
 RELATED_TOPICS = {
@@ -34,43 +56,225 @@ RELATED_TOPICS = {
 }
 
 def load_index():
-    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return index_store.load_index()
+
+def fold(text):
+    """Minúsculas, sin tildes y solo letras/dígitos separados por un espacio"""
+    text = text.replace('\\N', ' ').replace('\\n', ' ')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.findall(r'[a-z0-9]+', text.lower()))
+
+def trigrams(word):
+    """Trigramas de una palabra ya normalizada, con bordes"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def load_top_level_nodes(index):
+    """Textos normalizados de los nodos de primer nivel de cada mapa
+
+    Se cachean en NODES_CACHE por mtime del archivo del mapa, así que solo
+    se leen los mapas nuevos o modificados.
+    """
+    cache = {}
+    if NODES_CACHE.exists():
+        try:
+            with open(NODES_CACHE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+    fresh = {}
+    dirty = False
+    for m in index:
+        map_file = MAPS_DIR / f"{m['id']}.json"
+        try:
+            mtime = map_file.stat().st_mtime_ns
+        except OSError:
+            continue
+
+        cached = cache.get(m['id'])
+        if cached is None or cached['mtime'] != mtime:
+            try:
+                with open(map_file, 'r', encoding='utf-8') as f:
+                    root = expand_map(json.load(f)).get('root', {})
+            except (OSError, ValueError):
+                continue
+            texts = [fold(c.get('text', '')) for c in root.get('children', [])]
+            cached = {'mtime': mtime, 'nodes': [t for t in texts if t]}
+            dirty = True
+        fresh[m['id']] = cached
 
-def search(term, index):
-    """Búsqueda simple por término"""
-    term_lower = term.lower()
-    results = []
+    if dirty or len(fresh) != len(cache):
+        NODES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(NODES_CACHE, 'w', encoding='utf-8') as f:
+            json.dump(fresh, f, ensure_ascii=False)
 
-    for m in index:
-        title_lower = m.get('title', '').lower()
-        if term_lower in title_lower:
-            results.append(m)
+    return {map_id: entry['nodes'] for map_id, entry in fresh.items()}
 
-    return results
+def build_trigram_index(index, with_nodes=True):
+    """Índice de trigramas sobre el vocabulario de títulos y nodos
+
+    - fields: (mapa, peso, texto normalizado) — el título y, si with_nodes,
+      cada nodo de primer nivel
+    - words: palabra → posiciones de los campos donde aparece
+    - postings: trigrama → palabras que lo contienen
+
+    Los typos se resuelven comparando palabras (vocabulario chico) en vez
+    de campos completos.
+    """
+    top_nodes = load_top_level_nodes(index) if with_nodes else {}
 
-def search_related(term, index):
+    fields = []
+    words = defaultdict(set)
+    for m in index:
+        entries = [(1.0, fold(m.get('title', '')))]
+        entries += [(NODE_WEIGHT, t) for t in top_nodes.get(m['id'], [])]
+        for weight, text in entries:
+            pos = len(fields)
+            fields.append((m, weight, text))
+            for w in text.split():
+                words[w].add(pos)
+
+    # Posiciones ordenadas: el desempate del ranking no depende del hash de los sets
+    words = {w: sorted(pos) for w, pos in words.items()}
+    postings = defaultdict(list)
+    for w in words:
+        for g in trigrams(w):
+            postings[g].append(w)
+
+    return {'fields': fields, 'words': words, 'postings': postings}
+
+def index_stamp(index, with_nodes=True):
+    """Huella de lo que entra al índice: ID y título de cada mapa y mtime de su archivo"""
+    h = hashlib.sha1()
+    h.update(b'nodes' if with_nodes else b'titles')
+    for m in index:
+        mtime = None
+        if with_nodes:
+            try:
+                mtime = (MAPS_DIR / f"{m['id']}.json").stat().st_mtime_ns
+            except OSError:
+                pass
+        h.update(json.dumps([m['id'], m.get('title', ''), mtime], ensure_ascii=False).encode('utf-8'))
+    return h.hexdigest()
+
+def load_trigram_index(index, with_nodes=True):
+    """Índice de trigramas desde TRIGRAM_CACHE, reconstruido si cambió su huella
+
+    En la caché los campos guardan el ID del mapa; al cargar se resuelven
+    contra el índice actual, así los resultados muestran la entrada vigente.
+    """
+    stamp = index_stamp(index, with_nodes)
+    try:
+        with open(TRIGRAM_CACHE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['stamp'] == stamp:
+            by_id = {m['id']: m for m in index}
+            return {
+                'fields': [(by_id[map_id], weight, text) for map_id, weight, text in cached['fields']],
+                'words': cached['words'],
+                'postings': cached['postings'],
+            }
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    trigram_index = build_trigram_index(index, with_nodes)
+    data = {
+        'stamp': stamp,
+        'fields': [[m['id'], weight, text] for m, weight, text in trigram_index['fields']],
+        'words': trigram_index['words'],
+        'postings': trigram_index['postings'],
+    }
+    TRIGRAM_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = TRIGRAM_CACHE.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, TRIGRAM_CACHE)
+    return trigram_index
+
+def similar_words(word, trigram_index):
+    """Palabras del índice parecidas a `word`: {palabra: similitud 0-1}"""
+    grams = trigrams(word)
+    counts = defaultdict(int)
+    for g in grams:
+        for w in trigram_index['postings'].get(g, ()):
+            counts[w] += 1
+
+    similar = {}
+    for w, common in counts.items():
+        sim = common / (len(grams) + len(trigrams(w)) - common)
+        # Un prefijo de 4+ letras cuenta casi como coincidencia exacta
+        if len(word) >= 4 and w.startswith(word):
+            sim = max(sim, 0.9)
+        if sim >= WORD_SIMILARITY:
+            similar[w] = sim
+    return similar
+
+def search(term, index, trigram_index=None, min_score=MIN_SCORE):
+    """Búsqueda por similitud de trigramas, tolerante a tildes y typos
+
+    Cada palabra de la consulta se compara con el vocabulario; un campo
+    puntúa el promedio de la mejor similitud de cada palabra, por su peso.
+    Retorna los mapas ordenados por su mejor campo; las coincidencias
+    exactas de la frase completa quedan primero.
+    """
+    if trigram_index is None:
+        trigram_index = load_trigram_index(index)
+
+    query = fold(term)
+    query_words = query.split()
+    if not query_words:
+        return []
+
+    field_scores = defaultdict(float)
+    for qw in query_words:
+        best = {}
+        for w, sim in similar_words(qw, trigram_index).items():
+            for pos in trigram_index['words'][w]:
+                if sim > best.get(pos, 0):
+                    best[pos] = sim
+        for pos, sim in best.items():
+            field_scores[pos] += sim / len(query_words)
+
+    best_maps = {}
+    for pos, score in field_scores.items():
+        if score < min_score:
+            continue
+        m, weight, text = trigram_index['fields'][pos]
+        score *= weight
+        if query in text:
+            score += weight
+        if score > best_maps.get(m['id'], (0, None))[0]:
+            best_maps[m['id']] = (score, m)
+
+    ranked = sorted(best_maps.values(), key=lambda x: -x[0])
+    return [m for _, m in ranked]
+
+def search_related(term, index, trigram_index=None):
     """Búsqueda incluyendo términos relacionados"""
-    term_lower = term.lower()
-    all_terms = [term_lower]
+    if trigram_index is None:
+        trigram_index = load_trigram_index(index)
+
+    term_folded = fold(term)
+    all_terms = [term]
 
-    # Agregar términos relacionados
+    # Agregar términos relacionados (comparando sin tildes)
     for key, related in RELATED_TOPICS.items():
-        if key in term_lower or term_lower in key:
+        key_folded = fold(key)
+        if key_folded in term_folded or term_folded in key_folded:
             all_terms.extend(related)
 
-    all_terms = list(set(all_terms))
+    all_terms = list(dict.fromkeys(all_terms))
     results = []
     seen_ids = set()
 
     for t in all_terms:
-        for m in index:
+        for m in search(t, index, trigram_index):
             if m['id'] in seen_ids:
                 continue
-            title_lower = m.get('title', '').lower()
-            if t in title_lower:
-                results.append((m, t))
-                seen_ids.add(m['id'])
+            results.append((m, t))
+            seen_ids.add(m['id'])
 
     return results
 
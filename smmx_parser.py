@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Parser de Archivos SimpleMind (.smmx) - MedMaps
+
+Un .smmx es un zip con un XML adentro. Este módulo es el único parser que
+usan bulk_process.py y process_inbox.py, y entiende las dos formas en que
+llega el XML:
+
+- Plana (la de SimpleMind Pro): <mindmap><topics> con un <topic id parent
+  guid text> por nodo, en cualquier orden, más <relations> con las flechas
+  entre nodos y el guid del mapa en <meta><guid>.
+- Anidada: <node> dentro de <node> (o de <children>), con el texto en un
+  elemento <text>. Los IDs se asignan en preorden.
+
+El XML se lee en streaming con iterparse directamente desde el zip y cada
+elemento se descarta apenas se procesa, así que la memoria queda acotada al
+árbol de salida. Los nodos salen con las mismas claves que data/maps
+(id, parent, text, guid, children).
+
+Los casos de referencia viven en benchmarks/fixtures/smmx (un .smmx y el
+.json esperado por caso); el throughput se mide con
+benchmarks/bench_parse_smmx.py.
+
+Uso:
+    python smmx_parser.py archivo.smmx       # Resumen del archivo parseado
+    python smmx_parser.py --check            # Comparar contra los golden files
+    python smmx_parser.py --update-golden    # Regenerar los .json esperados
+"""
+
+import json
+import zlib
+import zipfile
+import argparse
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# Rutas conocidas del XML dentro del zip; si no está ninguna, el primer .xml
+SMMX_XML_PATHS = ['document/mindmap.xml', 'document.xml', 'mindmap.xml']
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "benchmarks" / "fixtures" / "smmx"
+
+
+def find_xml(names):
+    """Miembro del zip con el mapa, o None"""
+    known = set(names)
+    for path in SMMX_XML_PATHS:
+        if path in known:
+            return path
+    for name in names:
+        if name.endswith('.xml') and not name.startswith('__'):
+            return name
+    return None
+
+
+def _new_node(node_id, parent, text, guid):
+    return {'id': node_id, 'parent': parent, 'text': text, 'guid': guid, 'children': []}
+
+
+def parse_xml(xml_file):
+    """Parsea el XML de un mapa (objeto archivo) en una sola pasada.
+
+    Retorna (raíces en orden de documento, textos, guid del mapa, relaciones).
+    """
+    # Forma plana
+    nodes = {}          # id → nodo de salida
+    pending = {}        # parent id aún no visto → hijos en espera
+    order = {}          # id(nodo) → posición en el documento
+    topics_elem = None
+    topics_done = False
+
+    # Forma anidada
+    stack = []          # nodos <node> abiertos
+    depth = 0
+    node_depths = []    # profundidad XML de cada nodo abierto
+
+    roots = []
+    texts = []
+    relations = []
+    map_guid = ''
+    in_meta = False
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            depth += 1
+            if tag == 'topics' and topics_elem is None:
+                topics_elem = elem
+            elif tag == 'meta':
+                in_meta = True
+            elif tag == 'node':
+                parent = stack[-1] if stack else None
+                node = _new_node(elem.attrib.get('id', str(len(texts))),
+                                 parent['id'] if parent else '-1', '',
+                                 elem.attrib.get('guid', ''))
+                if parent:
+                    parent['children'].append(node)
+                else:
+                    roots.append(node)
+                order[id(node)] = len(texts)
+                texts.append('')
+                stack.append(node)
+                node_depths.append(depth)
+            continue
+
+        depth -= 1
+        if tag == 'topic' and topics_elem is not None and not topics_done:
+            topic_id = elem.attrib.get('id', '')
+            parent_id = elem.attrib.get('parent', '')
+            text = elem.attrib.get('text', '')
+            node = _new_node(topic_id, parent_id, text, elem.attrib.get('guid', ''))
+            node['children'] = pending.pop(topic_id, [])
+
+            if parent_id and parent_id in nodes:
+                nodes[parent_id]['children'].append(node)
+            else:
+                pending.setdefault(parent_id, []).append(node)
+
+            order[id(node)] = len(texts)
+            texts.append(text)
+            nodes[topic_id] = node
+            # Liberar el elemento ya procesado
+            topics_elem.clear()
+        elif tag == 'topics' and elem is topics_elem:
+            # Solo el primer <topics>
+            topics_done = True
+        elif tag == 'text' and stack and node_depths[-1] == depth:
+            # <text> hijo directo del <node> abierto
+            text = (elem.text or '').strip()
+            stack[-1]['text'] = text
+            texts[order[id(stack[-1])]] = text
+        elif tag == 'node' and stack:
+            stack.pop()
+            node_depths.pop()
+            elem.clear()
+        elif tag == 'relation':
+            relations.append(dict(elem.attrib))
+            elem.clear()
+        elif tag == 'guid' and in_meta and not map_guid:
+            map_guid = elem.attrib.get('guid', elem.text or '')
+        elif tag == 'meta':
+            in_meta = False
+
+    # Lo que quedó esperando un padre inexistente son raíces
+    for orphans in pending.values():
+        roots.extend(orphans)
+    roots.sort(key=lambda n: order[id(n)])
+
+    return roots, texts, map_guid, relations
+
+
+def parse_smmx(file_path):
+    """Extrae el contenido de un archivo .smmx; None si no se puede leer o está vacío
+
+    Retorna {'title', 'guid', 'root', 'node_count', 'full_text', 'relations'}.
+    """
+    file_path = Path(file_path)
+    try:
+        with zipfile.ZipFile(file_path, 'r') as z:
+            xml_path = find_xml(z.namelist())
+            if xml_path is None:
+                return None
+            with z.open(xml_path) as xml_file:
+                roots, texts, map_guid, relations = parse_xml(xml_file)
+    except (OSError, zipfile.BadZipFile, ET.ParseError, KeyError, zlib.error, EOFError,
+            LookupError, ValueError, RuntimeError, NotImplementedError):
+        # Zip truncado o mal comprimido, encoding de XML desconocido, cifrado
+        # o método de compresión no soportado, anidamiento excesivo
+        return None
+
+    if not roots:
+        return None
+
+    # Usar el primer root; si hay múltiples, agregarlos como children
+    root_node = roots[0]
+    root_node['children'].extend(roots[1:])
+
+    return {
+        'title': root_node['text'] or file_path.stem,
+        'guid': map_guid,
+        'root': root_node,
+        'node_count': len(texts),
+        'full_text': ' '.join(texts),
+        'relations': relations,
+    }
+
+
+def golden_cases():
+    return sorted(GOLDEN_DIR.glob("*.smmx"))
+
+
+def check_golden(update=False):
+    """Compara parse_smmx contra los .json esperados (o los regenera)"""
+    ok = failed = 0
+    for smmx in golden_cases():
+        expected_file = smmx.with_suffix('.json')
+        result = parse_smmx(smmx)
+        if update:
+            with open(expected_file, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+                f.write('\n')
+            print(f"  📝 {expected_file.name}")
+            continue
+        try:
+            with open(expected_file, 'r', encoding='utf-8') as f:
+                expected = json.load(f)
+        except (OSError, ValueError):
+            expected = '<sin golden file>'
+        if result == expected:
+            ok += 1
+            print(f"  ✅ {smmx.name}")
+        else:
+            failed += 1
+            print(f"  ❌ {smmx.name}: el resultado difiere de {expected_file.name}")
+
+    if not update:
+        print(f"\n✅ Iguales: {ok} | ❌ Distintos: {failed}")
+    return failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parser de archivos SimpleMind (.smmx)')
+    parser.add_argument('files', nargs='*', help='Archivos .smmx a parsear')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--check', action='store_true', help='Comparar contra los golden files')
+    group.add_argument('--update-golden', action='store_true', help='Regenerar los golden files')
+    args = parser.parse_args()
+
+    if args.check or args.update_golden:
+        if not check_golden(update=args.update_golden):
+            raise SystemExit(1)
+    elif args.files:
+        for name in args.files:
+            parsed = parse_smmx(name)
+            if parsed is None:
+                print(f"❌ No se pudo leer: {name}")
+                continue
+            print(f"📄 {name}: {parsed['title'][:60]} | nodos: {parsed['node_count']} | "
+                  f"relaciones: {len(parsed['relations'])} | guid: {parsed['guid'] or '-'}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
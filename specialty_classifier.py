@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Clasificador de Especialidad - MedMaps
+
+Naive Bayes multinomial sobre los tokens de cada mapa (título y texto de
+los nodos), entrenado con los mapas que ya tienen especialidad.
+Sugiere especialidad para el backlog de mapas en 'General', ordenadas por
+confianza, y review_maps.py --reclassify las ofrece como opciones de una
+tecla.
+
+El modelo son dos arreglos NumPy: log P(clase) y log P(token | clase) con
+suavizado de Laplace (alpha). Las frecuencias se cuentan con tf sublineal
+(1 + log tf) para que los mapas enormes no dominen su clase. La confianza es
+la probabilidad a posteriori, con el puntaje dividido por el largo del mapa
+elevado a LENGTH_EXPONENT: sin eso, naive Bayes da ~100% a casi todo mapa
+largo. Qué tan confiable es cada nivel de confianza depende del corpus y se
+mide con --evaluate (validación cruzada sobre lo ya clasificado).
+
+Nada se acepta solo por defecto. --suggest también corre la validación
+cruzada y guarda como umbral de auto-aceptación el menor de THRESHOLDS cuyas
+sugerencias aciertan al menos AUTO_ACCEPT_PRECISION (con AUTO_ACCEPT_MIN_MAPS
+mapas o más); si ninguno llega, no hay umbral. review_maps --auto-accept
+sin valor usa ese umbral.
+
+Uso:
+    python specialty_classifier.py --suggest          # Clasificar 'General' → archivo de sugerencias
+    python specialty_classifier.py --evaluate         # Precisión por validación cruzada
+    python specialty_classifier.py --suggest --top 5  # Más alternativas por mapa
+
+Requiere: pip install numpy
+"""
+
+import os
+import json
+import math
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import index_store
+from compact_maps import expand_map
+from map_similarity import tokenize
+
+MAPS_DIR = Path("data/maps")
+SUGGESTIONS_FILE = Path("data/review/specialty_suggestions.json")
+
+# Especialidad de los mapas sin clasificar (no se usa para entrenar)
+UNLABELED = 'General'
+# Clases con menos mapas que esto no se sugieren
+MIN_CLASS_MAPS = 3
+ALPHA = 0.1
+MIN_DF = 2
+# Atenuación del puntaje por largo del mapa (calibra la confianza)
+LENGTH_EXPONENT = 0.75
+TOP_SUGGESTIONS = 3
+CV_FOLDS = 5
+# Umbrales de confianza que se evalúan (tabla de --evaluate y auto-aceptación)
+THRESHOLDS = (0.5, 0.7, 0.8, 0.9, 0.95, 0.99)
+# Precisión en validación cruzada exigida para aceptar sin preguntar, y
+# mapas mínimos sobre el umbral para que esa precisión signifique algo
+AUTO_ACCEPT_PRECISION = 0.95
+AUTO_ACCEPT_MIN_MAPS = 20
+
+
+def map_text(map_data):
+    """Texto de todos los nodos (recorrido iterativo, sin límite de profundidad)"""
+    parts = []
+    stack = [map_data.get('root') or {}]
+    while stack:
+        node = stack.pop()
+        parts.append(node.get('text', ''))
+        stack.extend(node.get('children') or [])
+    return ' '.join(parts)
+
+
+def map_document(entry):
+    """Worker: tokens con frecuencia de un mapa del índice (Counter, o None si no se lee)"""
+    map_file = MAPS_DIR / f"{entry['id']}.json"
+    try:
+        with open(map_file, 'r', encoding='utf-8') as f:
+            map_data = expand_map(json.load(f))
+    except (OSError, ValueError):
+        return None
+    # Solo contenido: la carpeta y el archivo de origen delatan la especialidad
+    # en los mapas ya clasificados y no dicen nada en los de 'General'
+    title = entry.get('title') or map_data.get('title') or ''
+    return Counter(tokenize(title + ' ' + map_text(map_data)))
+
+
+def load_documents(entries, jobs=1):
+    """Documentos (Counter de tokens) de las entradas, en orden, en paralelo si jobs > 1"""
+    if jobs is None or jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs == 1:
+        return [map_document(m) for m in entries]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(map_document, entries, chunksize=32))
+
+
+def doc_vector(vocab, doc):
+    """(índices, pesos) de un documento sobre el vocabulario, con tf sublineal"""
+    import numpy as np
+
+    idx = []
+    weights = []
+    for term, tf in doc.items():
+        j = vocab.get(term)
+        if j is not None:
+            idx.append(j)
+            weights.append(1 + math.log(tf))
+    return np.asarray(idx, dtype=np.int64), np.asarray(weights, dtype=np.float64)
+
+
+def train(docs, labels, alpha=ALPHA, min_df=MIN_DF, min_class=MIN_CLASS_MAPS):
+    """Entrena el modelo con documentos etiquetados; retorna un dict con los arreglos"""
+    import numpy as np
+
+    class_sizes = Counter(labels)
+    classes = sorted(c for c, n in class_sizes.items() if n >= min_class and c != UNLABELED)
+    class_index = {c: i for i, c in enumerate(classes)}
+    pairs = [(doc, class_index[label]) for doc, label in zip(docs, labels)
+             if doc is not None and label in class_index]
+
+    df = Counter()
+    for doc, _ in pairs:
+        df.update(doc.keys())
+    vocab = {}
+    for term, d in df.items():
+        if d >= min_df:
+            vocab[term] = len(vocab)
+
+    counts = np.zeros((len(classes), len(vocab)), dtype=np.float64)
+    class_docs = np.zeros(len(classes), dtype=np.float64)
+    for doc, c in pairs:
+        idx, weights = doc_vector(vocab, doc)
+        counts[c, idx] += weights
+        class_docs[c] += 1
+
+    log_prob = np.log(counts + alpha) - np.log(counts.sum(axis=1, keepdims=True) + alpha * len(vocab))
+    return {
+        'classes': classes,
+        'vocab': vocab,
+        'log_prior': np.log(class_docs / class_docs.sum()),
+        'log_prob': log_prob,
+        'train_maps': len(pairs),
+        'alpha': alpha,
+    }
+
+
+def predict(model, docs, top=TOP_SUGGESTIONS):
+    """Por documento, lista de (especialidad, confianza) de mayor a menor ([] si no hay texto)"""
+    import numpy as np
+
+    results = []
+    for doc in docs:
+        if doc is None:
+            results.append([])
+            continue
+        idx, weights = doc_vector(model['vocab'], doc)
+        if not len(idx):
+            results.append([])
+            continue
+        scores = model['log_prior'] + model['log_prob'][:, idx] @ weights
+        # Atenuar por el largo: las probabilidades quedan comparables entre mapas
+        scores = scores / weights.sum() ** LENGTH_EXPONENT
+        posterior = np.exp(scores - scores.max())
+        posterior /= posterior.sum()
+        best = np.argsort(-posterior)[:top]
+        results.append([(model['classes'][i], float(posterior[i])) for i in best])
+    return results
+
+
+def suggest(index=None, jobs=0, top=TOP_SUGGESTIONS, output=SUGGESTIONS_FILE):
+    """Entrena con lo clasificado y sugiere especialidad para los mapas 'General'
+
+    Escribe el archivo de sugerencias (ordenado por confianza) y lo retorna.
+    """
+    t0 = time.perf_counter()
+    index = index if index is not None else index_store.load_index()
+    docs = load_documents(index, jobs)
+    labels = [m.get('specialty') or UNLABELED for m in index]
+    t_load = time.perf_counter() - t0
+
+    model = train(docs, labels)
+    pending = [(m, doc) for m, doc, label in zip(index, docs, labels) if label == UNLABELED]
+    predictions = predict(model, [doc for _, doc in pending], top)
+
+    labeled = [(doc, label) for doc, label in zip(docs, labels) if label != UNLABELED]
+    hits = cross_validate([doc for doc, _ in labeled], [label for _, label in labeled])
+    threshold = auto_accept_threshold(hits)
+    elapsed = time.perf_counter() - t0
+
+    items = []
+    for (m, _), ranked in zip(pending, predictions):
+        items.append({
+            'id': m['id'],
+            'title': m.get('title', ''),
+            'confidence': round(ranked[0][1], 4) if ranked else 0.0,
+            'suggestions': [{'specialty': s, 'confidence': round(p, 4)} for s, p in ranked],
+        })
+    items.sort(key=lambda x: -x['confidence'])
+
+    result = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'model': {'classes': len(model['classes']), 'train_maps': model['train_maps'],
+                  'vocabulary': len(model['vocab']), 'alpha': model['alpha']},
+        'auto_accept': {'threshold': threshold, 'precision': AUTO_ACCEPT_PRECISION,
+                        'cv_maps': len(hits)},
+        'seconds': round(elapsed, 2),
+        'count': len(items),
+        'items': items,
+    }
+    if output:
+        output = Path(output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp = output.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, output)
+
+    print(f"🧠 Modelo: {len(model['classes'])} especialidades, {model['train_maps']} mapas, "
+          f"{len(model['vocab'])} términos")
+    print(f"⏱️  {elapsed:.1f}s (lectura de mapas {t_load:.1f}s) para {len(items)} mapas en '{UNLABELED}'")
+    if threshold is None:
+        print(f"🎯 Ningún umbral llega a {AUTO_ACCEPT_PRECISION:.0%} de precisión en validación "
+              f"cruzada: sin auto-aceptación")
+    else:
+        print(f"🎯 Auto-aceptación desde confianza {threshold} "
+              f"(≥ {AUTO_ACCEPT_PRECISION:.0%} de precisión en validación cruzada)")
+    return result
+
+
+def load_suggestions(path=SUGGESTIONS_FILE):
+    """Sugerencias por ID de mapa desde el archivo, o None si no existe"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return {item['id']: [(s['specialty'], s['confidence']) for s in item['suggestions']]
+            for item in data.get('items', [])}
+
+
+def load_auto_accept(path=SUGGESTIONS_FILE):
+    """Umbral de auto-aceptación calibrado por --suggest, o None si no hay"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return (data.get('auto_accept') or {}).get('threshold')
+
+
+def cross_validate(docs, labels, folds=CV_FOLDS):
+    """Predicciones fuera de muestra: lista de (confianza, acierto, acierto en el top)"""
+    hits = []
+    for k in range(folds):
+        train_ids = [i for i in range(len(docs)) if i % folds != k]
+        test_ids = [i for i in range(len(docs)) if i % folds == k]
+        model = train([docs[i] for i in train_ids], [labels[i] for i in train_ids])
+        for i, ranked in zip(test_ids, predict(model, [docs[i] for i in test_ids])):
+            if not ranked:
+                continue
+            hits.append((ranked[0][1], ranked[0][0] == labels[i],
+                         labels[i] in [s for s, _ in ranked]))
+    return hits
+
+
+def auto_accept_threshold(hits, precision=AUTO_ACCEPT_PRECISION, min_maps=AUTO_ACCEPT_MIN_MAPS):
+    """Menor umbral de THRESHOLDS con la precisión pedida, o None si ninguno llega"""
+    for threshold in THRESHOLDS:
+        sel = [h for h in hits if h[0] >= threshold]
+        if len(sel) >= min_maps and sum(h[1] for h in sel) / len(sel) >= precision:
+            return threshold
+    return None
+
+
+def evaluate(jobs=0, folds=CV_FOLDS):
+    """Validación cruzada sobre los mapas clasificados: precisión global y por confianza"""
+    index = [m for m in index_store.load_index() if (m.get('specialty') or UNLABELED) != UNLABELED]
+    docs = load_documents(index, jobs)
+    hits = cross_validate(docs, [m['specialty'] for m in index], folds)
+
+    if not hits:
+        print("❌ No hay mapas clasificados para evaluar")
+        return
+    print(f"\n📊 Validación cruzada ({folds} partes, {len(hits)} mapas)\n")
+    print(f"  Precisión top-1: {sum(h[1] for h in hits) / len(hits):.1%}")
+    print(f"  Precisión top-{TOP_SUGGESTIONS}: {sum(h[2] for h in hits) / len(hits):.1%}\n")
+    print(f"  {'confianza ≥':<12} {'mapas':>6} {'cobertura':>10} {'precisión':>10}")
+    for threshold in THRESHOLDS:
+        sel = [h for h in hits if h[0] >= threshold]
+        if sel:
+            print(f"  {threshold:<12} {len(sel):>6} {len(sel) / len(hits):>10.1%} "
+                  f"{sum(h[1] for h in sel) / len(sel):>10.1%}")
+
+    threshold = auto_accept_threshold(hits)
+    if threshold is None:
+        print(f"\n🎯 Ningún umbral llega a {AUTO_ACCEPT_PRECISION:.0%} de precisión "
+              f"con {AUTO_ACCEPT_MIN_MAPS}+ mapas: sin auto-aceptación")
+    else:
+        print(f"\n🎯 Umbral de auto-aceptación: {threshold}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clasificador de especialidad para mapas en General')
+    parser.add_argument('--suggest', action='store_true', help='Sugerir especialidad para los mapas en General')
+    parser.add_argument('--evaluate', action='store_true', help='Validación cruzada sobre lo ya clasificado')
+    parser.add_argument('--top', type=int, default=TOP_SUGGESTIONS, help='Sugerencias por mapa')
+    parser.add_argument('--output', default=str(SUGGESTIONS_FILE), help='Archivo de sugerencias')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Procesos para leer los mapas (0 = todos los núcleos)')
+    args = parser.parse_args()
+
+    if args.evaluate:
+        evaluate(args.jobs)
+    elif args.suggest:
+        result = suggest(jobs=args.jobs, top=args.top, output=args.output)
+        print(f"💾 Sugerencias: {args.output}\n")
+        for item in result['items'][:10]:
+            best = item['suggestions'][0]['specialty'] if item['suggestions'] else '-'
+            print(f"  {item['confidence']:>6.1%}  {item['id']}: {item['title'][:45]} → {best}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
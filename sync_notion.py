@@ -4,32 +4,89 @@ MedMaps - Sincronización con Notion
 ====================================
 Este script sincroniza los mapas mentales con una base de datos de Notion.
 
+La sincronización corre en asyncio con varios workers que comparten un
+token bucket ajustado al límite de Notion (~3 req/s en promedio). Los 429,
+5xx y timeouts se reintentan con backoff exponencial con jitter; si Notion
+manda Retry-After se respeta y se pausa a todos los workers, no solo al que
+recibió el 429. Lo que falla después de los reintentos queda en un reporte
+JSON (.cache/notion_sync_report.json) en vez de perderse entre warnings.
+
+La sincronización es incremental: data/notion_ledger.json guarda, por mapa,
+la página de Notion y un hash de las propiedades enviadas, y solo se envían
+los mapas nuevos o cambiados ("Última Actualización" se toca solo entonces).
+Sin ledger, o con --rescan, primero se recorre la base de datos completa
+(paginada) para asociar las páginas existentes y no duplicarlas. El hash se
+compara para todos los mapas del índice (es barato y local), así que también
+se envían los cambios que no pasan por el feed (build_artifacts, ediciones a
+mano, un git pull). El feed de cambios (change_feed.py) solo se usa para
+contar: el reporte dice cuántos cambios hubo fuera de él. --status responde
+desde el ledger; --status --remote recorre Notion.
+
+Para probar sin tocar Notion, levantar el stub local y apuntar el cliente:
+    python benchmarks/notion_stub.py --port 8787
+    NOTION_BASE_URL=http://127.0.0.1:8787 python sync_notion.py --sync
+
 Uso:
     python sync_notion.py --setup      # Crear base de datos en Notion
     python sync_notion.py --sync       # Sincronizar mapas existentes
+    python sync_notion.py --sync --workers 8 --rps 3
+    python sync_notion.py --sync --rescan
     python sync_notion.py --status     # Ver estado de sincronización
+    python sync_notion.py --status --remote
 """
 
 import os
 import json
+import time
+import random
+import hashlib
+import asyncio
 import argparse
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import index_store
+import change_feed
 
 try:
-    from notion_client import Client
+    from notion_client import Client, AsyncClient
+    from notion_client.errors import HTTPResponseError, RequestTimeoutError
+    from notion_client.helpers import collect_paginated_api
     from dotenv import load_dotenv
 except ImportError:
     print("Instalando dependencias...")
     os.system("pip install notion-client python-dotenv -q")
-    from notion_client import Client
+    from notion_client import Client, AsyncClient
+    from notion_client.errors import HTTPResponseError, RequestTimeoutError
+    from notion_client.helpers import collect_paginated_api
     from dotenv import load_dotenv
 
+import httpx
+
 # Cargar variables de entorno
 load_dotenv()
 
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
+# Para apuntar a benchmarks/notion_stub.py en vez de api.notion.com
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL") or "https://api.notion.com"
+
+# Motor de sincronización
+SYNC_WORKERS = 4
+NOTION_RPS = 3.0              # Promedio que Notion admite por integración
+NOTION_BURST = 3              # Capacidad del token bucket
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0            # Segundos; se duplica en cada intento
+BACKOFF_MAX = 60.0
+RETRY_STATUS = {409, 429, 500, 502, 503, 504}
+# Errores tras los que Notion pudo haber aplicado la request igual
+AMBIGUOUS_STATUS = {500, 502, 503, 504}
+SYNC_REPORT = Path(".cache/notion_sync_report.json")
+# map_id → página de Notion + hash de las propiedades enviadas (sync delta)
+LEDGER_FILE = Path("data/notion_ledger.json")
+QUERY_PAGE_SIZE = 100         # Máximo que acepta databases.query
+PROGRESS_EVERY = 50
 
 # Configuración de TAGs y Estados
 TAGS = [
@@ -64,7 +121,7 @@ def get_notion_client():
     if not NOTION_TOKEN:
         print("❌ Error: NOTION_TOKEN no configurado en .env")
         return None
-    return Client(auth=NOTION_TOKEN)
+    return Client(auth=NOTION_TOKEN, base_url=NOTION_BASE_URL)
 
 
 def setup_database(notion, parent_page_id):
@@ -123,81 +180,485 @@ def setup_database(notion, parent_page_id):
         return None
 
 
-def sync_maps_to_notion(notion, database_id):
+def map_properties(map_data):
+    """Propiedades de la página de Notion para un mapa del índice.
+
+    No incluye "Última Actualización": se agrega solo al enviar un cambio, para
+    que el hash del ledger dependa únicamente del contenido del mapa.
+    """
+    map_id = map_data.get("id", "")
+    specialty = map_data.get("specialty", "General")
+    return {
+        "Título": {"title": [{"text": {"content": map_data.get("title", "Sin título")[:100]}}]},
+        "Especialidad": {"select": {"name": specialty if specialty in ESPECIALIDADES else "General"}},
+        "Estado": {"select": {"name": "Gratis"}},  # Default a gratis
+        "Nodos": {"number": map_data.get("node_count", 0)},
+        "ID Mapa": {"rich_text": [{"text": {"content": map_id}}]},
+        "URL Portal": {"url": f"https://criaah.github.io/medmaps/explorar.html?map={map_id}"},
+    }
+
+
+def properties_hash(properties):
+    data = json.dumps(properties, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def load_ledger(database_id, ledger_file=LEDGER_FILE):
+    """Ledger local: map_id → página de Notion y hash de lo último enviado.
+
+    Si no existe o es de otra base de datos, se parte de uno vacío (y la
+    próxima sincronización hace un escaneo remoto completo).
+    """
+    try:
+        with open(ledger_file, 'r', encoding='utf-8') as f:
+            ledger = json.load(f)
+    except (OSError, ValueError):
+        ledger = None
+    if not ledger or ledger.get('database_id') != database_id:
+        if ledger:
+            print(f"⚠️ {ledger_file} es de otra base de datos; se ignora")
+        return {'database_id': database_id, 'synced': None, 'pages': {}}
+    return ledger
+
+
+def save_ledger(ledger, ledger_file=LEDGER_FILE):
+    ledger_file = Path(ledger_file)
+    ledger_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ledger_file.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(ledger, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, ledger_file)
+
+
+def ledger_entry(page_id, properties, digest):
+    return {
+        'page_id': page_id,
+        'hash': digest,
+        'pushed': datetime.now().isoformat(timespec='seconds'),
+        'specialty': properties["Especialidad"]["select"]["name"],
+        'estado': properties["Estado"]["select"]["name"],
+    }
+
+
+def page_map_id(page):
+    """ID Mapa de una página devuelta por Notion, o None"""
+    rich_text = page.get("properties", {}).get("ID Mapa", {}).get("rich_text", [])
+    if not rich_text:
+        return None
+    return rich_text[0].get("plain_text") or rich_text[0].get("text", {}).get("content")
+
+
+def new_bucket(rps=NOTION_RPS, burst=NOTION_BURST):
+    """Token bucket compartido por los workers; rps <= 0 lo desactiva"""
+    return {
+        'rate': rps,
+        'burst': max(1, burst),
+        'tokens': float(max(1, burst)),
+        'updated': time.monotonic(),
+        'paused_until': 0.0,
+        'lock': asyncio.Lock(),
+    }
+
+
+async def take_token(bucket):
+    """Espera hasta poder hacer una request"""
+    if bucket['rate'] <= 0:
+        return
+    async with bucket['lock']:
+        while True:
+            now = time.monotonic()
+            if now < bucket['paused_until']:
+                await asyncio.sleep(bucket['paused_until'] - now)
+                continue
+            bucket['tokens'] = min(bucket['burst'],
+                                   bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+            bucket['updated'] = now
+            if bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                return
+            await asyncio.sleep((1 - bucket['tokens']) / bucket['rate'])
+
+
+def pause_bucket(bucket, seconds):
+    """Frena a todos los workers (Notion pidió esperar con Retry-After)"""
+    until = time.monotonic() + seconds
+    if until > bucket['paused_until']:
+        bucket['paused_until'] = until
+        # Al reanudar, sin ráfaga acumulada
+        bucket['tokens'] = 0.0
+        bucket['updated'] = until
+
+
+def retry_after(headers):
+    """Segundos de Retry-After (número o fecha HTTP), o None"""
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt):
+    """Backoff exponencial con jitter completo"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_ambiguous(e):
+    """True si la request pudo haberse aplicado aunque falló (timeout, red, 5xx)"""
+    if isinstance(e, HTTPResponseError):
+        return e.status in AMBIGUOUS_STATUS
+    return isinstance(e, (RequestTimeoutError, httpx.TransportError))
+
+
+async def call_notion(bucket, stats, request, *args, retries=MAX_RETRIES, idempotent=True,
+                      **kwargs):
+    """Ejecuta una request respetando el bucket y reintentando lo transitorio
+
+    Con idempotent=False (pages.create) solo se reintentan los errores que
+    aseguran que la request no se aplicó (429, 409); los ambiguos se lanzan
+    para que quien llama verifique antes de repetir.
+    """
+    attempt = 0
+    while True:
+        await take_token(bucket)
+        stats['requests'] += 1
+        try:
+            return await request(*args, **kwargs)
+        except HTTPResponseError as e:
+            if e.status == 429:
+                stats['rate_limited'] += 1
+            if e.status not in RETRY_STATUS or attempt >= retries:
+                raise
+            if not idempotent and is_ambiguous(e):
+                raise
+            wait = retry_after(e.headers)
+            if e.status == 429:
+                if wait is None:
+                    wait = backoff_delay(attempt)
+                pause_bucket(bucket, wait)
+            elif wait is None:
+                wait = backoff_delay(attempt)
+        except (RequestTimeoutError, httpx.TransportError):
+            if attempt >= retries or not idempotent:
+                raise
+            wait = backoff_delay(attempt)
+        stats['retries'] += 1
+        attempt += 1
+        await asyncio.sleep(wait)
+
+
+def describe_error(e):
+    """Resumen de una excepción para el reporte de fallas"""
+    entry = {'error': str(e) or type(e).__name__, 'type': type(e).__name__}
+    if isinstance(e, HTTPResponseError):
+        entry['status'] = e.status
+        entry['code'] = e.code
+    return entry
+
+
+async def query_all(notion, bucket, stats, database_id, retries=MAX_RETRIES):
+    """Todas las páginas de la base de datos, siguiendo next_cursor"""
+    pages = []
+    cursor = None
+    while True:
+        kwargs = {'start_cursor': cursor} if cursor else {}
+        results = await call_notion(bucket, stats, notion.databases.query, retries=retries,
+                                    database_id=database_id, page_size=QUERY_PAGE_SIZE, **kwargs)
+        pages.extend(results.get("results", []))
+        cursor = results.get("next_cursor")
+        if not results.get("has_more") or not cursor:
+            return pages
+
+
+async def find_page(notion, bucket, stats, database_id, map_id, retries=MAX_RETRIES):
+    """Página de la base de datos con ese "ID Mapa", o None"""
+    results = await call_notion(bucket, stats, notion.databases.query, retries=retries,
+                                database_id=database_id, page_size=1,
+                                filter={"property": "ID Mapa", "rich_text": {"equals": map_id}})
+    pages = results.get("results", [])
+    return pages[0] if pages else None
+
+
+async def create_page(notion, database_id, bucket, stats, retries, properties):
+    """Crea la página sin duplicarla
+
+    pages.create no es idempotente: si falla de forma ambigua (timeout, red,
+    5xx) Notion pudo haberla creado igual. Antes de cada reintento se busca
+    la página por "ID Mapa" y, si apareció, se usa esa.
+    """
+    map_id = page_map_id({"properties": properties})
+    attempt = 0
+    while True:
+        try:
+            return await call_notion(bucket, stats, notion.pages.create, retries=retries,
+                                     idempotent=False, parent={"database_id": database_id},
+                                     properties=properties)
+        except Exception as e:
+            if not is_ambiguous(e) or attempt >= retries:
+                raise
+        stats['retries'] += 1
+        await asyncio.sleep(backoff_delay(attempt))
+        attempt += 1
+        page = await find_page(notion, bucket, stats, database_id, map_id, retries)
+        if page is not None:
+            return page
+
+
+async def push_map(notion, database_id, bucket, stats, retries, properties, page_id):
+    """Crea o actualiza la página; retorna (page_id, acción)"""
+    properties = dict(properties)
+    properties["Última Actualización"] = {"date": {"start": datetime.now().isoformat()}}
+    if page_id:
+        try:
+            await call_notion(bucket, stats, notion.pages.update, retries=retries,
+                              page_id=page_id, properties=properties)
+            return page_id, 'updated'
+        except HTTPResponseError as e:
+            # Página borrada a mano en Notion: se vuelve a crear
+            if e.status != 404:
+                raise
+    page = await create_page(notion, database_id, bucket, stats, retries, properties)
+    return page["id"], 'created'
+
+
+async def sync_worker(notion, database_id, queue, bucket, stats, failures, ledger, total,
+                      retries, verbose, ledger_file):
+    while True:
+        item = await queue.get()
+        try:
+            map_id, title, properties, digest, page_id = item
+            try:
+                page_id, action = await push_map(notion, database_id, bucket, stats, retries,
+                                                 properties, page_id)
+                stats[action] += 1
+                ledger['pages'][map_id] = ledger_entry(page_id, properties, digest)
+            except Exception as e:
+                entry = {'map_id': map_id, 'title': title,
+                         'action': 'update' if page_id else 'create'}
+                entry.update(describe_error(e))
+                failures.append(entry)
+                if verbose:
+                    print(f"  ⚠️ Error con {map_id}: {entry['error']}")
+
+            done = stats['created'] + stats['updated'] + len(failures)
+            if done % PROGRESS_EVERY == 0:
+                # Lo ya creado queda registrado aunque la corrida se corte
+                if ledger_file:
+                    save_ledger(ledger, ledger_file)
+                if verbose:
+                    print(f"  Progreso: {done}/{total} | 429: {stats['rate_limited']} | "
+                          f"reintentos: {stats['retries']}")
+        finally:
+            queue.task_done()
+
+
+async def sync_maps_async(maps, database_id, workers=SYNC_WORKERS, rps=NOTION_RPS,
+                          retries=MAX_RETRIES, token=None, base_url=None, verbose=True,
+                          ledger=None, ledger_file=None, rescan=False):
+    """Envía a Notion los mapas nuevos o cambiados según el ledger. Retorna el reporte.
+
+    Sin ledger (o con rescan) primero se recorre la base de datos completa para
+    asociar las páginas que ya existen y no duplicarlas; esas se reenvían una
+    vez para registrar su hash. Se compara el hash de todos los mapas; el feed
+    de cambios solo sirve para reportar los cambios que no registró.
+    """
+    if ledger is None:
+        ledger = {'database_id': database_id, 'synced': None, 'pages': {}}
+    stats = {'created': 0, 'updated': 0, 'requests': 0, 'rate_limited': 0, 'retries': 0}
+    failures = []
+    bucket = new_bucket(rps, min(NOTION_BURST, workers) if rps > 0 else 1)
+    t0 = time.perf_counter()
+
+    notion = AsyncClient(auth=token or NOTION_TOKEN, base_url=base_url or NOTION_BASE_URL)
+    try:
+        scanned = None
+        if rescan or not ledger['pages']:
+            try:
+                pages = await query_all(notion, bucket, stats, database_id, retries)
+            except Exception as e:
+                raise RuntimeError(f"Error consultando existentes: {e}") from e
+            scanned = len(pages)
+            known = ledger['pages']
+            for page in pages:
+                map_id = page_map_id(page)
+                if map_id and known.get(map_id, {}).get('page_id') != page["id"]:
+                    known[map_id] = {'page_id': page["id"], 'hash': None}
+
+        # Feed: solo para el reporte (cambios ya sincronizados que no pasaron por él)
+        feed_offset = ledger.get('feed_offset')
+        if feed_offset is None:
+            in_feed = None
+            feed_offset = change_feed.end_offset()
+        else:
+            events, feed_offset = change_feed.read(feed_offset)
+            in_feed = set(change_feed.changed_ids(events))
+
+        queue = asyncio.Queue()
+        unchanged = 0
+        untracked = 0
+        for map_data in maps:
+            map_id = map_data.get("id", "")
+            properties = map_properties(map_data)
+            digest = properties_hash(properties)
+            known = ledger['pages'].get(map_id, {})
+            if known.get('hash') == digest:
+                unchanged += 1
+                continue
+            if in_feed is not None and known.get('hash') and map_id not in in_feed:
+                untracked += 1
+            queue.put_nowait((map_id, map_data.get("title", ""), properties, digest,
+                              known.get('page_id')))
+        pending = queue.qsize()
+        if verbose:
+            print(f"  📤 Por enviar: {pending} | Sin cambios: {unchanged}"
+                  + (f" | Fuera del feed: {untracked}" if untracked else "")
+                  + (f" | Páginas remotas: {scanned}" if scanned is not None else ""))
+
+        tasks = [asyncio.create_task(sync_worker(notion, database_id, queue, bucket, stats,
+                                                 failures, ledger, pending, retries, verbose,
+                                                 ledger_file))
+                 for _ in range(max(1, min(workers, pending)))]
+        try:
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        ledger['synced'] = datetime.now().isoformat(timespec='seconds')
+        ledger['feed_offset'] = feed_offset
+    finally:
+        await notion.aclose()
+        if ledger_file:
+            save_ledger(ledger, ledger_file)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        'finished': datetime.now().isoformat(timespec='seconds'),
+        'base_url': base_url or NOTION_BASE_URL,
+        'database_id': database_id,
+        'workers': workers,
+        'rps': rps,
+        'maps': len(maps),
+        'remote_pages_scanned': scanned,
+        'unchanged': unchanged,
+        'untracked_changes': untracked,
+        'created': stats['created'],
+        'updated': stats['updated'],
+        'failed': len(failures),
+        'requests': stats['requests'],
+        'rate_limited': stats['rate_limited'],
+        'retries': stats['retries'],
+        'seconds': round(elapsed, 2),
+        'requests_per_second': round(stats['requests'] / elapsed, 2) if elapsed else None,
+        'failures': failures,
+    }
+
+
+def write_sync_report(report, output=SYNC_REPORT):
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, output)
+    return output
+
+
+def sync_maps_to_notion(database_id, workers=SYNC_WORKERS, rps=NOTION_RPS, retries=MAX_RETRIES,
+                        rescan=False):
     """Sincronizar mapas existentes a Notion"""
     print("🔄 Sincronizando mapas con Notion...")
     
-    # Cargar índice de mapas
-    maps_index_path = Path(__file__).parent / "data" / "maps_index.json"
-    if not maps_index_path.exists():
+    # Cargar índice de mapas (base + journal)
+    if not index_store.INDEX_FILE.exists():
         print("❌ No se encontró maps_index.json")
-        return
+        return None
     
-    with open(maps_index_path) as f:
-        maps = json.load(f)
+    maps = index_store.load_index()
     
-    print(f"📊 Encontrados {len(maps)} mapas para sincronizar")
+    print(f"📊 Encontrados {len(maps)} mapas para sincronizar "
+          f"({workers} workers, {rps:g} req/s)")
     
-    # Obtener páginas existentes en Notion
-    existing = {}
+    ledger = load_ledger(database_id)
     try:
-        results = notion.databases.query(database_id=database_id)
-        for page in results.get("results", []):
-            props = page.get("properties", {})
-            map_id = props.get("ID Mapa", {}).get("rich_text", [])
-            if map_id:
-                existing[map_id[0]["text"]["content"]] = page["id"]
-    except Exception as e:
-        print(f"⚠️ Error consultando existentes: {e}")
+        report = asyncio.run(sync_maps_async(maps, database_id, workers, rps, retries,
+                                             ledger=ledger, ledger_file=LEDGER_FILE,
+                                             rescan=rescan))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return None
+    output = write_sync_report(report)
+    
+    print(f"\n✅ Sincronización completada en {report['seconds']:.1f}s!")
+    print(f"   ⏭️  Sin cambios: {report['unchanged']}")
+    if report['untracked_changes']:
+        print(f"   🕵️  Cambios sin evento en el feed: {report['untracked_changes']}")
+    print(f"   📝 Nuevos: {report['created']}")
+    print(f"   🔄 Actualizados: {report['updated']}")
+    print(f"   ⏳ 429 recibidos: {report['rate_limited']} | Reintentos: {report['retries']}")
+    if report['failed']:
+        print(f"   ❌ Fallidos: {report['failed']}")
+    print(f"💾 Reporte: {output} | Ledger: {LEDGER_FILE}")
+    return report
+
+
+def print_counts(total, estados, especialidades):
+    print(f"Total de mapas en Notion: {total}\n")
     
-    synced = 0
-    updated = 0
+    print("Por Estado:")
+    for estado, count in sorted(estados.items(), key=lambda x: -x[1]):
+        print(f"  {estado}: {count}")
     
-    for map_data in maps:
-        map_id = map_data.get("id", "")
-        title = map_data.get("title", "Sin título")
-        specialty = map_data.get("specialty", "General")
-        node_count = map_data.get("node_count", 0)
-        
-        page_data = {
-            "Título": {"title": [{"text": {"content": title[:100]}}]},
-            "Especialidad": {"select": {"name": specialty if specialty in ESPECIALIDADES else "General"}},
-            "Estado": {"select": {"name": "Gratis"}},  # Default a gratis
-            "Nodos": {"number": node_count},
-            "ID Mapa": {"rich_text": [{"text": {"content": map_id}}]},
-            "URL Portal": {"url": f"https://criaah.github.io/medmaps/explorar.html?map={map_id}"},
-            "Última Actualización": {"date": {"start": datetime.now().isoformat()}}
-        }
-        
-        try:
-            if map_id in existing:
-                # Actualizar existente
-                notion.pages.update(page_id=existing[map_id], properties=page_data)
-                updated += 1
-            else:
-                # Crear nuevo
-                notion.pages.create(parent={"database_id": database_id}, properties=page_data)
-                synced += 1
-                
-            if (synced + updated) % 50 == 0:
-                print(f"  Progreso: {synced + updated}/{len(maps)}")
-                
-        except Exception as e:
-            print(f"  ⚠️ Error con {map_id}: {e}")
+    print("\nPor Especialidad (top 10):")
+    for esp, count in sorted(especialidades.items(), key=lambda x: -x[1])[:10]:
+        print(f"  {esp}: {count}")
+
+
+def show_status(database_id):
+    """Mostrar estado según el ledger local (sin consultar Notion)"""
+    print("📊 Estado de MedMaps en Notion (ledger local)\n")
+    
+    ledger = load_ledger(database_id)
+    if not ledger['pages']:
+        print(f"⚠️ Sin ledger en {LEDGER_FILE}: ejecuta --sync o usa --status --remote")
+        return
     
-    print(f"\n✅ Sincronización completada!")
-    print(f"   📝 Nuevos: {synced}")
-    print(f"   🔄 Actualizados: {updated}")
+    estados = {}
+    especialidades = {}
+    for entry in ledger['pages'].values():
+        # Páginas asociadas por escaneo remoto que aún no se reenviaron
+        name = entry.get('estado', 'Sin registrar')
+        estados[name] = estados.get(name, 0) + 1
+        name = entry.get('specialty', 'Sin registrar')
+        especialidades[name] = especialidades.get(name, 0) + 1
+    
+    print(f"Última sincronización: {ledger.get('synced') or '-'}")
+    print_counts(len(ledger['pages']), estados, especialidades)
+    
+    # Cambios locales aún no enviados
+    if index_store.INDEX_FILE.exists():
+        pending = 0
+        for map_data in index_store.load_index():
+            known = ledger['pages'].get(map_data.get("id", ""), {})
+            if known.get('hash') != properties_hash(map_properties(map_data)):
+                pending += 1
+        print(f"\n📤 Pendientes de sincronizar: {pending}")
 
 
-def show_status(notion, database_id):
-    """Mostrar estado de la base de datos"""
+def show_remote_status(notion, database_id):
+    """Mostrar estado recorriendo la base de datos completa en Notion"""
     print("📊 Estado de MedMaps en Notion\n")
     
     try:
-        # Contar por estado
-        results = notion.databases.query(database_id=database_id)
-        pages = results.get("results", [])
+        pages = collect_paginated_api(notion.databases.query, database_id=database_id,
+                                      page_size=QUERY_PAGE_SIZE)
         
         estados = {}
         especialidades = {}
@@ -215,15 +676,7 @@ def show_status(notion, database_id):
                 name = esp.get("name", "General")
                 especialidades[name] = especialidades.get(name, 0) + 1
         
-        print(f"Total de mapas en Notion: {len(pages)}\n")
-        
-        print("Por Estado:")
-        for estado, count in sorted(estados.items(), key=lambda x: -x[1]):
-            print(f"  {estado}: {count}")
-        
-        print("\nPor Especialidad (top 10):")
-        for esp, count in sorted(especialidades.items(), key=lambda x: -x[1])[:10]:
-            print(f"  {esp}: {count}")
+        print_counts(len(pages), estados, especialidades)
             
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -233,10 +686,27 @@ def main():
     parser = argparse.ArgumentParser(description="MedMaps - Sincronización con Notion")
     parser.add_argument("--setup", metavar="PAGE_ID", help="Crear base de datos (requiere ID de página padre)")
     parser.add_argument("--sync", action="store_true", help="Sincronizar mapas a Notion")
-    parser.add_argument("--status", action="store_true", help="Mostrar estado")
+    parser.add_argument("--status", action="store_true", help="Mostrar estado (desde el ledger local)")
+    parser.add_argument("--remote", action="store_true",
+                        help="Con --status: recorrer la base de datos en Notion en vez del ledger")
+    parser.add_argument("--rescan", action="store_true",
+                        help="Con --sync: recorrer Notion completo antes de enviar (reconstruye el ledger)")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS,
+                        help="Requests concurrentes al sincronizar (default %(default)s)")
+    parser.add_argument("--rps", type=float, default=NOTION_RPS,
+                        help="Requests por segundo hacia Notion; 0 = sin límite (default %(default)s)")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES,
+                        help="Reintentos ante 429/5xx/timeouts (default %(default)s)")
     
     args = parser.parse_args()
     
+    if args.status and not args.remote:
+        if not NOTION_DATABASE_ID:
+            print("❌ NOTION_DATABASE_ID no configurado.")
+            return
+        show_status(NOTION_DATABASE_ID)
+        return
+    
     notion = get_notion_client()
     if not notion:
         return
@@ -247,12 +717,15 @@ def main():
         if not NOTION_DATABASE_ID:
             print("❌ NOTION_DATABASE_ID no configurado. Ejecuta --setup primero.")
             return
-        sync_maps_to_notion(notion, NOTION_DATABASE_ID)
+        report = sync_maps_to_notion(NOTION_DATABASE_ID, args.workers, args.rps, args.retries,
+                                     args.rescan)
+        if report and report['failed']:
+            raise SystemExit(1)
     elif args.status:
         if not NOTION_DATABASE_ID:
             print("❌ NOTION_DATABASE_ID no configurado.")
             return
-        show_status(notion, NOTION_DATABASE_ID)
+        show_remote_status(notion, NOTION_DATABASE_ID)
     else:
         parser.print_help()
 
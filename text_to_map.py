@@ -16,16 +16,16 @@ import os
 from pathlib import Path
 from datetime import datetime
 
+import index_store
+import change_feed
+
 # Configuración de rutas
 MAPS_DIR = Path("data/maps")
 INDEX_FILE = Path("data/maps_index.json")
 
 def load_existing_maps():
     """Carga el índice de mapas existentes para buscar enlaces"""
-    if not INDEX_FILE.exists():
-        return []
-    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return index_store.load_index()
 
 def find_related_maps(content: str, existing_maps: list, current_id: str = None) -> list:
     """
@@ -168,16 +168,8 @@ def extract_references(text: str) -> list:
     return references
 
 def get_next_map_id() -> str:
-    """Obtiene el siguiente ID disponible para un mapa"""
-    existing = load_existing_maps()
-    max_num = 0
-    for m in existing:
-        match = re.search(r'map_(\d+)', m.get('id', ''))
-        if match:
-            num = int(match.group(1))
-            if num > max_num:
-                max_num = num
-    return f"map_{max_num + 1:04d}"
+    """Obtiene el siguiente ID disponible para un mapa (contador de index_store)"""
+    return index_store.next_map_id()
 
 def convert_to_json(text: str, specialty: str, tag: str, access: str = "free", 
                     title: str = None) -> dict:
@@ -186,17 +178,17 @@ def convert_to_json(text: str, specialty: str, tag: str, access: str = "free",
     root = parse_tabbed_text(text)
     references = extract_references(text)
     existing_maps = load_existing_maps()
-    map_id = get_next_map_id()
     
     # Usar título de la raíz si no se proporciona
     if not title:
         title = root.get("text", "Sin título")
     
     # Encontrar mapas relacionados
-    related = find_related_maps(text, existing_maps, map_id)
+    related = find_related_maps(text, existing_maps)
     
+    # Sin ID: se reserva en save_map, así una vista previa o un --output no gasta uno
     map_data = {
-        "id": map_id,
+        "id": None,
         "title": title,
         "specialty": specialty,
         "tag": tag,
@@ -211,15 +203,25 @@ def convert_to_json(text: str, specialty: str, tag: str, access: str = "free",
     return map_data
 
 def save_map(map_data: dict, update_index: bool = True):
-    """Guarda el mapa en data/maps/ y actualiza el índice"""
+    """Guarda el mapa en data/maps/, lo registra en el feed de cambios y actualiza el índice
+
+    Un mapa nuevo (sin ID) recibe aquí el siguiente ID del contador.
+    """
+    
+    if not map_data.get("id"):
+        map_data["id"] = get_next_map_id()
     
     # Crear directorio si no existe
     MAPS_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Guardar archivo del mapa
+    # Guardar archivo del mapa (minificado, como el resto de data/maps)
     map_file = MAPS_DIR / f"{map_data['id']}.json"
+    kind = 'edit' if map_file.exists() else 'add'
+    content = json.dumps(map_data, ensure_ascii=False, separators=(',', ':'))
     with open(map_file, 'w', encoding='utf-8') as f:
-        json.dump(map_data, f, ensure_ascii=False, indent=2)
+        f.write(content)
+    change_feed.record(map_data['id'], kind, None if kind == 'add' else list(map_data),
+                       change_feed.content_hash(content))
     
     print(f"✅ Mapa guardado: {map_file}")
     
@@ -229,9 +231,7 @@ def save_map(map_data: dict, update_index: bool = True):
     return map_file
 
 def update_maps_index(map_data: dict):
-    """Actualiza el archivo maps_index.json"""
-    
-    existing = load_existing_maps()
+    """Registra el mapa en el índice (una línea en el journal de index_store)"""
     
     # Crear entrada para el índice (sin el árbol completo)
     index_entry = {
@@ -245,22 +245,8 @@ def update_maps_index(map_data: dict):
         "related_maps": map_data.get("related_maps", [])
     }
     
-    # Verificar si ya existe y actualizar
-    found = False
-    for i, m in enumerate(existing):
-        if m["id"] == map_data["id"]:
-            existing[i] = index_entry
-            found = True
-            break
-    
-    if not found:
-        existing.append(index_entry)
-    
-    # Ordenar por ID
-    existing.sort(key=lambda x: x["id"])
-    
-    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
-        json.dump(existing, f, ensure_ascii=False, indent=2)
+    # Agrega o reemplaza la entrada; se ordena por ID al compactar
+    index_store.put(index_entry)
     
     print(f"✅ Índice actualizado: {INDEX_FILE}")
 
@@ -339,7 +325,7 @@ def interactive_mode():
     print("\n" + "="*60)
     print("📋 PREVIEW DEL MAPA")
     print("="*60)
-    print(f"ID: {map_data['id']}")
+    print("ID: (se asigna al guardar)")
     print(f"Título: {map_data['title']}")
     print(f"Especialidad: {map_data['specialty']}")
     print(f"TAG: {map_data['tag']}")
@@ -361,19 +347,8 @@ def interactive_mode():
     else:
         print("❌ Cancelado")
 
-def main():
-    parser = argparse.ArgumentParser(description='Convertir mapa mental de texto a JSON')
-    parser.add_argument('--input', '-i', help='Archivo de texto con el mapa')
-    parser.add_argument('--specialty', '-s', default='General', help='Especialidad médica')
-    parser.add_argument('--tag', '-t', default='📚 Revisión', help='TAG del mapa')
-    parser.add_argument('--access', '-a', default='free', choices=['free', 'premium'], 
-                        help='Nivel de acceso')
-    parser.add_argument('--title', help='Título personalizado')
-    parser.add_argument('--interactive', action='store_true', help='Modo interactivo')
-    parser.add_argument('--output', '-o', help='Archivo de salida (opcional)')
-    
-    args = parser.parse_args()
-    
+def run(args):
+    """Ejecuta la acción pedida en la línea de comandos"""
     if args.interactive:
         interactive_mode()
         return
@@ -398,5 +373,24 @@ def main():
     else:
         save_map(map_data)
 
+def main():
+    parser = argparse.ArgumentParser(description='Convertir mapa mental de texto a JSON')
+    parser.add_argument('--input', '-i', help='Archivo de texto con el mapa')
+    parser.add_argument('--specialty', '-s', default='General', help='Especialidad médica')
+    parser.add_argument('--tag', '-t', default='📚 Revisión', help='TAG del mapa')
+    parser.add_argument('--access', '-a', default='free', choices=['free', 'premium'], 
+                        help='Nivel de acceso')
+    parser.add_argument('--title', help='Título personalizado')
+    parser.add_argument('--interactive', action='store_true', help='Modo interactivo')
+    parser.add_argument('--output', '-o', help='Archivo de salida (opcional)')
+    
+    args = parser.parse_args()
+    
+    try:
+        run(args)
+    finally:
+        # El sitio lee maps_index.json: no dejar cambios solo en el journal
+        index_store.compact_pending()
+
 if __name__ == "__main__":
     main()